@@ -7,7 +7,7 @@ from UI.pages.settings_page import SettingsPage
 from custom_types.crag import Area
 from data.route_builder import (
     build_area_tree, build_subtree, get_region_fp,
-    get_areas_available_for_download
+    get_areas_available_for_download, get_downloaded_regions
 )
 from parser.parser import build_json_sources
 
@@ -29,7 +29,8 @@ class MainWindow(QMainWindow):
         self._navbar = NavBar(f"{self._root.name}", parent=self)
         self._home = HomePage(self._root, parent=self)
         self._settings = SettingsPage(
-            self._root, get_areas_available_for_download(), parent=self
+            self._root, get_areas_available_for_download(),
+            get_downloaded_regions(), parent=self
         )
 
         self._connect_widgets()
@@ -55,6 +56,7 @@ class MainWindow(QMainWindow):
         self._navbar.page_changed.connect(lambda idx: self._change_page(idx))
         self._settings.settings_changed.connect(self._home.refresh_data)
         self._settings.new_region_added.connect(self._add_region)
+        self._settings.reviews_refreshed.connect(self._update_reviews)
         self._home.node_changed.connect(
             lambda title: self._navbar.update_title(title)
         )
@@ -118,6 +120,21 @@ class MainWindow(QMainWindow):
         self._home.refresh_data()
         return
 
+    def _update_reviews(self, region: str, popularity: dict[str, int]) -> None:
+        """
+        Updates the number of reviewers of the region's refreshed routes.
+        Only the changed routes and their ancestors are recalculated and
+        sorted again before the data displayed is updated.
+
+        Args:
+            region (str): name of the region
+            popularity (dict[str, int]): number of reviewers by route id
+        """
+        if popularity:
+            self._root.update_popularity(popularity)
+            self._home.update_view()
+        return
+
     def _build_widget(self) -> QWidget:
         widget = QWidget()
         widget.setLayout(self._create_main_layout())
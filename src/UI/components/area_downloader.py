@@ -1,12 +1,13 @@
-import os
 from PyQt5.QtWidgets import (
-    QWidget, QFrame, QScrollArea, QVBoxLayout, QHBoxLayout
+    QWidget, QFrame, QScrollArea, QPushButton, QSpinBox, QVBoxLayout,
+    QHBoxLayout
 )
 from PyQt5.QtCore import pyqtSignal, Qt
+from UI.components.download_queue import DownloadQueueList
 from UI.custom_widgets.buttons import Link
-from UI.custom_widgets.feedback import ButtonWithProgressBar
 from UI.custom_widgets.composites import SingleStatDisplay
-from scraper.scraper import download_and_merge_data
+from scraper.download_queue import DownloadQueue, QueuedDownload
+from scraper.downloader import discard_download
 from custom_types.custom_types import AreaMap
 
 
@@ -76,6 +77,16 @@ class AreaList(QScrollArea):
 
 
 class AreaDownloader(QFrame):
+    """
+    Lists the regions available for download and a queue of region
+    downloads. Regions are queued by selecting them and clicking the queue
+    button. Up to the selected number of regions are downloaded at once and
+    each region is added to the data tree as soon as it is downloaded. The
+    queue is saved, so unfinished downloads resume after a restart.
+
+    Signals:
+        new_region_added (pyqtSignal[str]): a region was downloaded
+    """
 
     new_region_added = pyqtSignal(str)
 
@@ -84,51 +95,140 @@ class AreaDownloader(QFrame):
 
         self._data = available_areas
         self._sidebar = AreaList(list(self._data.keys()), parent=self)
-        parent_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), 'Icons'
-        )
         self._num_routes_stat = SingleStatDisplay(
             sum([self._data[region]['routes'] for region in self._data]),
             "Total Number of Routes",
             parent=self
             )
-        self._download_button = ButtonWithProgressBar(
-            "Download Area",
-            download_and_merge_data,
-            error_icon_path=os.path.join(parent_dir, 'warning.png'),
-            success_icon_path=os.path.join(parent_dir, 'check.png'),
-            success_msg='Area successfully downloaded!',
-            parent=self
-        )
+        self._queue = DownloadQueue.load()
+        self._queue_list = DownloadQueueList(parent=self)
+        self._queue_button = QPushButton('Queue Download', parent=self)
+        self._max_jobs = QSpinBox(parent=self)
+        self._max_jobs.setRange(1, 8)
+        self._max_jobs.setValue(self._queue.max_jobs)
+        self._max_jobs.setPrefix('Simultaneous downloads: ')
         self._current_region = None
+        self._load_queue()
         self._connect_widgets()
         self._set_layout()
+        self._start_jobs()
 
     def _connect_widgets(self) -> None:
         """Connects the children to one another"""
         self._sidebar.area_selected.connect(self._update_args)
-        self._download_button.finished.connect(self._remove_region)
+        self._queue_button.clicked.connect(self._queue_region)
+        self._max_jobs.valueChanged.connect(self._set_max_jobs)
 
-    def _remove_region(self) -> None:
+    def _load_queue(self) -> None:
         """
-        Removes the region from the scroll area and resets the stat displayed
+        Lists the saved queue. Regions that are no longer available (i.e.,
+        they were downloaded) are dropped from the queue.
         """
-        self._sidebar.remove_region(self._current_region)
-        del self._data[self._current_region]
-        self.new_region_added.emit(self._current_region)
-        self._current_region = None
+        for job in self._queue.jobs:
+            if job['area_name'] not in self._data:
+                self._queue.remove(job['area_name'])
+                continue
+            self._add_job(job)
+        return
+
+    def _add_job(self, job: QueuedDownload) -> None:
+        """Lists the queued download and connects its signals"""
+        widget = self._queue_list.add_job(job)
+        widget.pause_clicked.connect(self._pause_job)
+        widget.resume_clicked.connect(self._resume_job)
+        widget.cancel_clicked.connect(self._cancel_job)
+        widget.succeeded.connect(self._on_job_succeeded)
+        widget.stopped.connect(self._on_job_stopped)
+        return
+
+    def _queue_region(self) -> None:
+        """Queues the selected region"""
+        region = self._current_region
+        if region is None or region in self._queue:
+            return
+        self._queue.add(self._data[region]['id'], region)
+        self._add_job(self._queue.get(region))
+        self._start_jobs()
+        return
+
+    def _set_max_jobs(self, max_jobs: int) -> None:
+        """Sets the number of regions downloaded at once"""
+        self._queue.set_max_jobs(max_jobs)
+        self._start_jobs()
+        return
+
+    def _start_jobs(self) -> None:
+        """Starts queued downloads while fewer than the maximum are running"""
+        for job in self._queue.next_jobs():
+            self._queue.set_status(job['area_name'], 'running')
+            self._queue_list.get_job(job['area_name']).start()
+        return
+
+    def _pause_job(self, region: str) -> None:
+        """Pauses the region's download, which resumes where it stopped"""
+        job = self._queue.get(region)
+        if job['status'] == 'running':
+            self._queue_list.get_job(region).stop('paused')
+        elif job['status'] == 'queued':
+            self._queue.set_status(region, 'paused')
+            self._queue_list.get_job(region).set_status('paused')
+        return
+
+    def _resume_job(self, region: str) -> None:
+        """Queues the paused or failed download again"""
+        self._queue.set_status(region, 'queued')
+        self._queue_list.get_job(region).set_status('queued')
+        self._start_jobs()
+        return
+
+    def _cancel_job(self, region: str) -> None:
+        """Cancels the region's download and deletes its staged files"""
+        job = self._queue.get(region)
+        if job['status'] == 'running':
+            self._queue_list.get_job(region).stop('cancelled')
+            return
+        self._queue.remove(region)
+        self._queue_list.remove_job(region)
+        discard_download(job['area_id'])
+        return
+
+    def _on_job_stopped(self, region: str, reason: str, msg: str) -> None:
+        """Records why the region's download stopped and starts the next"""
+        if reason == 'cancelled':
+            job = self._queue.get(region)
+            self._queue.remove(region)
+            self._queue_list.remove_job(region)
+            discard_download(job['area_id'])
+        else:
+            self._queue.set_status(region, reason, msg)
+            self._queue_list.get_job(region).set_status(reason, msg)
+        self._start_jobs()
+        return
+
+    def _on_job_succeeded(self, region: str) -> None:
+        """
+        Removes the downloaded region from the queue and the list of areas,
+        adds it to the data tree and starts the next download
+        """
+        self._queue.remove(region)
+        self._queue_list.remove_job(region)
+        self._sidebar.remove_region(region)
+        del self._data[region]
+        self.new_region_added.emit(region)
+        if self._current_region == region:
+            self._current_region = None
+            self._num_routes_stat.update_label('Total Number of Routes')
         self._num_routes_stat.update_val(
             sum([self._data[region]['routes'] for region in self._data])
         )
-        self._num_routes_stat.update_label('Total Number of Routes')
+        self._start_jobs()
+        return
 
     def _update_args(self, region: str) -> None:
-        """Updates the download buttons args"""
-        if not self._download_button.is_running():
-            self._download_button.set_args(self._data[region]['id'], region)
-            self._current_region = region
-            self._num_routes_stat.update_val(self._data[region]['routes'])
-            self._num_routes_stat.update_label(f'Number of Routes in {region}')
+        """Selects the region to be queued"""
+        self._current_region = region
+        self._num_routes_stat.update_val(self._data[region]['routes'])
+        self._num_routes_stat.update_label(f'Number of Routes in {region}')
         return
 
     def _create_top_layout(self) -> QVBoxLayout:
@@ -138,9 +238,17 @@ class AreaDownloader(QFrame):
         layout.addWidget(self._num_routes_stat, 1)
         return layout
 
+    def _create_queue_controls_layout(self) -> QHBoxLayout:
+        """Returns the layout of the queue button and the job limit"""
+        layout = QHBoxLayout()
+        layout.addWidget(self._queue_button)
+        layout.addWidget(self._max_jobs)
+        return layout
+
     def _set_layout(self) -> None:
         """TODO"""
         layout = QVBoxLayout()
         layout.addLayout(self._create_top_layout())
-        layout.addWidget(self._download_button)
+        layout.addLayout(self._create_queue_controls_layout())
+        layout.addWidget(self._queue_list)
         self.setLayout(layout)
@@ -0,0 +1,189 @@
+from PyQt5.QtWidgets import (
+    QWidget, QFrame, QScrollArea, QPushButton, QProgressBar, QVBoxLayout,
+    QHBoxLayout
+)
+from PyQt5.QtCore import pyqtSignal, Qt
+from UI.custom_widgets.feedback import Worker
+from UI.custom_widgets.labels import RegularLabel, SmallLabel
+from scraper.async_downloader import download_and_merge_data_async
+from scraper.download_queue import QueuedDownload
+
+
+class DownloadJob(QFrame):
+    """
+    A queued region download. Shows the region's name, the download's
+    progress and status, and buttons to pause, resume or cancel it. The
+    download runs on a Worker of its own, so several jobs run at once.
+
+    Attributes:
+        _area_id (str): the region's id
+        _area_name (str): the region's name
+        _worker (Worker): thread running the download
+        _stopping (str | None): 'paused' or 'cancelled' while the worker
+            is being stopped on request
+
+    Signals:
+        pause_clicked (pyqtSignal[str]): the region's pause button was clicked
+        resume_clicked (pyqtSignal[str]): the region's resume button was
+            clicked
+        cancel_clicked (pyqtSignal[str]): the region's cancel button was
+            clicked
+        succeeded (pyqtSignal[str]): the region was downloaded
+        stopped (pyqtSignal[str, str, str]): the download stopped with the
+            region, the reason ('paused', 'cancelled' or 'failed') and the
+            error message
+    """
+    _area_id: str
+    _area_name: str
+    _worker: Worker
+    _stopping: str | None
+
+    pause_clicked = pyqtSignal(str)
+    resume_clicked = pyqtSignal(str)
+    cancel_clicked = pyqtSignal(str)
+    succeeded = pyqtSignal(str)
+    stopped = pyqtSignal(str, str, str)
+
+    def __init__(self, job: QueuedDownload, *, parent: QWidget) -> None:
+        """
+        Args:
+            job (QueuedDownload): the queued download
+            parent (QWidget): The parent of the widget
+        """
+        super().__init__(parent=parent)
+        self._area_id = job['area_id']
+        self._area_name = job['area_name']
+        self._stopping = None
+        self._worker = Worker(download_and_merge_data_async, parent=self)
+        self._name = RegularLabel(self._area_name, parent=self)
+        self._status = SmallLabel('', parent=self)
+        self._progress_bar = QProgressBar(self)
+        self._progress_bar.setRange(0, 100)
+        self._pause_button = QPushButton('Pause', parent=self)
+        self._cancel_button = QPushButton('Cancel', parent=self)
+        self._connect_widgets()
+        self._set_layout()
+        self.set_status(job['status'], job['error'])
+
+    @property
+    def area_name(self) -> str:
+        """Returns the region's name"""
+        return self._area_name
+
+    def _connect_widgets(self) -> None:
+        """Connects the children widgets to one another"""
+        self._worker.progress.connect(self._progress_bar.setValue)
+        self._worker.success.connect(
+            lambda: self.succeeded.emit(self._area_name)
+        )
+        self._worker.error.connect(self._on_error)
+        self._pause_button.clicked.connect(self._on_pause_clicked)
+        self._cancel_button.clicked.connect(
+            lambda: self.cancel_clicked.emit(self._area_name)
+        )
+
+    def _set_layout(self) -> None:
+        """Sets the layout of the widget and adds a border"""
+        top = QHBoxLayout()
+        top.addWidget(self._name)
+        top.addStretch()
+        top.addWidget(self._status)
+        bottom = QHBoxLayout()
+        for widget in [
+            self._progress_bar, self._pause_button, self._cancel_button
+        ]:
+            bottom.addWidget(widget)
+        layout = QVBoxLayout()
+        layout.addLayout(top)
+        layout.addLayout(bottom)
+        self.setLayout(layout)
+        self.setFrameStyle(QFrame.StyledPanel | QFrame.Plain)
+        self.setLineWidth(1)
+
+    def _on_pause_clicked(self) -> None:
+        """Asks to pause the download if it is active or resume it if not"""
+        if self._pause_button.text() == 'Pause':
+            self.pause_clicked.emit(self._area_name)
+        else:
+            self.resume_clicked.emit(self._area_name)
+
+    def _on_error(self, msg: str) -> None:
+        """Reports why the worker stopped"""
+        reason, self._stopping = self._stopping or 'failed', None
+        self.stopped.emit(self._area_name, reason, msg)
+
+    def set_status(self, status: str, error: str | None = None) -> None:
+        """Displays the download's status"""
+        self._status.update_text(
+            f'Failed: {error}' if status == 'failed' and error
+            else status.title()
+        )
+        active = status in ['queued', 'running']
+        self._pause_button.setText('Pause' if active else 'Resume')
+
+    def start(self) -> None:
+        """Starts downloading the region"""
+        self._worker.set_args(self._area_id, self._area_name)
+        self._worker.start()
+        self.set_status('running')
+
+    def stop(self, reason: str) -> None:
+        """
+        Stops the running download. The stopped signal is emitted with the
+        reason once the worker has stopped.
+
+        Args:
+            reason (str): 'paused' or 'cancelled'
+        """
+        self._stopping = reason
+        self._worker.cancel()
+
+    def is_running(self) -> bool:
+        """Returns true if the worker is still running"""
+        return self._worker.isRunning()
+
+    def wait(self) -> None:
+        """Blocks until the worker's thread has finished"""
+        self._worker.wait()
+
+
+class DownloadQueueList(QScrollArea):
+    """
+    Scrollable list of the queued downloads
+
+    Attributes:
+        _jobs (dict[str, DownloadJob]): the listed downloads by region
+    """
+    _jobs: dict[str, DownloadJob]
+
+    def __init__(self, *, parent: QWidget) -> None:
+        super().__init__(parent=parent)
+        self._container = QWidget(parent=self)
+        self._layout = QVBoxLayout()
+        self._layout.addStretch()
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self._container.setLayout(self._layout)
+        self._jobs = {}
+        self.setWidget(self._container)
+        self.setWidgetResizable(True)
+
+    def add_job(self, job: QueuedDownload) -> DownloadJob:
+        """Lists the queued download and returns its widget"""
+        widget = DownloadJob(job, parent=self._container)
+        self._layout.insertWidget(
+            self._layout.count() - 1, widget, alignment=Qt.AlignTop
+        )
+        self._jobs[job['area_name']] = widget
+        return widget
+
+    def get_job(self, area_name: str) -> DownloadJob | None:
+        """Returns the widget of the region's download"""
+        return self._jobs.get(area_name)
+
+    def remove_job(self, area_name: str) -> None:
+        """Removes the region's download from the list"""
+        widget = self._jobs.pop(area_name, None)
+        if widget:
+            widget.wait()
+            self._layout.removeWidget(widget)
+            widget.deleteLater()
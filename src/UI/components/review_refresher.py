@@ -0,0 +1,96 @@
+import os
+from PyQt5.QtWidgets import QWidget, QFrame, QVBoxLayout
+from PyQt5.QtCore import pyqtSignal
+from UI.custom_widgets.feedback import ButtonWithProgressBar
+from UI.custom_widgets.inputs import DropDown
+from UI.custom_widgets.labels import HeaderLabel
+from scraper.cancellation import CancellationToken
+from scraper.refresh import refresh_region_reviews
+
+
+class ReviewRefresher(QFrame):
+    """
+    Refreshes the review counts of a downloaded region. Only the region's
+    review pages are requested, its json source is updated in place and the
+    new counts are emitted, so the routes' scores can be updated without
+    downloading the region again.
+
+    Attributes:
+        _regions (list[str]): the downloaded regions
+        _changes (dict[str, int]): counts changed by the last refresh
+
+    Signals:
+        reviews_refreshed (pyqtSignal[str, dict]): the region and the new
+            number of reviewers by route id of the routes that changed
+    """
+    _regions: list[str]
+    _changes: dict[str, int]
+
+    reviews_refreshed = pyqtSignal(str, dict)
+
+    def __init__(self, regions: list[str], *, parent: QWidget) -> None:
+        """
+        Args:
+            regions (list[str]): the downloaded regions
+            parent (QWidget): The parent of the widget
+        """
+        super().__init__(parent=parent)
+        self._regions = sorted(regions)
+        self._changes = {}
+        self._current_region = None
+        parent_dir = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), 'Icons'
+        )
+        self._title = HeaderLabel('Review Counts', parent=self)
+        self._region = DropDown(
+            self._regions, 'Region', 'Please select', parent=self
+        )
+        self._refresh_button = ButtonWithProgressBar(
+            'Refresh Reviews',
+            self._refresh,
+            error_icon_path=os.path.join(parent_dir, 'warning.png'),
+            success_icon_path=os.path.join(parent_dir, 'check.png'),
+            success_msg='Review counts successfully refreshed!',
+            parent=self
+        )
+        self._connect_widgets()
+        self._set_layout()
+
+    def _connect_widgets(self) -> None:
+        """Connects the children widgets to one another"""
+        self._region.item_changed.connect(self._update_args)
+        self._refresh_button.finished.connect(
+            lambda: self.reviews_refreshed.emit(
+                self._current_region, self._changes
+            )
+        )
+
+    def _set_layout(self) -> None:
+        """Sets the layout of the widget"""
+        layout = QVBoxLayout()
+        for widget in [self._title, self._region, self._refresh_button]:
+            layout.addWidget(widget)
+        self.setLayout(layout)
+
+    def _refresh(
+        self, region: str, callback, *,
+        cancel_token: CancellationToken | None = None
+    ) -> None:
+        """Refreshes the region's reviews. Runs on the button's worker."""
+        self._changes = refresh_region_reviews(
+            region, callback, cancel_token=cancel_token
+        )
+
+    def _update_args(self, region: str | None) -> None:
+        """Selects the region refreshed by the button"""
+        if region and not self._refresh_button.is_running():
+            self._refresh_button.set_args(region)
+            self._current_region = region
+        return
+
+    def add_region(self, region: str) -> None:
+        """Lists a newly downloaded region"""
+        if region not in self._regions:
+            self._regions = sorted(self._regions + [region])
+            self._region.update_items(self._regions)
+        return
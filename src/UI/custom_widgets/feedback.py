@@ -1,3 +1,5 @@
+import asyncio
+import inspect
 from typing import Any, Callable
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
@@ -6,6 +8,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import QThread, pyqtSignal
 from UI.custom_widgets.labels import IconLabel
+from scraper.cancellation import CancellationToken, DownloadCancelled
+from utils.progress import ProgressThrottle
 
 
 class _StatusMessage(QFrame):
@@ -72,6 +76,15 @@ class Worker(QThread):
         _args (Any):
             Arguments passed to the generator function. Must be set prior to
             calling the run method
+        _loop (asyncio.AbstractEventLoop | None):
+            event loop running the function if it is a coroutine function
+        _task (asyncio.Task | None):
+            task running the coroutine, cancelled by the cancel method
+        _cancel_token (CancellationToken):
+            token of the current run, passed to functions that accept a
+            cancel_token keyword and cancelled by the cancel method
+        _throttle (ProgressThrottle):
+            coalesces the progress updates so the UI thread is not flooded
 
     Signals:
         progress (pyqtSignal[int]):
@@ -92,6 +105,11 @@ class Worker(QThread):
     def __init__(self, func: Callable[..., int], *, parent: QWidget):
         super().__init__(parent=parent)
         self._func = func
+        self._loop = None
+        self._task = None
+        self._kwargs = {}
+        self._cancel_token = CancellationToken()
+        self._throttle = ProgressThrottle(self.progress.emit)
 
     def set_args(self, *args) -> None:
         """
@@ -102,22 +120,60 @@ class Worker(QThread):
             *args (any): must match the signature of the given function
         """
         self._args = args + (self.callback, )
+        self._kwargs = {}
+        self._cancel_token = CancellationToken()
+        if 'cancel_token' in inspect.signature(self._func).parameters:
+            self._kwargs['cancel_token'] = self._cancel_token
 
     def callback(self, num: int) -> None:
         """
-        Emits the progress signal. Passed to the function saved.
+        Emits the progress signal, unless throttled. Passed to the function
+        saved.
         """
-        self.progress.emit(num)
+        self._throttle.update(num)
+
+    def cancel(self) -> None:
+        """
+        Cancels the current run. Safe to call from any thread. Coroutines
+        are cancelled at once, functions that accept a cancel_token stop at
+        their next request or streamed chunk. Has no effect on other
+        functions.
+        """
+        self._cancel_token.cancel()
+        loop, task = self._loop, self._task
+        if loop and task:
+            loop.call_soon_threadsafe(task.cancel)
+
+    async def _run_async(self) -> None:
+        """Runs the saved coroutine function as a cancellable task"""
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        try:
+            await self._func(*self._args, **self._kwargs)
+        finally:
+            self._loop = self._task = None
 
     def run(self) -> None:
         """
         Runs the saved generator and regularly emits a progress update.
+        Coroutine functions are run on an event loop owned by the thread.
         If an error is encountered, the error is emitted via the error signal.
-        A success signal is emitted on completion.
+        A success signal is emitted on completion. The last progress update
+        is flushed before either signal, even if the function failed or was
+        cancelled.
         """
+        self._throttle.reset()
         try:
-            self._func(*self._args)
+            try:
+                if inspect.iscoroutinefunction(self._func):
+                    asyncio.run(self._run_async())
+                else:
+                    self._func(*self._args, **self._kwargs)
+            finally:
+                self._throttle.flush()
             self.success.emit()
+        except (asyncio.CancelledError, DownloadCancelled):
+            self.error.emit('Cancelled')
         except Exception as e:
             self.error.emit(str(e))
 
@@ -63,6 +63,11 @@ class HomePage(QWidget):
         # Sort & Calculation done regardless of actual change
         self._data.calculate_stats()
         self._data.sort()
+        self.update_view()
+        return
+
+    def update_view(self) -> None:
+        """Updates the data displayed without recalculating it"""
         node = self._side_bar.current_node
         self._area_stats.update(node)
         self._side_bar.refresh()
@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 from PyQt5.QtCore import pyqtSignal
 from UI.components.area_downloader import AreaDownloader
+from UI.components.review_refresher import ReviewRefresher
 from UI.components.settings import Settings
 from custom_types.crag import Area
 from custom_types.custom_types import AreaMap
@@ -9,14 +10,17 @@ from custom_types.custom_types import AreaMap
 class SettingsPage(QWidget):
     settings_changed = pyqtSignal()
     new_region_added = pyqtSignal(str)
+    reviews_refreshed = pyqtSignal(str, dict)
 
     def __init__(
-        self, data_root: Area, available_areas: AreaMap, *, parent: QWidget
+        self, data_root: Area, available_areas: AreaMap,
+        downloaded_regions: list[str], *, parent: QWidget
     ) -> None:
         super().__init__(parent=parent)
         self._title = 'Settings'
         self._settings = Settings(data_root, parent=self)
         self._downloader = AreaDownloader(available_areas, parent=self)
+        self._refresher = ReviewRefresher(downloaded_regions, parent=self)
 
         self._connect_widgets()
         self._set_main_layout()
@@ -31,10 +35,14 @@ class SettingsPage(QWidget):
         """
         self._settings.settings_changed.connect(self.settings_changed.emit)
         self._downloader.new_region_added.connect(self.new_region_added.emit)
+        self._downloader.new_region_added.connect(self._refresher.add_region)
+        self._refresher.reviews_refreshed.connect(
+            self.reviews_refreshed.emit
+        )
 
     def _set_main_layout(self) -> None:
         """Sets the main layout of the page"""
         layout = QVBoxLayout()
-        for widget in [self._settings, self._downloader]:
+        for widget in [self._settings, self._downloader, self._refresher]:
             layout.addWidget(widget)
         self.setLayout(layout)
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from custom_types.node import Node
+from custom_types.node import Node, NodeContext
 from custom_types.grade import Grade
 from custom_types.ranking_model import RankingModel
 
@@ -49,6 +49,16 @@ class RouteFilterWidget:
         """Sets the selected route types"""
         self._selected_route_types = route_types[:]
 
+    @property
+    def min_num_pitches(self) -> int:
+        """Returns the minimum number of pitches"""
+        return self._min_num_pitches
+
+    @property
+    def min_length(self) -> int:
+        """Returns the minimum length"""
+        return self._min_len
+
     def set_min_num_pitches(self, val: int) -> None:
         """Sets the minimum number of pitches for the filter"""
         self._min_num_pitches = val
@@ -76,6 +86,47 @@ class RouteFilterWidget:
         )
 
 
+class QueryContext(NodeContext):
+    """
+    A route filter, ranking model, sort keys and display metrics together
+    with the stats calculated for them. Passing a context to the tree's
+    calculate_stats, sort and stat getters keeps its results separate from
+    every other context. Methods called without a context use the tree's
+    default context, which is the one displayed by the UI.
+
+    Attributes:
+        route_filter (RouteFilterWidget): filter applied to the routes
+        ranking_model (RankingModel): model used to score the routes
+        area_metric (str): attribute displayed next to areas
+        crag_metric (str): attribute displayed next to routes
+    """
+    route_filter: RouteFilterWidget
+    ranking_model: RankingModel
+    area_metric: str
+    crag_metric: str
+
+    def __init__(
+        self, route_filter: RouteFilterWidget | None = None,
+        ranking_model: RankingModel | None = None,
+        *, node_sort_key: str = "_name", leaf_sort_key: str = "_name",
+        area_metric: str = "_matching_routes", crag_metric: str = "_rating"
+    ) -> None:
+        super().__init__(
+            node_sort_key=node_sort_key, leaf_sort_key=leaf_sort_key
+        )
+        self.route_filter = route_filter or RouteFilterWidget()
+        self.ranking_model = ranking_model or RankingModel()
+        self.area_metric = area_metric
+        self.crag_metric = crag_metric
+
+
+def format_metric(metric: int | float | str) -> str:
+    """Returns the metric as displayed next to a node's name"""
+    if isinstance(metric, float):
+        return f" ({round(metric, 1)})"
+    return f" ({metric})"
+
+
 class Area(Node):
 
     _name: str
@@ -84,17 +135,9 @@ class Area(Node):
     _coordinates: tuple[float, float]
     _children: list[Area] | list[Route]
     _total_routes: int
-    _matching_routes: int
-    _popularity: int
-    _rating: float
-    _score: float
-    _avg_popularity: float
-    _avg_rating: float
-    _avg_score: float
     _route_types: dict[str, int]
 
-    _route_filter: RouteFilterWidget = RouteFilterWidget()
-    _ranking_model: RankingModel = RankingModel()
+    _default_context: QueryContext = QueryContext()
     _node_attributes: dict[str, str] = {
         "name": "_name",
         "matches": "_matching_routes",
@@ -115,32 +158,31 @@ class Area(Node):
         "number of pitches": "_num_pitches",
         "length": "_length"
     }
-    _metric: str = "_matching_routes"
+    # Attributes that depend on a context and are stored within it
+    _context_attributes: set[str] = {
+        "_matching_routes", "_popularity", "_rating", "_score",
+        "_avg_popularity", "_avg_rating", "_avg_score"
+    }
 
     def __init__(self, name: str, parent: Area | None = None):
         super().__init__(name, parent=parent)
 
         self._coordinates = None
         self._total_routes = 0
-        self._matching_routes = 0
-        self._popularity = 0
-        self._rating = 0
-        self._score = 0
-        self._avg_popularity = 0
-        self._avg_rating = 0
-        self._avg_score = 0
+        route_filter = type(self)._default_context.route_filter
         self._route_types = {
-            route_type: 0 for route_type in Area._route_filter.route_types
+            route_type: 0 for route_type in route_filter.route_types
         }
         self._grades = Grade.init_grade_dict()
 
     def __str__(self):
-        metric = getattr(self, Area._metric)
-        if isinstance(metric, float):
-            metric = f" ({(round(metric, 1))})"
-        else:
-            metric = f" ({metric})"
-        return f"{self._name}{metric}"
+        return self.get_label()
+
+    def get_label(self, context: QueryContext | None = None) -> str:
+        """Returns the area's name and the context's area metric"""
+        context = context or type(self)._default_context
+        metric = self.get_value(context.area_metric, context)
+        return f"{self._name}{format_metric(metric)}"
 
     @property
     def coordinates(self) -> tuple[float, float] | None:
@@ -155,8 +197,8 @@ class Area(Node):
 
     @property
     def route_filter(self) -> RouteFilterWidget:
-        """Returns the class filter attribute"""
-        return type(self)._route_filter
+        """Returns the default context's filter"""
+        return type(self)._default_context.route_filter
 
     @property
     def total_num_routes(self) -> int:
@@ -164,7 +206,7 @@ class Area(Node):
 
     @property
     def num_matching_routes(self) -> int:
-        return self._matching_routes
+        return self.get_value("_matching_routes")
 
     @property
     def route_types(self) -> dict[str, int]:
@@ -177,7 +219,49 @@ class Area(Node):
     @property
     def models(self) -> list[str]:
         """Returns the available ranking model options"""
-        return type(self)._ranking_model.get_options()
+        return RankingModel.get_options()
+
+    def get_value(
+        self, attribute: str, context: QueryContext | None = None
+    ) -> int | float | str:
+        """
+        Returns the value of the attribute. Stats are returned from the
+        given (or default) context.
+        """
+        if attribute in type(self)._context_attributes:
+            context = context or type(self)._default_context
+            return context.get_stats(self).get(attribute.lstrip("_"), 0)
+        return getattr(self, attribute)
+
+    def get_crags(self) -> list[Area]:
+        """Returns all of the crags (i.e., leaf parents) within the area"""
+        if self.is_leaf_parent:
+            return [self]
+        crags = []
+        for area in self._children:
+            crags.extend(area.get_crags())
+        return crags
+
+    def get_routes(self) -> list[Route]:
+        """Returns all of the routes within the area"""
+        return [route for crag in self.get_crags() for route in crag.children]
+
+    def find_subarea(self, path: list[str]) -> Area | None:
+        """
+        Returns the subarea at the end of the given path or None if the path
+        does not exist.
+
+        Args:
+            path (list[str]): [Main Area, Subarea, ..., Subarea]
+        """
+        if not path:
+            return self
+        if self.is_leaf_parent:
+            return None
+        for area in self._children:
+            if area.name == path[0]:
+                return area.find_subarea(path[1:])
+        return None
 
     def get_area_metrics(self) -> list[str]:
         """
@@ -188,9 +272,12 @@ class Area(Node):
             metrics.remove(metric)
         return metrics
 
-    def set_area_metric(self, metric: str) -> None:
+    def set_area_metric(
+        self, metric: str, context: QueryContext | None = None
+    ) -> None:
         """Sets the metric that is displayed"""
-        type(self)._metric = type(self)._node_attributes.get(metric.lower())
+        context = context or type(self)._default_context
+        context.area_metric = type(self)._node_attributes.get(metric.lower())
 
     def get_crag_metrics(self) -> list[str]:
         """
@@ -201,13 +288,19 @@ class Area(Node):
             metrics.remove(metric)
         return metrics
 
-    def set_crag_metric(self, metric: str) -> None:
+    def set_crag_metric(
+        self, metric: str, context: QueryContext | None = None
+    ) -> None:
         """Sets the metric that is displayed"""
-        Route._metric = type(self)._leaf_attributes.get(metric.lower())
+        context = context or type(self)._default_context
+        context.crag_metric = type(self)._leaf_attributes.get(metric.lower())
 
-    def set_ranking_model(self, model: str) -> None:
+    def set_ranking_model(
+        self, model: str, context: QueryContext | None = None
+    ) -> None:
         """Sets the ranking model"""
-        type(self)._ranking_model.set_model(model)
+        context = context or type(self)._default_context
+        context.ranking_model.set_model(model)
         return
 
     def calculate_area_stats(self) -> int:
@@ -240,60 +333,92 @@ class Area(Node):
                     )
         return
 
-    def init_stats(self) -> None:
+    def init_stats(self, context: QueryContext | None = None) -> None:
         self.calculate_area_stats()
-        self.calculate_stats()
+        self.calculate_stats(context)
         return
 
-    def reset_stats(self) -> None:
-        """Method to reset the stats"""
-        self._matching_routes = 0
-        self._popularity = 0
-        self._rating = 0
-        self._score = 0
-
-    def get_stats(self) -> dict[str, int | float]:
-        return {
-            "matching_routes": self._matching_routes,
-            "popularity": self._popularity,
-            "rating": self._rating,
-            "score": self._score,
-        }
+    def get_stats(
+        self, context: QueryContext | None = None
+    ) -> dict[str, int | float]:
+        """Returns the area's stats from the given (or default) context"""
+        context = context or type(self)._default_context
+        return context.get_stats(self)
 
-    def increment_stats(self, child_stats: dict[str, int]) -> None:
-        """Increments stats based on the children's stats"""
-        self._matching_routes += child_stats.get("matching_routes", 0)
-        self._popularity += child_stats.get("popularity", 0)
-        self._rating += child_stats.get("rating", 0)
-        self._score += child_stats.get("score", 0)
-
-    def calculate_averages(self) -> None:
-        """Calculates the averaged stats"""
-        avgs = ["_avg_popularity", "_avg_rating", "_avg_score"]
-        stats = ["_popularity", "_rating", "_score"]
-        for avg, stat in zip(avgs, stats):
-            if self._matching_routes == 0:
-                setattr(self, avg, 0)
+    @staticmethod
+    def calculate_averages(
+        stats: dict[str, int | float]
+    ) -> dict[str, int | float]:
+        """Returns the averaged stats"""
+        averages = {}
+        for stat in ["popularity", "rating", "score"]:
+            if stats["matching_routes"] == 0:
+                averages[f"avg_{stat}"] = 0
             else:
-                val = round((getattr(self, stat) / self._matching_routes), 1)
-                setattr(self, avg, val)
-        self._avg_popularity = int(self._avg_popularity)
-        return
+                averages[f"avg_{stat}"] = round(
+                    stats[stat] / stats["matching_routes"], 1
+                )
+        averages["avg_popularity"] = int(averages["avg_popularity"])
+        return averages
 
-    def calculate_stats(self) -> None:
-        """Calculates the stats based on the class filter"""
-        self.reset_stats()
+    def calculate_stats(self, context: QueryContext | None = None) -> None:
+        """
+        Calculates the stats based on the filter and ranking model of the
+        given (or default) context and saves them to the context.
+        """
+        context = context or type(self)._default_context
+        stats = {
+            "matching_routes": 0, "popularity": 0, "rating": 0, "score": 0
+        }
         for child in self._children:
-            if self.is_leaf_parent:
-                child.calculate_stats(
-                    type(self)._route_filter, type(self)._ranking_model
-                )
-            else:
-                child.calculate_stats()
-            self.increment_stats(child.get_stats())
-        self.calculate_averages()
+            child.calculate_stats(context)
+            child_stats = child.get_stats(context)
+            for stat in stats:
+                stats[stat] += child_stats.get(stat, 0)
+        context.set_stats(self, stats | Area.calculate_averages(stats))
         return
 
+    def update_popularity(
+        self, popularity: dict[str, int], context: QueryContext | None = None
+    ) -> list[Route]:
+        """
+        Sets the number of reviewers of the area's routes found in the given
+        dictionary and updates the stats of the changed routes and of their
+        ancestors, rather than recalculating the whole tree. The children of
+        the updated areas are sorted again: in place without a context,
+        otherwise in the given context if it has been sorted.
+
+        Args:
+            popularity (dict[str, int]): number of reviewers by route id
+            context (QueryContext): optional context, defaults to the tree's
+
+        Returns:
+            list[Route]: the routes whose number of reviewers changed
+        """
+        in_place = context is None
+        context = context or type(self)._default_context
+        routes = [
+            route for route in self.get_routes()
+            if popularity.get(route.id, route.popularity) != route.popularity
+        ]
+        # Ancestors of the changed routes, crags first
+        areas: dict[Area, None] = {}
+        for route in routes:
+            route.set_popularity(popularity[route.id], context)
+            area = route.crag
+            while area is not None and area not in areas:
+                areas[area] = None
+                area = area.parent
+
+        for area in areas:
+            if in_place or context.get_children(area) is not None:
+                sort_key = (
+                    context.leaf_sort_key if area.is_leaf_parent
+                    else context.node_sort_key
+                )
+                area._sort_children(sort_key, context, in_place)
+        return routes
+
 
 class Route(Node):
     _id: str
@@ -305,8 +430,8 @@ class Route(Node):
     _rating: float
     _popularity: int
     _crag: Area | None
-    _stats: dict[str, int | float]
-    _metric: str = "_rating"
+
+    _default_context: QueryContext = Area._default_context
 
     def __init__(
         self,
@@ -321,17 +446,18 @@ class Route(Node):
         self._length = length
         self._rating = rating
         self._popularity = popularity
-        self._score = 0
 
     def __str__(self):
-        metric = getattr(self, Route._metric)
-        if isinstance(metric, float):
-            metric = f" ({round(metric, 1)})"
-        else:
-            # Do not display length metric if it is 1
-            metric = f" ({metric})" if metric > 1 else ""
+        return self.get_label()
 
-        return f"{self._name} {self._grade}{metric}"
+    def get_label(self, context: QueryContext | None = None) -> str:
+        """Returns the route's name, grade and the context's crag metric"""
+        context = context or type(self)._default_context
+        metric = self.get_value(context.crag_metric, context)
+        # Do not display length metric if it is 1
+        if not isinstance(metric, float) and metric <= 1:
+            return f"{self._name} {self._grade}"
+        return f"{self._name} {self._grade}{format_metric(metric)}"
 
     @property
     def crag(self) -> Area:
@@ -343,6 +469,11 @@ class Route(Node):
         """Sets the parent of the route"""
         self._parent = area
 
+    @property
+    def id(self) -> str:
+        """Returns the route's mountain project id"""
+        return self._id
+
     @property
     def name(self) -> str:
         """Returns the name of the route"""
@@ -358,6 +489,11 @@ class Route(Node):
         """Returns the rating of the route"""
         return round(self._rating, 2)
 
+    @property
+    def popularity(self) -> int:
+        """Returns the number of reviewers of the route"""
+        return self._popularity
+
     @property
     def length(self) -> int:
         """Returns the length of the route"""
@@ -373,29 +509,78 @@ class Route(Node):
         """Returns the route's types"""
         return self._route_types
 
-    def _set_stats(self, stats: dict[str, int | float]) -> None:
-        """Sets the route's stats"""
-        self._stats = stats
-
-    def get_stats(self) -> dict[str, int | float]:
-        """Returns the route's stats"""
-        return self._stats
+    def get_value(
+        self, attribute: str, context: QueryContext | None = None
+    ) -> int | float | str | Grade:
+        """
+        Returns the value of the attribute. The score depends on the ranking
+        model of the given (or default) context and is calculated for routes
+        that do not match the context's filter.
+        """
+        if attribute != "_score":
+            return getattr(self, attribute)
+        context = context or type(self)._default_context
+        score = context.get_stats(self).get("score")
+        if score is None:
+            score = context.ranking_model.get_score(
+                self._popularity, self._rating
+            )
+        return score
 
-    def calculate_stats(
-        self, route_filter: RouteFilterWidget, ranking_model: RankingModel
+    def get_stats(
+        self, context: QueryContext | None = None
     ) -> dict[str, int | float]:
+        """Returns the route's stats from the given (or default) context"""
+        context = context or type(self)._default_context
+        return context.get_stats(self)
+
+    def calculate_stats(self, context: QueryContext | None = None) -> None:
         """
-        Calculates the route's stats if it meets the filter requirements
+        Calculates the route's stats if it meets the filter requirements of
+        the given (or default) context and saves them to the context. Routes
+        that do not match have empty stats.
         """
-        if route_filter.is_match(self):
-            self._score = ranking_model.get_score(
+        context = context or type(self)._default_context
+        if not context.route_filter.is_match(self):
+            context.set_stats(self, {})
+            return
+        context.set_stats(self, {
+            'matching_routes': 1,
+            'popularity': self._popularity,
+            'rating': self._rating,
+            'score': context.ranking_model.get_score(
                 self._popularity, self._rating
-            )
-            self._set_stats({
-                'matching_routes': 1,
-                'popularity': self._popularity,
-                'rating': self._rating,
-                'score': self._score,
-            })
-        else:
-            self._set_stats({})
+            ),
+        })
+
+    def set_popularity(
+        self, popularity: int, context: QueryContext | None = None
+    ) -> None:
+        """
+        Sets the number of reviewers of the route. If the route's stats have
+        been calculated in the given (or default) context, its stats are
+        recalculated and the change in popularity and score is added to the
+        stats of its ancestors. The filter does not depend on the number of
+        reviewers, so the number of matching routes is unchanged.
+        """
+        context = context or type(self)._default_context
+        old_stats = context.get_stats(self)
+        self._popularity = popularity
+        if not old_stats:
+            return
+        self.calculate_stats(context)
+        new_stats = context.get_stats(self)
+        changes = {
+            stat: new_stats[stat] - old_stats[stat]
+            for stat in ['popularity', 'score']
+        }
+        area = self._parent
+        while area is not None:
+            stats = dict(area.get_stats(context))
+            if not stats:
+                break
+            for stat, change in changes.items():
+                stats[stat] += change
+            context.set_stats(area, stats | Area.calculate_averages(stats))
+            area = area.parent
+        return
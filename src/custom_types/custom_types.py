@@ -1,4 +1,4 @@
-from typing import TypedDict
+from typing import NotRequired, TypedDict
 
 
 class RouteDetails(TypedDict):
@@ -45,7 +45,30 @@ CSVData = list[list[str]]
 RouteDict = dict[str, RouteDetails]
 
 # Alias for a dictionary that maps route id's to number of reviews
-ReviewStatsDict = dict[str, int]
+ReviewStatsDict = dict[int, int]
+
+
+class AreaEntry(TypedDict):
+    """
+    Represents an area of the area map
+
+    Attributes:
+    -----------
+    id: str
+        The area's id.
+    routes: int
+        The total number of routes in the area.
+    grades: dict[str, int]
+        The area's number of routes per grade, if it has been crawled.
+    sub_areas: dict[str, AreaEntry]
+        The area's sub-areas by name, if the area is too large to be
+        downloaded at once.
+    """
+    id: str
+    routes: int
+    grades: NotRequired[dict[str, int]]
+    sub_areas: NotRequired[dict[str, 'AreaEntry']]
+
 
 # Alias for a dictionary that contains areas and high level information
-AreaMap = dict[str, dict[str, str | int]]
+AreaMap = dict[str, AreaEntry]
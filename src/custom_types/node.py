@@ -1,6 +1,55 @@
 from __future__ import annotations
 
 
+class NodeContext:
+    """
+    Holds the keys used to sort a tree together with the results calculated
+    for them. Results are stored per node within the context rather than on
+    the nodes, so one tree may be evaluated with several contexts at once
+    (i.e., side by side comparisons or a background precompute) as long as
+    each context is only used by one thread at a time.
+
+    Attributes:
+        node_sort_key (str): attribute used to sort internal nodes
+        leaf_sort_key (str): attribute used to sort leaves
+        _stats (dict): calculated stats by node
+        _children (dict): sorted children by node
+    """
+    node_sort_key: str
+    leaf_sort_key: str
+    _stats: dict[Node, dict[str, int | float]]
+    _children: dict[Node, list[Node]]
+
+    def __init__(
+        self, *, node_sort_key: str = "_name", leaf_sort_key: str = "_name"
+    ) -> None:
+        self.node_sort_key = node_sort_key
+        self.leaf_sort_key = leaf_sort_key
+        self._stats = {}
+        self._children = {}
+
+    def get_stats(self, node: Node) -> dict[str, int | float]:
+        """Returns the node's stats or an empty dictionary if not calculated"""
+        return self._stats.get(node, {})
+
+    def set_stats(self, node: Node, stats: dict[str, int | float]) -> None:
+        """Saves the node's stats"""
+        self._stats[node] = stats
+
+    def get_children(self, node: Node) -> list[Node] | None:
+        """Returns the node's sorted children or None if not sorted"""
+        return self._children.get(node)
+
+    def set_children(self, node: Node, children: list[Node]) -> None:
+        """Saves the node's sorted children"""
+        self._children[node] = children
+
+    def clear(self) -> None:
+        """Removes all of the calculated results"""
+        self._stats.clear()
+        self._children.clear()
+
+
 class Node:
     """
     TODO:
@@ -12,8 +61,8 @@ class Node:
     _is_leaf: bool
 
     # Class attributes
-    _node_sort_key: str = "name"
-    _leaf_sort_key: str = "name"
+    _default_context: NodeContext = NodeContext()
+    _ascending_sort_keys: set[str] = {"_name", "_grade"}
     _node_attributes: dict[str, str] = {}
     _leaf_attributes: dict[str, str] = {}
 
@@ -52,6 +101,37 @@ class Node:
         else:
             return self._children
 
+    @property
+    def path(self) -> list[str]:
+        """
+        Returns the names of the node's ancestors and the node itself. The
+        name of the root is excluded.
+        """
+        if self._parent is None:
+            return []
+        return self._parent.path + [self._name]
+
+    def get_children(self, context: NodeContext | None = None) -> list[Node]:
+        """
+        Returns the node's children in the order set by sorting the given
+        context. The children are returned as stored if the context has not
+        been sorted.
+        """
+        if context is not None:
+            children = context.get_children(self)
+            if children is not None:
+                return children
+        return self.children
+
+    def get_value(
+        self, attribute: str, context: NodeContext | None = None
+    ) -> object:
+        """
+        Returns the value of the attribute. Subclasses return attributes
+        that depend on a context from the given (or default) context.
+        """
+        return getattr(self, attribute)
+
     @property
     def is_leaf(self) -> bool:
         """Returns is_leaf attribute"""
@@ -101,65 +181,59 @@ class Node:
                 self._children.append(child)
         return
 
-    def _set_sort_keys(self, **kwargs) -> None:
+    def set_sort_keys(
+        self, sort_keys: dict[str, str], context: NodeContext | None = None
+    ) -> None:
         """
-        Sets the sorting keys for the entire tree. The sorting keys represent
-        attributes of the node and are passed via a lambda function. Accepted
-        key word arguments are outlined below. Will not changed unspecified
-        keys.
+        Sets the sort keys of the given (or default) context based on the
+        provided dictionary.
 
         Args:
-            - node_sort_key (str): Primary key for sorting internal nodes
-            - leaf_sort_key (str): Primary key for sorting leaves
+            sort_keys (dict[str, str]): labels of the 'node' and 'leaf' keys
+            context (NodeContext): optional context, defaults to the tree's
         """
-        type(self)._node_sort_key = kwargs.get(
-            "node_sort_key", type(self)._node_sort_key
+        context = context or type(self)._default_context
+        context.node_sort_key = (
+            type(self)._node_attributes[sort_keys['node'].lower()]
         )
-
-        type(self)._leaf_sort_key = kwargs.get(
-            "leaf_sort_key", type(self)._leaf_sort_key
+        context.leaf_sort_key = (
+            type(self)._leaf_attributes[sort_keys['leaf'].lower()]
         )
-
-        return
-
-    def set_sort_keys(self, sort_keys: dict[str, str]) -> None:
-        """Sets the sort keys based on the provided dictionary"""
-        node_key = type(self)._node_attributes[sort_keys['node'].lower()]
-        leaf_key = type(self)._leaf_attributes[sort_keys['leaf'].lower()]
-        self._set_sort_keys(node_sort_key=node_key, leaf_sort_key=leaf_key)
         return
 
-    def _sort_internal_node(self) -> None:
-        """Sorts an internal node's children based on the set keys"""
-        reversed_order = (
-            not isinstance(getattr(self, type(self)._node_sort_key), str)
-        )
-        self._children.sort(
-            key=lambda node: getattr(node, type(self)._node_sort_key),
-            reverse=reversed_order
-        )
-
-    def _sort_leaf_nodes(self) -> None:
-        """Sorts the children of a leaf parent node based on the set keys"""
-        # TODO: code smell...
-        bandaid = {'_length': 1, '_num_pitches': 1, '_grade': 'a'}
-        val = getattr(self, type(self)._leaf_sort_key, None)
-        val = bandaid.get(type(self)._leaf_sort_key) if val is None else val
-        reversed_order = not isinstance(val, str)
-        self._children.sort(
-            key=lambda node: getattr(node, type(self)._leaf_sort_key),
-            reverse=reversed_order
+    def _sort_children(
+        self, sort_key: str, context: NodeContext, in_place: bool
+    ) -> None:
+        """
+        Sorts the node's children by the given attribute. Names and grades
+        are sorted in ascending order, everything else in descending order.
+        The children are sorted in place or saved to the context.
+        """
+        children = sorted(
+            self._children,
+            key=lambda node: node.get_value(sort_key, context),
+            reverse=sort_key not in type(self)._ascending_sort_keys
         )
+        if in_place:
+            self._children[:] = children
+        else:
+            context.set_children(self, children)
 
-    def sort(self) -> None:
+    def sort(self, context: NodeContext | None = None) -> None:
         """
         Recursively sorts all of the children node. Does not sort leaf
-        nodes (i.e., sorting stops at leaf parents)
+        nodes (i.e., sorting stops at leaf parents). Without a context, the
+        tree is sorted in place using the default context. Otherwise the
+        sorted children are saved to the given context and the tree is left
+        unchanged.
         """
+        in_place = context is None
+        context = context or type(self)._default_context
+
         # Base case - Sorting stops at the parents of leaf nodes
         if self._is_leaf_parent:
-            self._sort_leaf_nodes()
+            self._sort_children(context.leaf_sort_key, context, in_place)
         else:
             for child in self._children:
-                child.sort()
-            self._sort_internal_node()
+                child.sort(None if in_place else context)
+            self._sort_children(context.node_sort_key, context, in_place)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+import numpy as np
+from custom_types.crag import Area, QueryContext, Route, RouteFilterWidget
+from custom_types.ranking_model import RankingModel
+
+
+class ScenarioResults:
+    """
+    Per crag aggregates for several route filters (scenarios) calculated in
+    a single pass over the routes.
+
+    Attributes:
+        crags (list[Area]): the evaluated crags, in the order of the rows
+        scenarios (list[RouteFilterWidget]): filters, in column order
+        ranking_model (RankingModel): model used to score the routes
+        stats (dict[str, np.ndarray]): crags x scenarios matrices of the
+            summed 'matching_routes', 'popularity', 'rating' and 'score'
+    """
+    crags: list[Area]
+    scenarios: list[RouteFilterWidget]
+    ranking_model: RankingModel
+    stats: dict[str, np.ndarray]
+
+    def __init__(
+        self, crags: list[Area], scenarios: list[RouteFilterWidget],
+        ranking_model: RankingModel, stats: dict[str, np.ndarray]
+    ) -> None:
+        self.crags = crags
+        self.scenarios = scenarios
+        self.ranking_model = ranking_model
+        self.stats = stats
+
+    def get_stats(self, crag_idx: int, scenario: int) -> dict[str, float]:
+        """Returns the crag's summed stats for the scenario"""
+        stats = {
+            stat: values[crag_idx, scenario].item()
+            for stat, values in self.stats.items()
+        }
+        stats['matching_routes'] = int(stats['matching_routes'])
+        stats['popularity'] = int(stats['popularity'])
+        return stats
+
+    def to_context(self, scenario: int) -> QueryContext:
+        """
+        Returns a context holding the scenario's crag stats, so the results
+        can be ranked and displayed like any other context. Only the crags'
+        stats are stored.
+
+        Args:
+            scenario (int): index of the scenario
+        """
+        context = QueryContext(self.scenarios[scenario], self.ranking_model)
+        for idx, crag in enumerate(self.crags):
+            stats = self.get_stats(idx, scenario)
+            context.set_stats(crag, stats | Area.calculate_averages(stats))
+        return context
+
+
+def _collect_routes(crags: list[Area]) -> tuple[list[Route], np.ndarray]:
+    """
+    Returns the crags' routes and the index of each crag's first route.
+    Crags always contain at least one route.
+    """
+    routes = []
+    offsets = []
+    for crag in crags:
+        offsets.append(len(routes))
+        routes.extend(crag.children)
+    return routes, np.array(offsets, dtype=np.intp)
+
+
+def build_match_matrix(
+    routes: list[Route], scenarios: list[RouteFilterWidget]
+) -> np.ndarray:
+    """
+    Returns a routes x scenarios boolean matrix where each cell is true if
+    the route matches the scenario's filter. Produces the same result as
+    calling RouteFilterWidget.is_match for every pair.
+
+    Grade ranges are evaluated once per distinct grade (using the loose
+    grade equivalency of Grade.is_in_range) and route types are compared as
+    bit masks.
+
+    Args:
+        routes (list[Route]): routes being matched
+        scenarios (list[RouteFilterWidget]): filters being applied
+    """
+    grade_idx = {}
+    route_grades = np.empty(len(routes), dtype=np.intp)
+    type_bits = {}
+    route_types = np.zeros(len(routes), dtype=np.int64)
+    num_pitches = np.empty(len(routes), dtype=np.int64)
+    lengths = np.empty(len(routes), dtype=np.int64)
+    for idx, route in enumerate(routes):
+        route_grades[idx] = grade_idx.setdefault(route.grade, len(grade_idx))
+        for route_type in route.route_types:
+            bit = type_bits.setdefault(route_type, 1 << len(type_bits))
+            route_types[idx] |= bit
+        num_pitches[idx] = route.num_pitches
+        lengths[idx] = route.length
+
+    grades = list(grade_idx.keys())
+    matches = np.empty((len(routes), len(scenarios)), dtype=bool)
+    for col, scenario in enumerate(scenarios):
+        grade_matches = np.array([
+            grade.is_in_range(scenario.lower_grade, scenario.upper_grade)
+            for grade in grades
+        ], dtype=bool)
+        type_mask = 0
+        for route_type in scenario.route_types:
+            type_mask |= type_bits.get(route_type, 0)
+        matches[:, col] = (
+            (num_pitches >= scenario.min_num_pitches)
+            & (lengths >= scenario.min_length)
+            & ((route_types & type_mask) != 0)
+            & (grade_matches[route_grades] if len(grades) else False)
+        )
+    return matches
+
+
+def evaluate_scenarios(
+    area: Area, scenarios: list[RouteFilterWidget],
+    ranking_model: RankingModel | None = None
+) -> ScenarioResults:
+    """
+    Calculates the stats of every crag within the area for each scenario in
+    a single pass over the routes, rather than calling calculate_stats once
+    per filter.
+
+    Args:
+        area (Area): the area the crags are selected from
+        scenarios (list[RouteFilterWidget]): filters to be evaluated
+        ranking_model (RankingModel): model used to score the routes
+
+    Returns:
+        ScenarioResults: per crag aggregates for every scenario
+    """
+    ranking_model = ranking_model or RankingModel()
+    crags = area.get_crags()
+    routes, offsets = _collect_routes(crags)
+    matches = build_match_matrix(routes, scenarios)
+
+    popularity = np.array(
+        [route.get_value('_popularity') for route in routes], dtype=float
+    )
+    rating = np.array(
+        [route.get_value('_rating') for route in routes], dtype=float
+    )
+    score = np.array([
+        ranking_model.get_score(pop, rtg)
+        for pop, rtg in zip(popularity.tolist(), rating.tolist())
+    ], dtype=float)
+
+    stats = {}
+    if len(routes) == 0:
+        empty = np.zeros((0, len(scenarios)))
+        stats = {stat: empty for stat in [
+            'matching_routes', 'popularity', 'rating', 'score'
+        ]}
+    else:
+        stats['matching_routes'] = np.add.reduceat(
+            matches.astype(np.int64), offsets, axis=0
+        )
+        for stat, values in [
+            ('popularity', popularity), ('rating', rating), ('score', score)
+        ]:
+            stats[stat] = np.add.reduceat(
+                np.where(matches, values[:, None], 0.0), offsets, axis=0
+            )
+    return ScenarioResults(crags, scenarios, ranking_model, stats)
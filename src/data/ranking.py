@@ -0,0 +1,115 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import json
+import sys
+from typing import TextIO
+from custom_types.crag import Area, QueryContext
+
+Row = dict[str, str | int | float]
+
+
+def rank_areas(
+    areas: list[Area], sort_key: str, top: int | None = None,
+    context: QueryContext | None = None
+) -> list[Area]:
+    """
+    Returns the areas ordered by the given sort key. The areas' stats must
+    be calculated for the context beforehand. Names are sorted
+    alphabetically, all other stats in descending order. Raises a
+    ValueError if top is negative.
+
+    Args:
+        areas (list[Area]): the areas being ranked
+        sort_key (str): one of the area's node sort keys (i.e., 'Score')
+        top (int): optional maximum number of areas returned, 0 or None
+            returns every area
+        context (QueryContext): optional context, defaults to the tree's
+    """
+    if top is not None and top < 0:
+        raise ValueError(f'top must not be negative: {top}')
+    attribute = Area._node_attributes[sort_key.lower()]
+    areas = sorted(
+        areas, key=lambda area: area.get_value(attribute, context),
+        reverse=attribute not in Area._ascending_sort_keys
+    )
+    return areas[:top] if top else areas
+
+
+def rank_crags(
+    area: Area, sort_key: str, top: int | None = None,
+    context: QueryContext | None = None
+) -> list[Area]:
+    """
+    Returns the crags within the area ordered by the given sort key. The
+    area's stats must be calculated for the context beforehand.
+
+    Args:
+        area (Area): the area the crags are selected from
+        sort_key (str): one of the area's node sort keys (i.e., 'Score')
+        top (int): optional maximum number of crags returned
+        context (QueryContext): optional context, defaults to the tree's
+    """
+    return rank_areas(area.get_crags(), sort_key, top, context)
+
+
+def crag_to_row(crag: Area, context: QueryContext | None = None) -> Row:
+    """
+    Returns a flat dictionary with the crag's path and all of its stats
+
+    Args:
+        crag (Area): the crag being converted
+        context (QueryContext): optional context, defaults to the tree's
+    """
+    row = {'path': ' > '.join(crag.path)}
+    for label, attribute in Area._node_attributes.items():
+        row[label] = crag.get_value(attribute, context)
+    return row
+
+
+def calculate_contexts(
+    area: Area, contexts: list[QueryContext], max_workers: int = 4
+) -> None:
+    """
+    Calculates the area's stats for each context concurrently. Each context
+    stores its own results, so the calculations do not share any state.
+
+    Args:
+        area (Area): the area the stats are calculated for
+        contexts (list[QueryContext]): contexts to be calculated
+        max_workers (int): maximum number of threads
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(area.calculate_stats, context)
+            for context in contexts
+        ]
+        for future in futures:
+            future.result()
+    return
+
+
+def write_rankings(
+    rows: list[Row], fmt: str, output: TextIO = sys.stdout
+) -> None:
+    """
+    Writes the ranked rows in the given format.
+
+    Args:
+        rows (list[Row]): the ranked rows
+        fmt (str): 'csv' or 'json'
+        output (TextIO): stream the rankings are written to
+    """
+    rows = [
+        {'rank': rank} | row for rank, row in enumerate(rows, start=1)
+    ]
+    if fmt == 'json':
+        json.dump(rows, output, indent=2)
+        output.write('\n')
+        return
+
+    fieldnames = ['rank', 'path'] + list(Area._node_attributes.keys())
+    writer = csv.DictWriter(output, fieldnames=fieldnames, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+    return
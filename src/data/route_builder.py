@@ -29,6 +29,15 @@ def get_region_fp(region: str) -> str:
     return
 
 
+def get_downloaded_regions() -> list[str]:
+    """Returns the names of the regions that have been downloaded"""
+    src = os.path.join(os.path.dirname(__file__), 'crags_by_area')
+    return [
+        file.split('.')[0].replace('_', ' ').title()
+        for file in os.listdir(src) if file.endswith('.json')
+    ]
+
+
 def get_areas_available_for_download():
     """Returns all of the areas that have not been downloaded"""
     src = os.path.join(os.path.dirname(__file__), 'crags_by_area')
@@ -188,7 +197,7 @@ def build_area_tree_threaded() -> Area:
     """
 
     root = Area('Rock Radar')
-    usa = Area('')
+    usa = Area('USA')
     countries: list[Area] = []
     lock = threading.Lock()
     src_files = []
@@ -202,7 +211,8 @@ def build_area_tree_threaded() -> Area:
                 add_subtree_to_list, countries, fp, usa, lock
             )
 
-    countries.append(usa)
+    if usa.children:
+        countries.append(usa)
     for country in countries:
         root.add_child(country)
         country.parent = root
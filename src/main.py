@@ -1,15 +1,35 @@
+import argparse
+import fnmatch
+import os
 import sys
 import time
 from typing import Callable, Any
-from PyQt5.QtWidgets import QApplication
-from UI.app import MainWindow
-from data.route_builder import build_area_tree, build_area_tree_threaded
-from parser.parser import build_json_sources
-from scraper.scraper import save_area_ids
+
+# Modules imported by each command. Imports are deferred to the command's
+# function so headless commands never pay for PyQt or the scraper.
+COMMAND_IMPORTS: dict[str, list[str]] = {
+    'start-app': ['PyQt5.QtWidgets', 'UI.app'],
+    'get-areas': ['scraper.scraper'],
+    'save-region': ['scraper.downloader', 'parser.parser'],
+    'build-src-data': ['parser.parser'],
+    'measure-load-speed': ['data.route_builder'],
+    'rank': ['data.route_builder', 'data.ranking'],
+    'serve': ['data.route_builder', 'service.server'],
+    'benchmark-scraper': ['scraper.benchmark'],
+    'benchmark-parsing': ['scraper.benchmark'],
+    'benchmark-download': ['scraper.benchmark'],
+    'plan-download': [
+        'scraper.catalog', 'scraper.downloader', 'scraper.planner'
+    ],
+    'refresh-reviews': ['scraper.refresh'],
+}
 
 
 def start_app():
     """Create an app object and show the window"""
+    from PyQt5.QtWidgets import QApplication
+    from UI.app import MainWindow
+
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -21,6 +41,8 @@ def load_speed_test() -> None:
     Measures the execution time of loading the data using a single thread vs
     multiple threads
     """
+    from data.route_builder import build_area_tree, build_area_tree_threaded
+
     def measure_speed(func: Callable[[], Any], *args) -> int:
         start = time.time()
         func()
@@ -38,20 +60,480 @@ def load_speed_test() -> None:
     return
 
 
-def main(cmd: str):
+def import_time_report(cmd: str | None = None) -> None:
+    """
+    Prints a `python -X importtime` style breakdown of the imports required
+    by the given command, or by every command if none is given.
+
+    Args:
+        cmd (str): optional command to be measured
+    """
+    from utils.import_timer import format_import_report, measure_import_times
+
+    commands = [cmd] if cmd else list(COMMAND_IMPORTS.keys())
+    for command in commands:
+        if command not in COMMAND_IMPORTS:
+            print(f'Unknown command: {command}')
+            continue
+        print(f'== {command} ==')
+        try:
+            entries = measure_import_times(COMMAND_IMPORTS[command])
+        except Exception as e:
+            print(f'Failed to import: {e}')
+            continue
+        print(format_import_report(entries))
+    return
+
+
+def rank(args: argparse.Namespace) -> None:
+    """
+    Loads the area tree, applies the given filter and ranking model and
+    writes the top crags under the given area. Timings are written to stderr
+    so the rankings can be piped.
+
+    Args:
+        args (argparse.Namespace): the parsed rank command arguments
+    """
+    from custom_types.crag import QueryContext, RouteFilterWidget
+    from custom_types.ranking_model import RankingModel
+    from data.ranking import crag_to_row, rank_crags, write_rankings
+    from data.route_builder import build_area_tree, build_area_tree_threaded
+
+    if args.top < 0:
+        sys.exit(f'Invalid top: {args.top}')
+    start = time.perf_counter()
+    root = build_area_tree_threaded() if args.threaded else build_area_tree()
+    loaded = time.perf_counter()
+
+    route_filter = RouteFilterWidget()
+    route_filter.lower_grade = args.min_grade
+    route_filter.upper_grade = args.max_grade
+    route_filter.route_types = args.types
+    route_filter.set_min_length(args.min_length)
+    route_filter.set_min_num_pitches(args.min_pitches)
+    context = QueryContext(route_filter, RankingModel(args.model))
+    root.init_stats(context)
+    calculated = time.perf_counter()
+
+    area = root.find_subarea(args.area)
+    if area is None:
+        sys.exit(f'Area not found: {" > ".join(args.area)}')
+    crags = rank_crags(area, args.sort, args.top, context)
+    rows = [crag_to_row(crag, context) for crag in crags]
+    ranked = time.perf_counter()
+
+    if args.output:
+        with open(args.output, 'w', newline='') as output:
+            write_rankings(rows, args.format, output)
+    else:
+        write_rankings(rows, args.format)
+
+    num_routes = root.total_num_routes
+    stats_time = calculated - loaded
+    print(f'Load: {loaded - start:.3f}s', file=sys.stderr)
+    print(
+        f'Stats: {stats_time:.3f}s '
+        f'({int(num_routes / stats_time) if stats_time else 0} routes/s)',
+        file=sys.stderr
+    )
+    print(f'Rank: {ranked - calculated:.3f}s', file=sys.stderr)
+    return
+
+
+def serve(args: argparse.Namespace) -> None:
+    """
+    Loads the area tree and serves ranking queries over HTTP
+
+    Args:
+        args (argparse.Namespace): the parsed serve command arguments
+    """
+    from data.route_builder import build_area_tree, build_area_tree_threaded
+    from service.server import serve
+
+    root = build_area_tree_threaded() if args.threaded else build_area_tree()
+    root.calculate_area_stats()
+    serve(root, args.host, args.port, args.cache_size)
+    return
+
+
+def benchmark_scraper(args: argparse.Namespace) -> None:
+    """
+    Benchmarks the scraper's HTTP client against a local stand-in server
+
+    Args:
+        args (argparse.Namespace): the parsed benchmark command arguments
+    """
+    from scraper.benchmark import benchmark_client
+
+    benchmark_client(args.requests, args.page_size, args.latency)
+    return
+
+
+def benchmark_parsing(args: argparse.Namespace) -> None:
+    """
+    Benchmarks the scraper's html parsing on saved pages
+
+    Args:
+        args (argparse.Namespace): the parsed benchmark command arguments
+    """
+    from scraper.benchmark import benchmark_parsing
+
+    benchmark_parsing(args.pages, args.repeat)
+    return
+
+
+def benchmark_download(args: argparse.Namespace) -> None:
+    """
+    Benchmarks a download of a recorded area against a local replay server
+
+    Args:
+        args (argparse.Namespace): the parsed benchmark command arguments
+    """
+    from scraper.benchmark import benchmark_download
+
+    benchmark_download(
+        args.recording, args.area_id, args.area_name, latency=args.latency,
+        max_workers=args.workers, parse_processes=args.parse_processes,
+        requests_per_second=args.rate
+    )
+    return
+
+
+def plan_download(args: argparse.Namespace) -> None:
+    """
+    Prints the requests a download of the region would send and the
+    estimated download time without downloading any routes. The download is
+    planned from the area catalog if it covers the region, otherwise the
+    region's area pages are requested.
+
+    Args:
+        args (argparse.Namespace): the parsed plan-download command arguments
+    """
+    from scraper.catalog import load_catalog
+    from scraper.client import get_client
+    from scraper.downloader import load_download_record
+    from scraper.planner import (
+        estimate_download_time, format_plan, plan_download, plan_from_catalog
+    )
+    from utils.utils import extract_data
+
+    areas = extract_data(
+        os.path.join(os.path.dirname(__file__), 'data', 'area_map.json')
+    )
+    if args.region not in areas:
+        sys.exit(f'Region not found: {args.region}')
+    client = get_client()
+    area_id = areas[args.region]['id']
+    catalog = None if args.crawl else load_catalog()
+    plan = catalog and plan_from_catalog(
+        catalog, area_id, args.region,
+        load_download_record(area_id, args.region)
+    )
+    if plan:
+        print('Planned from the area catalog')
+    else:
+        plan = plan_download(
+            area_id, args.region, client=client, max_workers=args.workers
+        )
+    limiter = client.rate_limiter
+    seconds = estimate_download_time(
+        plan, limiter.rate, limiter.max_in_flight
+    )
+    print(format_plan(plan, seconds))
+    return
+
+
+def select_regions(
+    areas: dict[str, Any], patterns: list[str], min_routes: int = 0,
+    max_routes: int | None = None
+) -> list[str]:
+    """
+    Returns the names of the regions matching any of the patterns (names or
+    glob patterns, case insensitive) whose number of routes is within the
+    bounds. Every region is matched if no pattern is given. Exits if a
+    pattern matches no region.
+
+    Args:
+        areas (dict[str, Any]): the regions of the area map
+        patterns (list[str]): region names or glob patterns
+        min_routes (int): minimum number of routes
+        max_routes (int): optional maximum number of routes
+    """
+    names = list(areas.keys())
+    if patterns:
+        selected = set()
+        for pattern in patterns:
+            matches = [
+                name for name in names
+                if fnmatch.fnmatchcase(name.lower(), pattern.lower())
+            ]
+            if not matches:
+                sys.exit(f'Region not found: {pattern}')
+            selected.update(matches)
+        names = [name for name in names if name in selected]
+    return [
+        name for name in names
+        if areas[name]['routes'] >= min_routes
+        and (max_routes is None or areas[name]['routes'] <= max_routes)
+    ]
+
+
+def save_region(args: argparse.Namespace) -> None:
+    """
+    Downloads the selected regions without the GUI, builds their json
+    sources and prints the requests, bytes and time of each region. Exits
+    with an error status if a region failed, so the command can run
+    unattended (i.e., from cron).
+
+    Args:
+        args (argparse.Namespace): the parsed save-region command arguments
+    """
+    from parser.parser import build_json_sources
+    from scraper.downloader import download_regions
+    from utils.utils import extract_data
+
+    if not (args.regions or args.min_routes or args.max_routes is not None):
+        sys.exit('Select the regions by name, glob pattern or route count')
+    areas = extract_data(
+        os.path.join(os.path.dirname(__file__), 'data', 'area_map.json')
+    )
+    names = select_regions(
+        areas, args.regions, args.min_routes, args.max_routes
+    )
+    if not names:
+        sys.exit('No region matches the selection')
+    if args.dry_run:
+        print('\n'.join(names))
+        return
+
+    start = time.perf_counter()
+    results = download_regions(
+        [(areas[name]['id'], name) for name in names],
+        max_regions=args.parallel, max_workers=args.workers,
+        parse_processes=args.parse_processes, compress=args.compress,
+        selective=not args.full
+    )
+    downloaded = [result for result in results if result['error'] is None]
+    if downloaded:
+        build_json_sources([result['area_name'] for result in downloaded])
+    wall_time = time.perf_counter() - start
+
+    for result in results:
+        print(
+            f'{result["area_name"]:<24} {result["requests"]:6d} requests '
+            f'{result["num_bytes"] / 1e6:8.2f} MB '
+            f'{result["seconds"]:8.1f}s  {result["error"] or "ok"}'
+        )
+    print(
+        f'{"Total":<24} '
+        f'{sum(result["requests"] for result in results):6d} requests '
+        f'{sum(result["num_bytes"] for result in results) / 1e6:8.2f} MB '
+        f'{wall_time:8.1f}s  {len(downloaded)}/{len(results)} regions'
+    )
+    if len(downloaded) < len(results):
+        sys.exit(1)
+    return
+
+
+def refresh_reviews(args: argparse.Namespace) -> None:
+    """
+    Refreshes the review counts of downloaded regions without downloading
+    their routes again and prints the number of routes whose count changed
+
+    Args:
+        args (argparse.Namespace): the parsed refresh-reviews arguments
+    """
+    from scraper.refresh import refresh_region_reviews
+
+    for region in args.regions:
+        start = time.perf_counter()
+        changes = refresh_region_reviews(region, max_workers=args.workers)
+        print(
+            f'{region:<24} {len(changes):6d} routes changed '
+            f'{time.perf_counter() - start:8.1f}s'
+        )
+    return
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Returns the parser for the command line interface"""
+    from custom_types.crag import Area
+    from custom_types.ranking_model import RankingModel
+
+    parser = argparse.ArgumentParser(prog='main.py')
+    commands = parser.add_subparsers(dest='cmd')
+    for cmd in ['start-app', 'build-src-data', 'measure-load-speed']:
+        commands.add_parser(cmd)
+
+    save = commands.add_parser(
+        'save-region',
+        help='download regions and build their sources without the GUI'
+    )
+    save.add_argument(
+        'regions', nargs='*',
+        help='region names or glob patterns, i.e., "New *", defaults to '
+             'every region within the route count bounds'
+    )
+    save.add_argument('--min-routes', type=int, default=0)
+    save.add_argument('--max-routes', type=int)
+    save.add_argument(
+        '--parallel', type=int, default=2,
+        help='number of regions downloaded at once'
+    )
+    save.add_argument(
+        '--workers', type=int, default=4,
+        help='number of worker threads per region'
+    )
+    save.add_argument(
+        '--parse-processes', type=int,
+        help='number of parser processes per region, 0 parses pages on the '
+             'worker threads, defaults to one less than the number of CPUs'
+    )
+    save.add_argument('--compress', action='store_true')
+    save.add_argument(
+        '--full', action='store_true',
+        help='download every grade request, even if its routes are unchanged'
+    )
+    save.add_argument(
+        '--dry-run', action='store_true',
+        help='list the selected regions without downloading them'
+    )
+
+    get_areas = commands.add_parser(
+        'get-areas', help='save the regions available for download'
+    )
+    get_areas.add_argument('--workers', type=int, default=4)
+    get_areas.add_argument(
+        '--recursive', action='store_true',
+        help='also record the sub-areas of regions too large to download'
+    )
+
+    import_time = commands.add_parser('import-time')
+    import_time.add_argument('command', nargs='?', choices=COMMAND_IMPORTS)
+
+    rank = commands.add_parser(
+        'rank', help='rank the crags under an area without the GUI'
+    )
+    rank.add_argument(
+        '--area', nargs='*', default=[],
+        help='path to the area, i.e., --area USA Colorado "Boulder Canyon"'
+    )
+    rank.add_argument('--min-grade', default='5.0')
+    rank.add_argument('--max-grade', default='5.15')
+    rank.add_argument(
+        '--types', nargs='+', default=['Trad', 'Sport', 'Top Rope'],
+        choices=['Trad', 'Sport', 'Top Rope']
+    )
+    rank.add_argument('--min-length', type=int, default=0)
+    rank.add_argument('--min-pitches', type=int, default=0)
+    rank.add_argument(
+        '--model', default='raw', choices=RankingModel.get_options()
+    )
+    rank.add_argument(
+        '--sort', default='score', type=str.lower,
+        choices=list(Area._node_attributes.keys())
+    )
+    rank.add_argument('--top', type=int, default=10)
+    rank.add_argument('--format', default='csv', choices=['csv', 'json'])
+    rank.add_argument('--output', help='file path, defaults to stdout')
+    rank.add_argument('--threaded', action='store_true')
+
+    serve = commands.add_parser(
+        'serve', help='serve ranking queries over HTTP'
+    )
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--cache-size', type=int, default=256)
+    serve.add_argument('--threaded', action='store_true')
+
+    benchmark = commands.add_parser(
+        'benchmark-scraper',
+        help='benchmark the scraper against a local stand-in server'
+    )
+    benchmark.add_argument('--requests', type=int, default=200)
+    benchmark.add_argument('--page-size', type=int, default=50_000)
+    benchmark.add_argument('--latency', type=float, default=0)
+
+    parsing = commands.add_parser(
+        'benchmark-parsing',
+        help='benchmark the html parsing on saved area and review pages'
+    )
+    parsing.add_argument(
+        'pages', help='directory with area_*.html and reviews_*.html pages'
+    )
+    parsing.add_argument('--repeat', type=int, default=10)
+
+    replay = commands.add_parser(
+        'benchmark-download',
+        help='benchmark a download replayed from a recording (RECORD_DIR)'
+    )
+    replay.add_argument('recording', help='directory holding the recording')
+    replay.add_argument('area_id', help='id of the recorded area')
+    replay.add_argument('area_name', help='name of the recorded area')
+    replay.add_argument('--latency', type=float, default=0)
+    replay.add_argument('--workers', type=int, default=4)
+    replay.add_argument(
+        '--parse-processes', type=int,
+        help='number of parser processes, 0 parses pages on the worker '
+             'threads, defaults to one less than the number of CPUs'
+    )
+    replay.add_argument('--rate', type=float, default=1000)
+
+    plan = commands.add_parser(
+        'plan-download',
+        help='dry run: report the requests and time a region download takes'
+    )
+    plan.add_argument('region', help='region name, as listed by get-areas')
+    plan.add_argument('--workers', type=int, default=4)
+    plan.add_argument(
+        '--crawl', action='store_true',
+        help='request the area pages even if the area catalog covers them'
+    )
+
+    refresh = commands.add_parser(
+        'refresh-reviews',
+        help='refresh the review counts of downloaded regions'
+    )
+    refresh.add_argument(
+        'regions', nargs='+', help='region names, as listed by get-areas'
+    )
+    refresh.add_argument('--workers', type=int, default=4)
+    return parser
+
+
+def main(argv: list[str]):
 
+    args = build_arg_parser().parse_args(argv or ['start-app'])
+    cmd = args.cmd
     if cmd == 'start-app':
         start_app()
     elif cmd == 'get-areas':
-        save_area_ids()
+        from scraper.scraper import save_area_ids
+        save_area_ids(max_workers=args.workers, recursive=args.recursive)
     elif cmd == 'save-region':
-        pass
+        save_region(args)
     elif cmd == 'build-src-data':
+        from parser.parser import build_json_sources
         build_json_sources()
     elif cmd == 'measure-load-speed':
         load_speed_test()
+    elif cmd == 'import-time':
+        import_time_report(args.command)
+    elif cmd == 'rank':
+        rank(args)
+    elif cmd == 'serve':
+        serve(args)
+    elif cmd == 'benchmark-scraper':
+        benchmark_scraper(args)
+    elif cmd == 'benchmark-parsing':
+        benchmark_parsing(args)
+    elif cmd == 'benchmark-download':
+        benchmark_download(args)
+    elif cmd == 'plan-download':
+        plan_download(args)
+    elif cmd == 'refresh-reviews':
+        refresh_reviews(args)
 
 
 if __name__ == "__main__":
-    cmd = 'start-app' if len(sys.argv) == 1 else sys.argv[1]
-    main(cmd)
+    main(sys.argv[1:])
@@ -1,5 +1,7 @@
 import os
-from utils.utils import extract_data, save_json_data
+from utils.utils import (
+    extract_data, get_parser_dir, load_review_counts, save_json_data
+)
 from custom_types.custom_types import (
     RouteDict, RouteDetails, ReviewStatsDict, CSVData
 )
@@ -65,13 +67,13 @@ def build_route_dict(routes: CSVData) -> RouteDict:
     Returns:
         RouteDict: A dictionary with details on multiple routes
     """
-    src = os.path.join(os.path.dirname(__file__), "reviews.json")
-    num_reviews_by_id: ReviewStatsDict = extract_data(src)
+    src = os.path.join(get_parser_dir(), "reviews.bin")
+    num_reviews_by_id: ReviewStatsDict = load_review_counts(src)
 
     route_data: RouteDict = {}
     for route in routes:
         route_id = route[2].split("/")[-2]  # extract the id from the url
-        num_reviews = num_reviews_by_id.get(route_id, 0)
+        num_reviews = num_reviews_by_id.get(int(route_id), 0)
 
         route_data[route_id] = organize_route_details(
             route,
@@ -91,7 +93,7 @@ def build_json_sources(areas: list[str] | None = None) -> None:
     """
     if areas:
         areas = list(map(lambda area: area.replace(' ', '_').lower(), areas))
-    src_folder = os.path.join(os.path.dirname(__file__), 'crags_by_area')
+    src_folder = os.path.join(get_parser_dir(), 'crags_by_area')
     dest_folder = os.path.join(
         os.path.dirname(os.path.dirname(__file__)), 'data', 'crags_by_area')
 
@@ -103,3 +105,35 @@ def build_json_sources(areas: list[str] | None = None) -> None:
         save_json_data(
             os.path.join(dest_folder, f'{file}.json'), build_route_dict(data)
         )
+
+
+def update_source_reviews(
+    region: str, reviews: ReviewStatsDict
+) -> dict[str, int]:
+    """
+    Updates the number of reviewers of the routes in the region's json
+    source in place. Routes without a count in reviews are left unchanged.
+
+    Args:
+        region (str): name of the region
+        reviews (ReviewStatsDict): number of reviews by route id
+
+    Returns:
+        dict[str, int]: the new number of reviewers by route id of the
+            routes whose count changed
+    """
+    file = region.replace(' ', '_').lower()
+    fp = os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'data', 'crags_by_area',
+        f'{file}.json'
+    )
+    data: RouteDict = extract_data(fp)
+    changes = {}
+    for route_id, route in data.items():
+        num_reviews = reviews.get(int(route_id))
+        if num_reviews is not None and num_reviews != route['num_reviewers']:
+            route['num_reviewers'] = num_reviews
+            changes[route_id] = num_reviews
+    if changes:
+        save_json_data(fp, data)
+    return changes
@@ -0,0 +1,227 @@
+from __future__ import annotations
+import asyncio
+from typing import Any, Callable
+from scraper.cancellation import CancellationToken
+from scraper.catalog import AreaCatalog, load_catalog
+from scraper.client import ScraperClient, get_client
+from scraper.downloader import AreaDownload, merge_area_files
+from scraper.pipeline import (
+    ParsePipeline, default_parse_processes, parse_area_page,
+    parse_reviews_page
+)
+from scraper.scraper import generate_area_url
+
+
+class AsyncDownloader:
+    """
+    Downloads an area using asyncio tasks. Area pages, review pages and route
+    pages are tasks of a single task group, so sub-areas and their pages are
+    crawled concurrently from one event loop. The blocking requests run on
+    worker threads and a semaphore bounds the number of requests in flight
+    (the client's rate limiter still enforces the request rate).
+
+    Cancelling the task awaiting download cancels every pending request.
+    Requests already running on a worker thread stop at their next streamed
+    chunk if the cancel token is cancelled as well; cancelling only the
+    token raises DownloadCancelled before the next request. The first error
+    cancels the remaining tasks and is raised by download.
+    Files are staged in a directory of their own, so several areas can be
+    downloaded at once. Completed requests are recorded in a
+    DownloadManifest, so a failed or cancelled download resumes where it
+    stopped. The areas are planned by an AreaDownload, like the
+    ConcurrentDownloader's: areas known to the catalog are planned without
+    requesting their pages (see AreaDownload.known_page) and, if selective,
+    re-downloading an area skips the grade requests whose grade band is
+    unchanged since the last download (see DownloadRecord).
+
+    Fetched pages are parsed on worker threads when parse_processes is 0,
+    otherwise they are parsed by a ParsePipeline, so parsing neither holds
+    a request slot nor competes with the requests for the GIL. By default a
+    pipeline is used when more than one CPU is available (see
+    default_parse_processes).
+
+    Attributes:
+        _client (ScraperClient): client shared by every task
+        _max_concurrency (int): maximum number of requests in flight
+        _parse_processes (int): number of parser processes, 0 parses pages
+            on worker threads
+        _compress (bool): gzip the downloaded route files
+        _catalog (AreaCatalog | None): area pages known without a request
+        _cancel_token (CancellationToken | None): stops the download
+        _selective (bool): skip the requests whose routes are unchanged
+        _callback (Callable[[int], None] | None): called with the progress
+        _area (AreaDownload | None): state of the area being downloaded
+    """
+    _client: ScraperClient
+    _max_concurrency: int
+    _parse_processes: int
+    _compress: bool
+    _catalog: AreaCatalog | None
+    _cancel_token: CancellationToken | None
+    _selective: bool
+    _callback: Callable[[int], None] | None
+    _area: AreaDownload | None
+
+    def __init__(
+        self, *, client: ScraperClient | None = None,
+        max_concurrency: int = 4,
+        callback: Callable[[int], None] | None = None,
+        parse_processes: int | None = None, compress: bool = False,
+        catalog: AreaCatalog | None = None,
+        cancel_token: CancellationToken | None = None,
+        selective: bool = True
+    ) -> None:
+        self._client = client or get_client()
+        self._max_concurrency = max_concurrency
+        self._parse_processes = (
+            default_parse_processes() if parse_processes is None
+            else parse_processes
+        )
+        self._compress = compress
+        self._catalog = catalog
+        self._cancel_token = cancel_token
+        self._selective = selective
+        self._callback = callback
+        self._area = None
+        self._group = None
+        self._semaphore = None
+        self._pipeline = None
+
+    async def download(self, area_id: str, area_name: str) -> None:
+        """
+        Downloads the area's reviews and routes. The review counts collected
+        are saved even if the download failed or was cancelled. Requests
+        completed by a previous attempt at the same area are skipped.
+
+        Args:
+            area_id (str): the area's id
+            area_name (str): the name of the area
+        """
+        self._area = await asyncio.to_thread(
+            AreaDownload, area_id, area_name, client=self._client,
+            callback=self._callback, compress=self._compress,
+            catalog=self._catalog, cancel_token=self._cancel_token,
+            selective=self._selective
+        )
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        if self._parse_processes:
+            self._pipeline = ParsePipeline(
+                self._parse_processes, max_pending=2 * self._max_concurrency,
+                config=self._client.config
+            )
+        try:
+            async with asyncio.TaskGroup() as group:
+                self._group = group
+                group.create_task(
+                    self._download_area(area_id, area_name, True)
+                )
+        except ExceptionGroup as e:
+            raise e.exceptions[0] from None
+        finally:
+            self._group = None
+            if self._pipeline:
+                await asyncio.to_thread(self._pipeline.close)
+                self._pipeline = None
+            self._area.finish()
+        return
+
+    async def _call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs the blocking function on a worker thread unless the download
+        was cancelled
+        """
+        async with self._semaphore:
+            if self._cancel_token:
+                self._cancel_token.raise_if_cancelled()
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    def _get_text(self, url: str) -> str:
+        """Requests the page and returns its html"""
+        return self._client.get(url).text
+
+    async def _parse(self, func: Callable[..., Any], html: str) -> Any:
+        """
+        Returns the page parsed by the function, on the pipeline if there
+        is one (waiting on a worker thread while it is full) or on a worker
+        thread otherwise
+        """
+        if self._pipeline is None:
+            return await asyncio.to_thread(func, html, self._client)
+        future = await asyncio.to_thread(self._pipeline.submit, func, html)
+        return await asyncio.wrap_future(future)
+
+    async def _download_area(
+        self, area_id: str, area_name: str, is_root: bool = False
+    ) -> None:
+        """
+        Requests the area's page, unless the catalog knows the area, and
+        creates its grade request tasks if the area is manageable or its
+        sub-area tasks otherwise.
+        """
+        page = self._area.known_page(area_id)
+        if not page:
+            area_url = generate_area_url(
+                area_id, area_name, client=self._client
+            )
+            html = await self._call(self._get_text, area_url)
+            page = await self._parse(parse_area_page, html)
+
+        tasks = await asyncio.to_thread(
+            self._area.plan_area, page, area_id, is_root
+        )
+        for key, reviews_url, routes_url in tasks:
+            if reviews_url:
+                self._group.create_task(
+                    self._download_reviews(reviews_url, key)
+                )
+            if routes_url:
+                self._group.create_task(
+                    self._call(self._area.download_routes, routes_url, key)
+                )
+        for name, sub_area_id in page[1] or []:
+            self._group.create_task(self._download_area(sub_area_id, name))
+        return
+
+    async def _download_reviews(self, url: str, key: str) -> None:
+        """Downloads a page of reviews and collects the review counts"""
+        html = await self._call(self._get_text, url)
+        reviews = await self._parse(parse_reviews_page, html)
+        self._area.add_reviews(reviews, key)
+
+
+async def download_and_merge_data_async(
+    area_id: str, area_name: str,
+    callback: Callable[[int], None] = None,
+    *, client: ScraperClient | None = None, max_concurrency: int = 4,
+    parse_processes: int | None = None, compress: bool = False,
+    catalog: AreaCatalog | None = None,
+    cancel_token: CancellationToken | None = None, selective: bool = True
+) -> None:
+    """
+    Asyncio version of download_and_merge_data. Downloads the area's
+    information using an AsyncDownloader & zips the resulting .csv files.
+
+    Args:
+        area_id: the area's id
+        area_name: the name of the area
+        callback: optional function called with the progress percentage
+        client: optional client, defaults to the shared client
+        max_concurrency: maximum number of requests in flight
+        parse_processes: number of parser processes, 0 parses pages on
+            worker threads, defaults to default_parse_processes()
+        compress: gzip the downloaded route files until they are merged
+        catalog: catalog the area pages are planned from, defaults to the
+            saved catalog if it is recent (see load_catalog)
+        cancel_token: optional token that stops the download
+        selective: only download the requests whose grade band changed
+            since the area's last download (see DownloadRecord)
+    """
+    downloader = AsyncDownloader(
+        client=client, max_concurrency=max_concurrency, callback=callback,
+        parse_processes=parse_processes, compress=compress,
+        catalog=catalog or load_catalog(), cancel_token=cancel_token,
+        selective=selective
+    )
+    await downloader.download(area_id, area_name)
+    await asyncio.to_thread(merge_area_files, area_id, area_name)
+    return
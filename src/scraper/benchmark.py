@@ -0,0 +1,217 @@
+import glob
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+import requests
+from scraper.client import ScraperClient
+from scraper.downloader import download_area, merge_area_files
+from scraper.fake_server import FakeServer, ReplayServer
+from scraper.parsing import HTML_PARSER
+from scraper.rate_limiter import RateLimiter
+from scraper.scraper import (
+    get_navbar_anchor_tags, get_route_distribution, parse_reviews
+)
+from utils.utils import get_parser_dir
+
+
+def time_requests(
+    get: Callable[[str], object], url: str, n: int
+) -> list[float]:
+    """
+    Returns the latency of n sequential requests in milliseconds
+
+    Args:
+        get (Callable): function that sends a GET request to the url
+        url (str): the requested url
+        n (int): number of requests
+    """
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        get(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(label: str, latencies: list[float]) -> str:
+    """Returns the mean, median and 95th percentile latency as text"""
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    return (
+        f'{label:<16} mean {statistics.mean(latencies):7.2f} ms  '
+        f'median {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms'
+    )
+
+
+def benchmark_client(
+    num_requests: int = 200, page_size: int = 50_000, latency: float = 0
+) -> None:
+    """
+    Compares the per request latency of bare requests.get calls (a new
+    connection per request) with the pooled ScraperClient against a local
+    stand-in server.
+
+    Args:
+        num_requests (int): number of requests per client
+        page_size (int): size of the served page in bytes
+        latency (float): seconds the server delays each response by
+    """
+    with FakeServer(latency=latency, default_body=b'x' * page_size) as server:
+        url = f'{server.url}/area/1/benchmark'
+        bare = time_requests(requests.get, url, num_requests)
+        with ScraperClient() as client:
+            pooled = time_requests(client.get, url, num_requests)
+
+    print(f'{num_requests} requests of {page_size} bytes')
+    print(summarize('requests.get', bare))
+    print(summarize('ScraperClient', pooled))
+    print(
+        'Speedup: '
+        f'{statistics.mean(bare) / statistics.mean(pooled):.2f}x'
+    )
+    return
+
+
+def time_parsing(
+    parse: Callable[[str], Any], pages: list[str], repeat: int
+) -> tuple[float, list[Any]]:
+    """
+    Returns the mean CPU time per page in milliseconds and the results of
+    the last pass
+
+    Args:
+        parse (Callable): function that parses a page
+        pages (list[str]): html of the pages
+        repeat (int): number of passes over the pages
+    """
+    start = time.process_time()
+    for _ in range(repeat):
+        results = [parse(page) for page in pages]
+    elapsed = time.process_time() - start
+    return elapsed * 1000 / (repeat * len(pages)), results
+
+
+def benchmark_parsing(pages_dir: str, repeat: int = 10) -> None:
+    """
+    Compares the CPU time per page of parsing full html trees with the
+    targeted parsing used by the scraper. The directory holds saved area
+    pages (area_*.html) and review pages (reviews_*.html) of the source
+    website. The parsing tags are loaded from the .env file.
+
+    Args:
+        pages_dir (str): directory with the saved pages
+        repeat (int): number of passes over the pages
+    """
+    client = ScraperClient()
+
+    def full_area(html: str) -> tuple:
+        soup = BeautifulSoup(html, 'html.parser')
+        tags = get_navbar_anchor_tags('', soup=soup, client=client)
+        return (
+            get_route_distribution(soup, client=client),
+            [tag.get('href') for tag in tags]
+        )
+
+    def targeted_area(html: str) -> tuple:
+        tags = get_navbar_anchor_tags('', html=html, client=client)
+        return (
+            get_route_distribution(html, client=client),
+            [tag.get('href') for tag in tags]
+        )
+
+    def full_reviews(html: str) -> dict:
+        return parse_reviews(
+            BeautifulSoup(html, 'html.parser'), client=client
+        )
+
+    def targeted_reviews(html: str) -> dict:
+        return parse_reviews(html, client=client)
+
+    print(f'Targeted parsing uses the {HTML_PARSER} parser')
+    for label, full, targeted in [
+        ('area', full_area, targeted_area),
+        ('reviews', full_reviews, targeted_reviews)
+    ]:
+        pages = []
+        for fp in sorted(glob.glob(os.path.join(pages_dir, f'{label}_*'))):
+            with open(fp, 'r', encoding='utf-8') as file:
+                pages.append(file.read())
+        if not pages:
+            print(f'No {label} pages found')
+            continue
+        full_ms, full_results = time_parsing(full, pages, repeat)
+        targeted_ms, targeted_results = time_parsing(targeted, pages, repeat)
+        print(
+            f'{len(pages)} {label} pages: full tree {full_ms:7.2f} ms  '
+            f'targeted {targeted_ms:7.2f} ms  '
+            f'speedup {full_ms / targeted_ms:.2f}x  '
+            f'results match: {full_results == targeted_results}'
+        )
+    return
+
+
+def benchmark_download(
+    recording_dir: str, area_id: str, area_name: str, *,
+    latency: float = 0, max_workers: int = 4,
+    parse_processes: int | None = None, requests_per_second: float = 1000
+) -> None:
+    """
+    Downloads and merges the area against a local server replaying a
+    recorded crawl of the area and reports the request rate and wall time.
+    The urls of the .env file that point at the recorded website are
+    pointed at the replay server, so the download sends the recorded
+    requests without contacting the source website. Every run is a full
+    download (not selective and without the catalog) into a temporary
+    parser directory inside src/parser, passed to the download and the
+    merge, so the app's downloads, records and review counts are left
+    untouched and repeated runs send the same requests.
+
+    Args:
+        recording_dir (str): directory holding the recording (RECORD_DIR)
+        area_id (str): the recorded area's id
+        area_name (str): the name of the recorded area
+        latency (float): seconds the server delays each response by
+        max_workers (int): number of download threads
+        parse_processes (int): number of parser processes, 0 parses pages
+            on the download threads, defaults to default_parse_processes()
+        requests_per_second (float): the rate limiter's request rate
+    """
+    load_dotenv()
+    with ReplayServer(recording_dir, latency=latency) as server:
+        config = {}
+        for key, value in os.environ.items():
+            for origin in server.origins:
+                if origin in value:
+                    config[key] = value.replace(origin, server.url)
+        client = ScraperClient(
+            pool_size=max(10, max_workers), config=config,
+            rate_limiter=RateLimiter(
+                requests_per_second, max_in_flight=max_workers
+            )
+        )
+        temp_dir = tempfile.TemporaryDirectory(
+            prefix='benchmark_', dir=get_parser_dir()
+        )
+        with client, temp_dir as parser_dir:
+            start = time.perf_counter()
+            download_area(
+                area_id, area_name, client=client, max_workers=max_workers,
+                parse_processes=parse_processes, catalog=None,
+                selective=False, parser_dir=parser_dir
+            )
+            merge_area_files(area_id, area_name, parser_dir=parser_dir)
+            wall_time = time.perf_counter() - start
+        num_requests = server.num_requests
+        num_bytes = server.num_bytes
+
+    print(
+        f'{len(server.recording)} recorded responses, '
+        f'{latency * 1000:.0f} ms latency, {max_workers} workers'
+    )
+    print(f'Requests: {num_requests} ({num_bytes / 1e6:.2f} MB)')
+    print(f'Wall time: {wall_time:.2f}s')
+    print(f'Throughput: {num_requests / wall_time:.1f} req/s')
+    return
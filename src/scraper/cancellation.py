@@ -0,0 +1,37 @@
+from __future__ import annotations
+import threading
+
+
+class DownloadCancelled(Exception):
+    """Raised by a download that was cancelled through its token"""
+
+
+class CancellationToken:
+    """
+    Thread safe flag shared by the caller and the tasks of a download. The
+    caller cancels the token and the tasks check it between steps (i.e.,
+    before each request and between the chunks of a streamed page), so a
+    download stops at the next step without leaving a partial file behind.
+
+    Attributes:
+        _event (threading.Event): set once the token is cancelled
+    """
+    _event: threading.Event
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """Asks the download to stop"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Returns true if the token was cancelled"""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """Raises DownloadCancelled if the token was cancelled"""
+        if self._event.is_set():
+            raise DownloadCancelled('Cancelled')
+        return
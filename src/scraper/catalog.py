@@ -0,0 +1,180 @@
+from __future__ import annotations
+import json
+import os
+import time
+from typing import TypedDict
+from dotenv import load_dotenv
+from custom_types.custom_types import AreaEntry, AreaMap
+
+
+class CatalogArea(TypedDict):
+    """An area of the catalog and its place in the area hierarchy"""
+    id: str
+    name: str
+    parent: str | None
+    routes: int
+    grades: dict[str, int] | None
+    children: list[str] | None
+
+
+def get_catalog_path() -> str:
+    """Returns the path of the saved area catalog"""
+    return os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'data',
+        'area_catalog.json'
+    )
+
+
+class AreaCatalog:
+    """
+    Hierarchy of the areas recorded by a recursive catalog crawl, indexed by
+    area id. Each area holds its parent, its number of routes per grade and,
+    if it is too large to be downloaded at once, its sub-areas. Areas whose
+    children are None are manageable. The catalog answers the questions an
+    area's page would (its grade distribution and sub-areas), so a download
+    can be planned, and run, without requesting any area page.
+
+    Attributes:
+        crawled_at (float): time the catalog was crawled
+        _areas (dict[str, CatalogArea]): areas by id
+        _names (dict[str, list[str]]): ids of the areas by name
+    """
+    crawled_at: float
+    _areas: dict[str, CatalogArea]
+    _names: dict[str, list[str]]
+
+    def __init__(
+        self, areas: list[CatalogArea], *, crawled_at: float | None = None
+    ) -> None:
+        """
+        Args:
+            areas (list[CatalogArea]): the areas of the catalog
+            crawled_at (float): time the areas were crawled, defaults to now
+        """
+        self.crawled_at = crawled_at or time.time()
+        self._areas = {}
+        self._names = {}
+        for area in areas:
+            self._areas[area['id']] = area
+            self._names.setdefault(area['name'], []).append(area['id'])
+
+    @classmethod
+    def from_area_map(cls, area_map: AreaMap) -> AreaCatalog:
+        """Returns the catalog of the regions and sub-areas of the map"""
+        areas = []
+
+        def add(name: str, entry: AreaEntry, parent: str | None) -> None:
+            sub_areas = entry.get('sub_areas')
+            areas.append(CatalogArea(
+                id=entry['id'], name=name, parent=parent,
+                routes=entry['routes'], grades=entry.get('grades'),
+                children=None if sub_areas is None else [
+                    sub_area['id'] for sub_area in sub_areas.values()
+                ]
+            ))
+            for sub_name, sub_area in (sub_areas or {}).items():
+                add(sub_name, sub_area, entry['id'])
+
+        for name, entry in area_map.items():
+            add(name, entry, None)
+        return cls(areas)
+
+    @classmethod
+    def load(cls, fp: str | None = None) -> AreaCatalog | None:
+        """Returns the saved catalog or None if there is none"""
+        fp = fp or get_catalog_path()
+        if not os.path.exists(fp):
+            return None
+        with open(fp, 'r') as file_obj:
+            data = json.load(file_obj)
+        return cls(data['areas'], crawled_at=data['crawled_at'])
+
+    def save(self, fp: str | None = None) -> None:
+        """Writes the catalog to a temporary file and moves it into place"""
+        fp = fp or get_catalog_path()
+        os.makedirs(os.path.dirname(fp), exist_ok=True)
+        tmp_fp = f'{fp}.tmp'
+        with open(tmp_fp, 'w') as file_obj:
+            json.dump({
+                'crawled_at': self.crawled_at,
+                'areas': list(self._areas.values()),
+            }, file_obj)
+        os.replace(tmp_fp, fp)
+        return
+
+    def __contains__(self, area_id: str) -> bool:
+        return area_id in self._areas
+
+    def __len__(self) -> int:
+        return len(self._areas)
+
+    def get(self, area_id: str) -> CatalogArea | None:
+        """Returns the area with the id"""
+        return self._areas.get(area_id)
+
+    def find(self, name: str) -> list[CatalogArea]:
+        """Returns the areas with the name"""
+        return [self._areas[area_id] for area_id in self._names.get(name, [])]
+
+    def children(self, area_id: str) -> list[CatalogArea]:
+        """Returns the recorded sub-areas of the area"""
+        area = self._areas.get(area_id)
+        return [
+            self._areas[child] for child in (area and area['children'] or [])
+            if child in self._areas
+        ]
+
+    def path(self, area_id: str) -> list[str]:
+        """Returns the names of the area and its parents, region first"""
+        names = []
+        area = self._areas.get(area_id)
+        while area:
+            names.append(area['name'])
+            area = self._areas.get(area['parent'])
+        return names[::-1]
+
+    def area_page(
+        self, area_id: str
+    ) -> tuple[dict[str, int], list[tuple[str, str]] | None] | None:
+        """
+        Returns what the area's page says: its grade distribution and, if
+        it is not manageable, the names and ids of its sub-areas. Returns
+        None if the catalog does not know the area's distribution.
+
+        Args:
+            area_id (str): the area's id
+        """
+        area = self._areas.get(area_id)
+        if area is None or area['grades'] is None:
+            return None
+        if area['children'] is None:
+            return area['grades'], None
+        return area['grades'], [
+            (child['name'], child['id']) for child in self.children(area_id)
+        ]
+
+    def covers(self, area_id: str) -> bool:
+        """
+        Returns true if the catalog knows the area pages of the area and of
+        every sub-area a download of the area visits
+        """
+        page = self.area_page(area_id)
+        if page is None:
+            return False
+        return all(self.covers(sub_id) for _, sub_id in page[1] or [])
+
+
+def load_catalog() -> AreaCatalog | None:
+    """
+    Returns the saved catalog unless it is older than the
+    CATALOG_MAX_AGE_DAYS variable of the .env file (default 7). Route
+    counts change as routes are added, so an old catalog could plan
+    requests that return more routes than allowed. Setting the variable to
+    0 turns the catalog off.
+    """
+    load_dotenv()
+    max_age = float(os.getenv('CATALOG_MAX_AGE_DAYS', 7)) * 24 * 60 * 60
+    catalog = AreaCatalog.load()
+    if catalog is None or time.time() - catalog.crawled_at >= max_age:
+        return None
+    return catalog
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import json
+import os
+import re
+import threading
+from typing import TypedDict
+from utils.utils import CSV_EXTENSIONS
+
+
+class CompletedRoutes(TypedDict):
+    """A completed route request and the file it was saved to"""
+    file: str
+    num_routes: int
+
+
+def request_key(area_id: str, p_1: str, p_2: str) -> str:
+    """Returns the key of an area's grade request"""
+    return f'{area_id}:{p_1}:{p_2}'
+
+
+def routes_file_name(key: str, compress: bool = False) -> str:
+    """Returns the name of the file a grade request's routes are saved to"""
+    extension = '.csv.gz' if compress else '.csv'
+    return f"routes_{re.sub(r'[^0-9A-Za-z-]', '_', key)}{extension}"
+
+
+class DownloadManifest:
+    """
+    Checkpoint of a download, saved in the download's staging directory.
+    Records every completed route request (an area's grade parameter pair)
+    with the file it was saved to, and every review request whose counts
+    have been saved. A download restarted for the same area skips the
+    recorded requests. The grade band of each planned grade request is
+    recorded as well, so the merge knows every request of the download,
+    including those skipped because the area's source file already holds
+    their routes.
+
+    Route requests are recorded as soon as their file is written. Review
+    requests are only recorded by commit_reviews, once their counts have
+    been saved, so a crash never marks unsaved counts as complete.
+
+    Attributes:
+        _fp (str): file path of the manifest
+        area_id (str): the id of the downloaded area
+        area_name (str): the name of the downloaded area
+        _routes (dict[str, CompletedRoutes]): completed route requests
+        _reviews (set[str]): review requests whose counts are saved
+        _pending_reviews (set[str]): review requests with unsaved counts
+        _planned (dict[str, dict[str, int]]): grade bands of the planned
+            requests by request key
+    """
+    _fp: str
+    area_id: str
+    area_name: str
+    _routes: dict[str, CompletedRoutes]
+    _reviews: set[str]
+    _pending_reviews: set[str]
+    _planned: dict[str, dict[str, int]]
+
+    def __init__(
+        self, fp: str, area_id: str, area_name: str, *,
+        routes: dict[str, CompletedRoutes] | None = None,
+        reviews: list[str] | None = None,
+        planned: dict[str, dict[str, int]] | None = None
+    ) -> None:
+        self._fp = fp
+        self.area_id = area_id
+        self.area_name = area_name
+        self._routes = routes or {}
+        self._reviews = set(reviews or [])
+        self._pending_reviews = set()
+        self._planned = planned or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(
+        cls, directory: str, area_id: str, area_name: str
+    ) -> DownloadManifest:
+        """
+        Returns the manifest saved in the staging directory if it belongs to
+        the same area, or an empty manifest otherwise.
+
+        Args:
+            directory (str): the download's staging directory
+            area_id (str): the id of the downloaded area
+            area_name (str): the name of the downloaded area
+        """
+        fp = os.path.join(directory, 'manifest.json')
+        try:
+            with open(fp, 'r') as file_obj:
+                data = json.load(file_obj)
+        except (OSError, ValueError):
+            data = {}
+        if data.get('area_id') != area_id:
+            return cls(fp, area_id, area_name)
+        return cls(
+            fp, area_id, area_name, routes=data['routes'],
+            reviews=data['reviews'], planned=data.get('planned')
+        )
+
+    @property
+    def directory(self) -> str:
+        """Returns the staging directory the downloaded files are saved to"""
+        return os.path.dirname(self._fp)
+
+    @property
+    def num_routes(self) -> int:
+        """Returns the number of routes of the completed route requests"""
+        with self._lock:
+            return sum(entry['num_routes'] for entry in self._routes.values())
+
+    @property
+    def planned(self) -> dict[str, dict[str, int]]:
+        """Returns the grade bands of the planned requests by request key"""
+        with self._lock:
+            return dict(self._planned)
+
+    @property
+    def routes(self) -> dict[str, CompletedRoutes]:
+        """Returns the completed route requests by request key"""
+        with self._lock:
+            return dict(self._routes)
+
+    def has_routes(self, key: str) -> bool:
+        """Returns true if the route request has been completed"""
+        with self._lock:
+            return key in self._routes
+
+    def has_reviews(self, key: str) -> bool:
+        """Returns true if the review request's counts have been saved"""
+        with self._lock:
+            return key in self._reviews
+
+    def add_routes(self, key: str, file_name: str, num_routes: int) -> None:
+        """Records a completed route request and saves the manifest"""
+        with self._lock:
+            self._routes[key] = CompletedRoutes(
+                file=file_name, num_routes=num_routes
+            )
+            self._save()
+        return
+
+    def add_planned(self, planned: dict[str, dict[str, int]]) -> None:
+        """Records the grade bands of an area's requests and saves"""
+        with self._lock:
+            self._planned.update(planned)
+            self._save()
+        return
+
+    def add_reviews(self, key: str) -> None:
+        """Records a review request whose counts are not saved yet"""
+        with self._lock:
+            self._pending_reviews.add(key)
+        return
+
+    def commit_reviews(self) -> None:
+        """Marks the pending review requests as saved and saves the manifest"""
+        with self._lock:
+            self._reviews |= self._pending_reviews
+            self._pending_reviews.clear()
+            self._save()
+        return
+
+    def remove_stale_files(self) -> None:
+        """
+        Deletes the csv files in the staging directory that are not
+        recorded by the manifest (i.e., files of a previous download or of a
+        request that did not complete) and any partially streamed file.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        with self._lock:
+            recorded = {entry['file'] for entry in self._routes.values()}
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith('.part') or (
+                file_name.endswith(CSV_EXTENSIONS)
+                and file_name not in recorded
+            ):
+                os.remove(os.path.join(self.directory, file_name))
+        return
+
+    def _save(self) -> None:
+        """Writes the manifest to a temporary file and moves it into place"""
+        os.makedirs(os.path.dirname(self._fp), exist_ok=True)
+        tmp_fp = f'{self._fp}.tmp'
+        with open(tmp_fp, 'w') as file_obj:
+            json.dump({
+                'area_id': self.area_id,
+                'area_name': self.area_name,
+                'routes': self._routes,
+                'reviews': sorted(self._reviews),
+                'planned': self._planned,
+            }, file_obj)
+        os.replace(tmp_fp, self._fp)
+        return
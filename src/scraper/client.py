@@ -0,0 +1,334 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Callable
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from scraper.http_cache import HttpCache, normalize_url
+from scraper.rate_limiter import AdaptiveRateLimiter, RateLimiter
+from scraper.recorder import ResponseRecorder
+from scraper.retry import (
+    RETRY_ERRORS, RETRY_STATUSES, RetryPolicy, parse_retry_after
+)
+
+
+class ScraperClient:
+    """
+    Shared HTTP client for the scraper. Holds a keep-alive connection pool,
+    the configuration loaded from the .env file, the default headers and
+    timeout used by every request, an optional rate limiter shared by every
+    thread using the client, an optional retry policy for transient
+    failures, an optional on-disk response cache and an optional recorder of
+    every response received.
+
+    Attributes:
+        _session (requests.Session): session with a pooled HTTP adapter
+        _config (dict[str, str]): environment variables loaded once
+        _timeout (float): default timeout of each request in seconds
+        _rate_limiter (RateLimiter | None): limits the request rate
+        _retry (RetryPolicy | None): retries transient failures
+        _cache (HttpCache | None): persistent cache of responses
+        _recorder (ResponseRecorder | None): saves the responses received
+    """
+    _session: requests.Session
+    _config: dict[str, str]
+    _timeout: float
+    _rate_limiter: RateLimiter | None
+    _retry: RetryPolicy | None
+    _cache: HttpCache | None
+    _recorder: ResponseRecorder | None
+
+    _default_headers: dict[str, str] = {
+        'User-Agent': 'Rock-Radar',
+        'Accept-Encoding': 'gzip, deflate',
+    }
+
+    def __init__(
+        self, *, pool_size: int = 10, timeout: float = 30,
+        headers: dict[str, str] | None = None,
+        rate_limiter: RateLimiter | None = None,
+        retry: RetryPolicy | None = None,
+        cache: HttpCache | None = None,
+        recorder: ResponseRecorder | None = None,
+        config: dict[str, str] | None = None
+    ) -> None:
+        """
+        Args:
+            pool_size (int): maximum number of connections kept per host
+            timeout (float): default timeout of each request in seconds
+            headers (dict[str, str]): headers added to the default headers
+            rate_limiter (RateLimiter): optional limiter applied to requests
+            retry (RetryPolicy): optional policy retrying transient failures
+            cache (HttpCache): optional cache of the responses
+            recorder (ResponseRecorder): optional recorder of the responses
+            config (dict[str, str]): values overriding the .env file
+        """
+        load_dotenv()
+        self._config = dict(os.environ) | (config or {})
+        self._timeout = timeout
+        self._rate_limiter = rate_limiter
+        self._retry = retry
+        self._cache = cache
+        self._recorder = recorder
+        self._session = requests.Session()
+        self._session.headers.update(type(self)._default_headers)
+        self._session.headers.update(headers or {})
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def env(self, key: str) -> str | None:
+        """Returns the configuration value loaded from the .env file"""
+        return self._config.get(key)
+
+    @property
+    def config(self) -> dict[str, str]:
+        """Returns a copy of the client's configuration values"""
+        return dict(self._config)
+
+    @property
+    def rate_limiter(self) -> RateLimiter | None:
+        """Returns the client's rate limiter"""
+        return self._rate_limiter
+
+    @property
+    def retry(self) -> RetryPolicy | None:
+        """Returns the client's retry policy"""
+        return self._retry
+
+    @property
+    def cache(self) -> HttpCache | None:
+        """Returns the client's response cache"""
+        return self._cache
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request using the pooled session. Blocks until the rate
+        limiter allows the request. If the client has a cache, fresh entries
+        are returned without a request and stale entries are revalidated.
+        The bodies of streamed responses (stream=True) are cached, served
+        from the cache and recorded in chunks, so they are never held in
+        memory.
+
+        Args:
+            url (str): the requested url
+            **kwargs: passed along to requests.Session.get
+        """
+        kwargs.setdefault('timeout', self._timeout)
+        response = self._get(url, **kwargs)
+        if self._recorder:
+            self._recorder.record(
+                normalize_url(url, kwargs.get('params')), response,
+                stream=kwargs.get('stream', False)
+            )
+        return response
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """Returns the cached response or sends the request"""
+        if self._cache is None:
+            return self._send(url, **kwargs)
+
+        stream = kwargs.get('stream', False)
+        key = normalize_url(url, kwargs.get('params'))
+        entry = self._cache.load(key)
+        if entry and self._cache.is_fresh(entry):
+            cached = self._cache.to_response(key, stream=stream)
+            if cached:
+                self._cache.record('hits')
+                return cached
+        if entry:
+            kwargs['headers'] = (
+                self._cache.conditional_headers(entry)
+                | (kwargs.get('headers') or {})
+            )
+
+        response = self._send(url, **kwargs)
+        if entry and response.status_code == 304:
+            response.close()
+            self._cache.touch(key, entry)
+            cached = self._cache.to_response(
+                key, stream=stream, revalidated=True
+            )
+            if cached:
+                self._cache.record('revalidated')
+                return cached
+            kwargs['headers'] = {
+                name: value for name, value in kwargs['headers'].items()
+                if name not in ('If-None-Match', 'If-Modified-Since')
+            }
+            response = self._send(url, **kwargs)
+        self._cache.record('misses')
+        if response.status_code == 200:
+            self._cache.store(key, response, stream=stream)
+        return response
+
+    def _send(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends the request, retrying connection errors, timeouts, throttled
+        requests and server errors as allowed by the retry policy. Returns
+        the last response once the retries run out.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            can_retry = bool(self._retry) and (
+                attempt <= self._retry.max_retries
+            )
+            try:
+                response = self._send_once(url, **kwargs)
+            except RETRY_ERRORS:
+                if not can_retry:
+                    raise
+                time.sleep(self._retry.delay(attempt))
+                continue
+            if not (can_retry and self._retry.should_retry(response)):
+                return response
+            retry_after = parse_retry_after(
+                response.headers.get('Retry-After')
+            )
+            response.close()
+            time.sleep(self._retry.delay(attempt, retry_after))
+
+    def _send_once(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends the request once the rate limiter allows it and tells the rate
+        limiter how it went. A Retry-After header pauses the rate limiter.
+        A streamed response (stream=True) keeps its request slot until it is
+        closed, since its body is still being downloaded once this returns.
+        """
+        limiter = self._rate_limiter
+        if limiter is None:
+            return self._session.get(url, **kwargs)
+        limiter.acquire()
+        try:
+            response = self._session.get(url, **kwargs)
+        except RETRY_ERRORS:
+            limiter.release()
+            limiter.on_failure()
+            raise
+        except BaseException:
+            limiter.release()
+            raise
+        if kwargs.get('stream'):
+            _release_on_close(response, limiter.release)
+        else:
+            limiter.release()
+        if response.status_code in RETRY_STATUSES:
+            limiter.on_failure()
+            retry_after = parse_retry_after(
+                response.headers.get('Retry-After')
+            )
+            if retry_after:
+                limiter.pause(retry_after)
+        else:
+            limiter.on_success()
+        return response
+
+    def close(self) -> None:
+        """Closes all pooled connections"""
+        self._session.close()
+
+    def __enter__(self) -> ScraperClient:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def _release_on_close(
+    response: requests.Response, release: Callable[[], None]
+) -> None:
+    """
+    Calls release once the response is closed (i.e., when the with block
+    reading a streamed response exits). Closing it again does nothing more.
+
+    Args:
+        response (requests.Response): the streamed response
+        release (Callable[[], None]): frees what the response was holding
+    """
+    close = response.close
+    released = threading.Lock()
+
+    def close_and_release() -> None:
+        try:
+            close()
+        finally:
+            if released.acquire(blocking=False):
+                release()
+
+    response.close = close_and_release
+    return
+
+
+_client: ScraperClient | None = None
+_client_lock = threading.Lock()
+
+
+def create_rate_limiter() -> RateLimiter:
+    """
+    Returns an adaptive rate limiter configured by the REQUESTS_PER_SECOND,
+    MAX_REQUESTS_PER_SECOND, MIN_REQUESTS_PER_SECOND and MAX_IN_FLIGHT
+    variables of the .env file. Defaults to one request per second with at
+    most four requests in flight. The rate slows down on failures and speeds
+    up on success, up to twice the initial rate unless
+    MAX_REQUESTS_PER_SECOND is set.
+    """
+    load_dotenv()
+    rate = float(os.getenv('REQUESTS_PER_SECOND', 1))
+    return AdaptiveRateLimiter(
+        rate, max_in_flight=int(os.getenv('MAX_IN_FLIGHT', 4)),
+        max_rate=float(os.getenv('MAX_REQUESTS_PER_SECOND', 2 * rate)),
+        min_rate=float(os.getenv('MIN_REQUESTS_PER_SECOND', rate / 10))
+    )
+
+
+def create_retry_policy() -> RetryPolicy:
+    """
+    Returns a retry policy configured by the MAX_RETRIES and
+    RETRY_BASE_DELAY variables of the .env file. Defaults to five retries
+    with the first waiting up to half a second.
+    """
+    load_dotenv()
+    return RetryPolicy(
+        int(os.getenv('MAX_RETRIES', 5)),
+        base_delay=float(os.getenv('RETRY_BASE_DELAY', 0.5))
+    )
+
+
+def create_http_cache() -> HttpCache:
+    """
+    Returns a response cache configured by the HTTP_CACHE_DIR and
+    HTTP_CACHE_TTL variables of the .env file. Defaults to the scraper's
+    .http_cache directory with every entry revalidated before it is used.
+    """
+    load_dotenv()
+    default_dir = os.path.join(os.path.dirname(__file__), '.http_cache')
+    return HttpCache(
+        os.getenv('HTTP_CACHE_DIR', default_dir),
+        ttl=float(os.getenv('HTTP_CACHE_TTL', 0))
+    )
+
+
+def get_client() -> ScraperClient:
+    """
+    Returns the shared client, creating it on first use. The shared client
+    is rate limited by create_rate_limiter, retries transient failures as
+    set by create_retry_policy and caches its responses with
+    create_http_cache. If the RECORD_DIR variable of the .env file is set,
+    every response is recorded to that directory.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            load_dotenv()
+            record_dir = os.getenv('RECORD_DIR')
+            _client = ScraperClient(
+                rate_limiter=create_rate_limiter(),
+                retry=create_retry_policy(), cache=create_http_cache(),
+                recorder=ResponseRecorder(record_dir) if record_dir else None
+            )
+        return _client
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import json
+import os
+from typing import Literal, TypedDict
+from utils.utils import get_parser_dir
+
+# State of a queued download
+JobStatus = Literal['queued', 'running', 'paused', 'failed']
+
+
+class QueuedDownload(TypedDict):
+    """A region waiting for, or being, downloaded"""
+    area_id: str
+    area_name: str
+    status: JobStatus
+    error: str | None
+
+
+def get_queue_path() -> str:
+    """Returns the path of the saved download queue"""
+    return os.path.join(get_parser_dir(), 'download_queue.json')
+
+
+class DownloadQueue:
+    """
+    Regions queued for download and the number of regions downloaded at
+    once. The queue is saved after every change, so it survives a restart.
+    Downloads that were running when the app closed are queued again and
+    resume from their checkpoint. Finished downloads leave the queue.
+
+    Attributes:
+        max_jobs (int): number of regions downloaded at once
+        _jobs (dict[str, QueuedDownload]): the downloads by region, in the
+            order they were queued
+        _fp (str): path of the saved queue
+    """
+    max_jobs: int
+    _jobs: dict[str, QueuedDownload]
+    _fp: str
+
+    def __init__(
+        self, jobs: list[QueuedDownload] | None = None, *,
+        max_jobs: int = 2, fp: str | None = None
+    ) -> None:
+        """
+        Args:
+            jobs (list[QueuedDownload]): the queued downloads
+            max_jobs (int): number of regions downloaded at once
+            fp (str): path of the saved queue, defaults to get_queue_path
+        """
+        self.max_jobs = max_jobs
+        self._jobs = {job['area_name']: job for job in jobs or []}
+        self._fp = fp or get_queue_path()
+
+    @classmethod
+    def load(cls, fp: str | None = None) -> DownloadQueue:
+        """
+        Returns the saved queue, or an empty queue if none was saved.
+        Running downloads are queued again.
+        """
+        fp = fp or get_queue_path()
+        if not os.path.exists(fp):
+            return cls(fp=fp)
+        with open(fp, 'r') as file_obj:
+            data = json.load(file_obj)
+        for job in data['jobs']:
+            if job['status'] == 'running':
+                job['status'] = 'queued'
+        return cls(data['jobs'], max_jobs=data['max_jobs'], fp=fp)
+
+    def save(self) -> None:
+        """Writes the queue to a temporary file and moves it into place"""
+        os.makedirs(os.path.dirname(self._fp), exist_ok=True)
+        tmp_fp = f'{self._fp}.tmp'
+        with open(tmp_fp, 'w') as file_obj:
+            json.dump({
+                'max_jobs': self.max_jobs,
+                'jobs': list(self._jobs.values()),
+            }, file_obj)
+        os.replace(tmp_fp, self._fp)
+        return
+
+    @property
+    def jobs(self) -> list[QueuedDownload]:
+        """Returns the downloads in the order they were queued"""
+        return list(self._jobs.values())
+
+    def __contains__(self, area_name: str) -> bool:
+        return area_name in self._jobs
+
+    def get(self, area_name: str) -> QueuedDownload | None:
+        """Returns the region's download"""
+        return self._jobs.get(area_name)
+
+    def add(self, area_id: str, area_name: str) -> bool:
+        """
+        Queues the region unless it is already in the queue. Returns true
+        if the region was queued.
+        """
+        if area_name in self._jobs:
+            return False
+        self._jobs[area_name] = QueuedDownload(
+            area_id=area_id, area_name=area_name, status='queued', error=None
+        )
+        self.save()
+        return True
+
+    def remove(self, area_name: str) -> None:
+        """Removes the region's download from the queue"""
+        if self._jobs.pop(area_name, None):
+            self.save()
+        return
+
+    def set_status(
+        self, area_name: str, status: JobStatus, error: str | None = None
+    ) -> None:
+        """Updates the status of the region's download"""
+        job = self._jobs.get(area_name)
+        if job:
+            job['status'] = status
+            job['error'] = error
+            self.save()
+        return
+
+    def set_max_jobs(self, max_jobs: int) -> None:
+        """Sets the number of regions downloaded at once"""
+        self.max_jobs = max(1, max_jobs)
+        self.save()
+        return
+
+    def next_jobs(self) -> list[QueuedDownload]:
+        """
+        Returns the queued downloads that can start without exceeding the
+        number of regions downloaded at once
+        """
+        statuses = [job['status'] for job in self._jobs.values()]
+        free = self.max_jobs - statuses.count('running')
+        queued = [
+            job for job in self._jobs.values() if job['status'] == 'queued'
+        ]
+        return queued[:max(0, free)]
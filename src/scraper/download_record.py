@@ -0,0 +1,97 @@
+from __future__ import annotations
+import json
+import os
+from typing import TypedDict
+from utils.utils import get_parser_dir
+
+
+class RecordedRequest(TypedDict):
+    """A grade request of a completed download and the routes it returned"""
+    grades: dict[str, int]
+    route_ids: list[str]
+
+
+def get_record_path(area_id: str, parser_dir: str | None = None) -> str:
+    """
+    Returns the path of the area's download record in the parser directory,
+    which defaults to get_parser_dir()
+    """
+    return os.path.join(
+        parser_dir or get_parser_dir(), 'download_records', f'{area_id}.json'
+    )
+
+
+class DownloadRecord:
+    """
+    Grade requests of the last completed download of an area, each with its
+    grade band (the number of routes of each grade it covers, as listed on
+    the area's page, see grade_band) and the ids of the routes it returned.
+    A re-download of the area skips the requests whose band has not changed
+    and keeps their routes from the area's source file.
+
+    Attributes:
+        _fp (str): file path of the record
+        _requests (dict[str, RecordedRequest]): the requests by request key
+    """
+    _fp: str
+    _requests: dict[str, RecordedRequest]
+
+    def __init__(
+        self, fp: str, requests: dict[str, RecordedRequest] | None = None
+    ) -> None:
+        """
+        Args:
+            fp (str): file path of the record
+            requests (dict[str, RecordedRequest]): the recorded requests
+        """
+        self._fp = fp
+        self._requests = requests or {}
+
+    @classmethod
+    def load(
+        cls, area_id: str, parser_dir: str | None = None
+    ) -> DownloadRecord | None:
+        """
+        Returns the area's record saved in the parser directory (see
+        get_record_path) or None if there is none
+        """
+        fp = get_record_path(area_id, parser_dir)
+        try:
+            with open(fp, 'r') as file_obj:
+                data = json.load(file_obj)
+        except (OSError, ValueError):
+            return None
+        return cls(fp, data['requests'])
+
+    def save(self) -> None:
+        """Writes the record to a temporary file and moves it into place"""
+        os.makedirs(os.path.dirname(self._fp), exist_ok=True)
+        tmp_fp = f'{self._fp}.tmp'
+        with open(tmp_fp, 'w') as file_obj:
+            json.dump({'requests': self._requests}, file_obj)
+        os.replace(tmp_fp, self._fp)
+        return
+
+    def is_unchanged(self, key: str, grades: dict[str, int]) -> bool:
+        """Returns true if the request was recorded with the same band"""
+        request = self._requests.get(key)
+        return request is not None and request['grades'] == grades
+
+    def covers(self, area_id: str) -> bool:
+        """Returns true if the record holds grade requests of the area"""
+        prefix = f'{area_id}:'
+        return any(key.startswith(prefix) for key in self._requests)
+
+    def route_ids(self, key: str) -> list[str]:
+        """Returns the ids of the routes the request returned"""
+        request = self._requests.get(key)
+        return request['route_ids'] if request else []
+
+    def set_request(
+        self, key: str, grades: dict[str, int], route_ids: list[str]
+    ) -> None:
+        """Records the request's band and the ids of its routes"""
+        self._requests[key] = RecordedRequest(
+            grades=grades, route_ids=route_ids
+        )
+        return
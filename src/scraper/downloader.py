@@ -0,0 +1,827 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+import csv
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, TypedDict
+import requests
+from custom_types.custom_types import ReviewStatsDict
+from scraper.cancellation import CancellationToken
+from scraper.catalog import AreaCatalog, load_catalog
+from scraper.checkpoint import (
+    DownloadManifest, request_key, routes_file_name
+)
+from scraper.client import ScraperClient, get_client
+from scraper.download_record import DownloadRecord, get_record_path
+from scraper.pipeline import (
+    ParsePipeline, StageMetrics, default_parse_processes, parse_area_page,
+    parse_reviews_page
+)
+from scraper.planner import (
+    grade_band, load_grade_parameters, plan_grade_requests
+)
+from scraper.scraper import (
+    generate_area_url, generate_request_urls, get_routes, save_reviews
+)
+from utils.utils import extract_data, get_parser_dir
+
+
+class DownloadProgress:
+    """
+    Thread safe count of the routes downloaded so far. Reports the progress
+    as a percentage of the area's total number of routes.
+
+    Attributes:
+        _total (int): total number of routes in the area
+        _downloaded (int): number of routes downloaded so far
+        _callback (Callable[[int], None]): called with the progress percent
+    """
+    _total: int
+    _downloaded: int
+    _callback: Callable[[int], None] | None
+
+    def __init__(self, callback: Callable[[int], None] | None = None) -> None:
+        self._total = 0
+        self._downloaded = 0
+        self._callback = callback
+        self._lock = threading.Lock()
+
+    @property
+    def percent(self) -> int:
+        """Returns the percentage of routes downloaded"""
+        with self._lock:
+            if not self._total:
+                return 0
+            return min(100, int(100 * self._downloaded // self._total))
+
+    def set_total(self, total: int) -> None:
+        """Sets the total number of routes and reports the progress"""
+        with self._lock:
+            self._total = total
+        self._report()
+
+    def add(self, num_routes: int) -> None:
+        """Adds the downloaded routes and reports the progress"""
+        with self._lock:
+            self._downloaded += num_routes
+        self._report()
+
+    def _report(self) -> None:
+        if self._callback:
+            self._callback(self.percent)
+
+
+class AreaDownload:
+    """
+    Per-area state shared by the ConcurrentDownloader and the
+    AsyncDownloader: the download's checkpoint, the record of the area's
+    last download, the progress and the review counts collected. Plans the
+    grade requests of each manageable area, skipping the requests already
+    completed by a previous attempt and, if the download is selective, the
+    requests whose grade band matches the area's DownloadRecord (their
+    routes are kept from the area's source file by merge_area_files).
+    The downloaders only schedule the requests and area pages it returns.
+
+    Attributes:
+        manifest (DownloadManifest): checkpoint of the download
+        record (DownloadRecord | None): requests of the last download, None
+            unless the download is selective
+        progress (DownloadProgress): number of routes downloaded
+        _client (ScraperClient): client the requests are made with
+        _compress (bool): gzip the downloaded route files
+        _catalog (AreaCatalog | None): area pages known without a request
+        _cancel_token (CancellationToken | None): stops the download
+        _parser_dir (str | None): directory the download is staged, merged
+            and recorded in, None for get_parser_dir()
+        _reviews (ReviewStatsDict): review counts saved once finished
+    """
+    manifest: DownloadManifest
+    record: DownloadRecord | None
+    progress: DownloadProgress
+    _client: ScraperClient
+    _compress: bool
+    _catalog: AreaCatalog | None
+    _cancel_token: CancellationToken | None
+    _parser_dir: str | None
+    _reviews: ReviewStatsDict
+
+    def __init__(
+        self, area_id: str, area_name: str, *, client: ScraperClient,
+        callback: Callable[[int], None] | None = None,
+        compress: bool = False, catalog: AreaCatalog | None = None,
+        cancel_token: CancellationToken | None = None,
+        selective: bool = True, parser_dir: str | None = None
+    ) -> None:
+        """
+        Resumes the area's download and loads its record if selective.
+
+        Args:
+            area_id (str): the area's id
+            area_name (str): the name of the area
+            client (ScraperClient): client the requests are made with
+            callback (Callable[[int], None]): called with the progress
+            compress (bool): gzip the downloaded route files
+            catalog (AreaCatalog | None): area pages known without a request
+            cancel_token (CancellationToken | None): stops the download
+            selective (bool): skip the requests whose routes are unchanged
+            parser_dir (str | None): directory the download is staged,
+                merged and recorded in, defaults to get_parser_dir()
+        """
+        self._client = client
+        self._compress = compress
+        self._catalog = catalog
+        self._cancel_token = cancel_token
+        self._parser_dir = parser_dir
+        self._reviews = {}
+        self._lock = threading.Lock()
+        self.manifest = resume_download(
+            area_id, area_name, parser_dir=parser_dir
+        )
+        self.record = load_download_record(
+            area_id, area_name, parser_dir=parser_dir
+        ) if selective else None
+        self.progress = DownloadProgress(callback)
+        self.progress.add(self.manifest.num_routes)
+
+    def known_page(
+        self, area_id: str
+    ) -> tuple[dict[str, int], list[tuple[str, str]] | None] | None:
+        """
+        Returns the area's page if the catalog knows it, None otherwise.
+        A manageable area whose grade requests are in the DownloadRecord
+        only takes its place in the hierarchy from the catalog: its grade
+        distribution is compared against the record, so its page is
+        requested (a catalog can be days old, see load_catalog). Areas the
+        record does not cover are planned from the catalog.
+        """
+        page = self._catalog and self._catalog.area_page(area_id)
+        if page and page[1] is None and self.record and self.record.covers(
+            area_id
+        ):
+            return None
+        return page
+
+    def plan_area(
+        self, page: tuple[dict[str, int], list[tuple[str, str]] | None],
+        area_id: str, is_root: bool = False
+    ) -> list[tuple[str, str | None, str | None]]:
+        """
+        Plans the area's grade requests if the area is manageable.
+
+        Args:
+            page (tuple): the area's grade distribution and sub-areas
+            area_id (str): the area's id
+            is_root (bool): the area is the one being downloaded
+
+        Returns:
+            list[tuple[str, str | None, str | None]]: the key, reviews url
+                and routes url of each request to download, a url is None
+                if the page was downloaded by a previous attempt. Empty if
+                the area has sub-areas.
+        """
+        grade_distribution, sub_areas = page
+        if is_root:
+            self.progress.set_total(sum(grade_distribution.values()))
+        if sub_areas is not None:
+            return []
+
+        grade_parameters = load_grade_parameters()
+        requests = plan_grade_requests(grade_distribution, grade_parameters)
+        bands = {
+            request_key(area_id, p_1, p_2): grade_band(
+                p_1, p_2, grade_distribution, grade_parameters
+            ) for p_1, p_2, _ in requests
+        }
+        self.manifest.add_planned(bands)
+        tasks = []
+        for p_1, p_2, _ in requests:
+            key = request_key(area_id, p_1, p_2)
+            if self.record and self.record.is_unchanged(key, bands[key]):
+                self.progress.add(len(self.record.route_ids(key)))
+                continue
+            routes_url, reviews_url = generate_request_urls(
+                area_id, p_1, p_2, client=self._client
+            )
+            tasks.append((
+                key,
+                None if self.manifest.has_reviews(key) else reviews_url,
+                None if self.manifest.has_routes(key) else routes_url
+            ))
+        return tasks
+
+    def add_reviews(self, reviews: ReviewStatsDict, key: str) -> None:
+        """Collects the review counts of a page"""
+        with self._lock:
+            self._reviews.update(reviews)
+        self.manifest.add_reviews(key)
+        return
+
+    def download_routes(
+        self, url: str, key: str, *,
+        on_response: Callable[[requests.Response], None] | None = None
+    ) -> int:
+        """
+        Streams a page of routes to disk, reporting the progress as routes
+        arrive, and records it. The progress of a failed or cancelled page
+        is taken back. on_response is passed along to get_routes.
+
+        Returns:
+            int: number of bytes downloaded
+        """
+        file_name = routes_file_name(key, self._compress)
+        streamed = []
+
+        def on_routes(num_routes: int) -> None:
+            streamed.append(num_routes)
+            self.progress.add(num_routes)
+
+        try:
+            num_bytes, num_routes = get_routes(
+                url, file_name=file_name, compress=self._compress,
+                directory=self.manifest.directory, on_routes=on_routes,
+                on_response=on_response, cancel_token=self._cancel_token,
+                client=self._client
+            )
+        except BaseException:
+            self.progress.add(-sum(streamed))
+            raise
+        self.manifest.add_routes(key, file_name, num_routes)
+        return num_bytes
+
+    def finish(self) -> None:
+        """Saves the review counts collected and checkpoints them"""
+        with self._lock:
+            save_reviews(self._reviews, self._parser_dir)
+        self.manifest.commit_reviews()
+        return
+
+
+class ConcurrentDownloader:
+    """
+    Downloads an area using a pool of worker threads. Area pages, review
+    pages and route pages are independent tasks, so sub-areas and their
+    pages download in parallel while the client's rate limiter enforces the
+    request rate across every worker.
+
+    Tasks submit follow up tasks (i.e., an area page submits its sub-areas)
+    instead of waiting on them, so workers never block on each other. The
+    first error stops new tasks from being submitted and is raised once the
+    running tasks finish. Files are staged in a directory of their own, so
+    several areas can be downloaded at once. Completed requests are recorded
+    in a DownloadManifest, so a failed download resumes where it stopped.
+
+    Pages are parsed on the worker threads when parse_processes is 0,
+    otherwise fetched pages are handed to a ParsePipeline and the workers
+    go back to fetching while the pages are parsed. By default a pipeline
+    is used when more than one CPU is available (see
+    default_parse_processes). Route pages are
+    streamed to disk (gzipped if compress is set) and the progress is
+    reported as their routes arrive. Areas known to the catalog are planned
+    from it without requesting their pages (see AreaDownload.known_page).
+    Cancelling the token stops the download before its next request or
+    streamed chunk, raising DownloadCancelled once the running tasks finish.
+
+    Re-downloading an area is selective: grade requests whose grade band
+    matches the area's DownloadRecord are skipped (both their route and
+    review pages) and merge_area_files keeps their routes from the
+    area's source file. Setting selective to False downloads every request.
+    The planning itself is done by an AreaDownload.
+
+    Attributes:
+        _client (ScraperClient): client shared by every worker
+        _max_workers (int): number of worker threads
+        _parse_processes (int): number of parser processes, 0 parses pages
+            on the worker threads
+        _compress (bool): gzip the downloaded route files
+        _catalog (AreaCatalog | None): area pages known without a request
+        _cancel_token (CancellationToken | None): stops the download
+        _selective (bool): skip the requests whose routes are unchanged
+        _parser_dir (str | None): directory the download is staged, merged
+            and recorded in, None for get_parser_dir()
+        _callback (Callable[[int], None] | None): called with the progress
+        fetch_metrics (StageMetrics): throughput of the fetched pages
+        parse_metrics (StageMetrics): throughput of the parsed pages
+        requests_sent (int): number of requests sent over the network, the
+            pages the cache served without a request are not counted
+        bytes_received (int): number of bytes of the pages received over
+            the network
+        _area (AreaDownload | None): state of the area being downloaded
+        _pending (int): number of submitted tasks that have not finished
+        _error (Exception | None): first error raised by a task
+    """
+    _client: ScraperClient
+    _max_workers: int
+    _parse_processes: int
+    _compress: bool
+    _catalog: AreaCatalog | None
+    _cancel_token: CancellationToken | None
+    _selective: bool
+    _parser_dir: str | None
+    _callback: Callable[[int], None] | None
+    fetch_metrics: StageMetrics
+    parse_metrics: StageMetrics
+    requests_sent: int
+    bytes_received: int
+    _area: AreaDownload | None
+    _pending: int
+    _error: Exception | None
+
+    def __init__(
+        self, *, client: ScraperClient | None = None, max_workers: int = 4,
+        callback: Callable[[int], None] | None = None,
+        parse_processes: int | None = None, compress: bool = False,
+        catalog: AreaCatalog | None = None,
+        cancel_token: CancellationToken | None = None,
+        selective: bool = True, parser_dir: str | None = None
+    ) -> None:
+        self._client = client or get_client()
+        self._max_workers = max_workers
+        self._parse_processes = (
+            default_parse_processes() if parse_processes is None
+            else parse_processes
+        )
+        self._compress = compress
+        self._catalog = catalog
+        self._cancel_token = cancel_token
+        self._selective = selective
+        self._parser_dir = parser_dir
+        self._callback = callback
+        self.fetch_metrics = StageMetrics('fetch')
+        self.parse_metrics = StageMetrics('parse')
+        self.requests_sent = 0
+        self.bytes_received = 0
+        self._wall_time = 0
+        self._area = None
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._pending = 0
+        self._error = None
+        self._executor = None
+        self._pipeline = None
+
+    def download(self, area_id: str, area_name: str) -> None:
+        """
+        Downloads the area's reviews and routes and blocks until finished.
+        The review counts collected are saved even if a task failed. Requests
+        completed by a previous attempt at the same area are skipped.
+
+        Args:
+            area_id (str): the area's id
+            area_name (str): the name of the area
+        """
+        self._area = AreaDownload(
+            area_id, area_name, client=self._client, callback=self._callback,
+            compress=self._compress, catalog=self._catalog,
+            cancel_token=self._cancel_token, selective=self._selective,
+            parser_dir=self._parser_dir
+        )
+        start = time.perf_counter()
+        if self._parse_processes:
+            self._pipeline = ParsePipeline(
+                self._parse_processes, max_pending=2 * self._max_workers,
+                config=self._client.config, fetch=self.fetch_metrics,
+                parse=self.parse_metrics
+            )
+        try:
+            with ThreadPoolExecutor(self._max_workers) as executor:
+                self._executor = executor
+                self._submit(self._download_area, area_id, area_name, True)
+                with self._finished:
+                    while self._pending:
+                        self._finished.wait()
+        finally:
+            if self._pipeline:
+                self._pipeline.close()
+            self._executor = self._pipeline = None
+            self._wall_time = time.perf_counter() - start
+        self._area.finish()
+        if self._error:
+            raise self._error
+        return
+
+    def _submit(self, func: Callable[..., None], *args: Any) -> None:
+        """Submits the task unless a previous task failed"""
+        with self._lock:
+            if self._error:
+                return
+            self._pending += 1
+        self._executor.submit(self._run, func, *args)
+
+    def _run(self, func: Callable[..., None], *args: Any) -> None:
+        """
+        Runs the task unless the download was cancelled, records its error
+        and marks it as finished
+        """
+        try:
+            if self._cancel_token:
+                self._cancel_token.raise_if_cancelled()
+            func(*args)
+        except Exception as e:
+            with self._lock:
+                self._error = self._error or e
+        finally:
+            with self._finished:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._finished.notify_all()
+
+    def metrics_summary(self) -> str:
+        """Returns the throughput of each stage of the last download"""
+        return '\n'.join([
+            self.fetch_metrics.summary(self._wall_time),
+            self.parse_metrics.summary(self._wall_time),
+            f'wall   {self._wall_time:.2f}s'
+        ])
+
+    def _fetch(self, url: str) -> str:
+        """Requests the page and returns its html"""
+        start = time.perf_counter()
+        response = self._client.get(url)
+        html = response.text
+        self.fetch_metrics.record(len(html), time.perf_counter() - start)
+        self._count_response(response, len(response.content))
+        return html
+
+    def _count_response(
+        self, response: requests.Response, num_bytes: int
+    ) -> None:
+        """
+        Counts the request and the bytes received over the network unless
+        the cache served the response without a request. A revalidated
+        entry counts as a request without a body.
+        """
+        from_cache = getattr(response, 'from_cache', False)
+        if from_cache and not response.revalidated:
+            return
+        with self._lock:
+            self.requests_sent += 1
+            self.bytes_received += 0 if from_cache else num_bytes
+        return
+
+    def _parse(
+        self, func: Callable[..., Any], html: str,
+        on_parsed: Callable[..., None], *args: Any
+    ) -> None:
+        """
+        Parses the page with the function and passes the result along with
+        the args to on_parsed. Without a pipeline, the page is parsed on the
+        current thread. Otherwise the page is parsed by the pipeline (which
+        blocks while it is full) and on_parsed runs as a task of its own.
+        """
+        if self._pipeline is None:
+            start = time.thread_time()
+            result = func(html, self._client)
+            self.parse_metrics.record(
+                len(html), time.thread_time() - start
+            )
+            on_parsed(result, *args)
+            return
+
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._pipeline.submit(func, html)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(
+            lambda future: self._executor.submit(
+                self._run, self._on_parsed, future, on_parsed, *args
+            )
+        )
+        return
+
+    @staticmethod
+    def _on_parsed(
+        future: Future, on_parsed: Callable[..., None], *args: Any
+    ) -> None:
+        """Passes the parsed result to on_parsed or raises its error"""
+        on_parsed(future.result(), *args)
+
+    def _download_area(
+        self, area_id: str, area_name: str, is_root: bool = False
+    ) -> None:
+        """
+        Plans the area from the catalog if it knows the area or requests the
+        area's page and parses it
+        """
+        page = self._area.known_page(area_id)
+        if page:
+            self._plan_area(page, area_id, is_root)
+            return
+        area_url = generate_area_url(area_id, area_name, client=self._client)
+        html = self._fetch(area_url)
+        self._parse(parse_area_page, html, self._plan_area, area_id, is_root)
+        return
+
+    def _plan_area(
+        self, page: tuple[dict[str, int], list[tuple[str, str]] | None],
+        area_id: str, is_root: bool
+    ) -> None:
+        """
+        Submits the area's grade requests if the area is manageable or its
+        sub-areas otherwise.
+        """
+        for key, reviews_url, routes_url in self._area.plan_area(
+            page, area_id, is_root
+        ):
+            if reviews_url:
+                self._submit(self._download_reviews, reviews_url, key)
+            if routes_url:
+                self._submit(self._download_routes, routes_url, key)
+        for name, sub_area_id in page[1] or []:
+            self._submit(self._download_area, sub_area_id, name)
+        return
+
+    def _download_reviews(self, url: str, key: str) -> None:
+        """Downloads a page of reviews and parses it"""
+        html = self._fetch(url)
+        self._parse(parse_reviews_page, html, self._area.add_reviews, key)
+        return
+
+    def _download_routes(self, url: str, key: str) -> None:
+        """Streams a page of routes to disk and records its throughput"""
+        responses = []
+        start = time.perf_counter()
+        num_bytes = self._area.download_routes(
+            url, key, on_response=responses.append
+        )
+        self.fetch_metrics.record(num_bytes, time.perf_counter() - start)
+        self._count_response(responses[-1], num_bytes)
+
+
+def download_area(
+    area_id: str, area_name: str, *,
+    callback: Callable[[int], None] = None,
+    client: ScraperClient | None = None, max_workers: int = 4,
+    parse_processes: int | None = None, compress: bool = False,
+    catalog: AreaCatalog | None = None,
+    cancel_token: CancellationToken | None = None, selective: bool = True,
+    parser_dir: str | None = None
+) -> None:
+    """
+    Downloads the area's reviews and routes using a ConcurrentDownloader
+    Args:
+        area_id: the area's id
+        area_name: the name of the area
+        callback: optional function called with the progress percentage
+        client: optional client, defaults to the shared client
+        max_workers: number of worker threads
+        parse_processes: number of parser processes, 0 parses pages on the
+            worker threads, defaults to default_parse_processes()
+        compress: gzip the downloaded route files
+        catalog: optional catalog the area pages are planned from
+        cancel_token: optional token that stops the download
+        selective: only download the requests whose grade band changed
+            since the area's last download (see DownloadRecord)
+        parser_dir: directory the download is staged, merged and recorded
+            in, defaults to get_parser_dir()
+    """
+    downloader = ConcurrentDownloader(
+        client=client, max_workers=max_workers, callback=callback,
+        parse_processes=parse_processes, compress=compress, catalog=catalog,
+        cancel_token=cancel_token, selective=selective, parser_dir=parser_dir
+    )
+    downloader.download(area_id, area_name)
+    return
+
+
+def download_and_merge_data(
+    area_id: str, area_name: str,
+    callback: Callable[[int], None] = None,
+    *, client: ScraperClient | None = None, max_workers: int = 4,
+    parse_processes: int | None = None, compress: bool = False,
+    catalog: AreaCatalog | None = None,
+    cancel_token: CancellationToken | None = None, selective: bool = True
+) -> None:
+    """
+    Downloads the area's information & zips all of the resulting .csv files.
+    Nothing is merged if the download is cancelled; the staged files are
+    kept so the download can resume.
+    Args:
+        area_id: the area's id
+        area_name: the name of the area
+        callback: optional function called with the progress percentage
+        client: optional client, defaults to the shared client
+        max_workers: number of worker threads
+        parse_processes: number of parser processes, 0 parses pages on the
+            worker threads, defaults to default_parse_processes()
+        compress: gzip the downloaded route files until they are merged
+        catalog: catalog the area pages are planned from, defaults to the
+            saved catalog if it is recent (see load_catalog)
+        cancel_token: optional token that stops the download
+        selective: only download the requests whose grade band changed
+            since the area's last download (see DownloadRecord)
+    """
+    download_area(
+        area_id, area_name, callback=callback, client=client,
+        max_workers=max_workers, parse_processes=parse_processes,
+        compress=compress, catalog=catalog or load_catalog(),
+        cancel_token=cancel_token, selective=selective
+    )
+    merge_area_files(area_id, area_name)
+    return
+
+
+class RegionDownload(TypedDict):
+    """
+    Outcome of a region downloaded by download_regions. The requests and
+    bytes only count the network (pages served by the cache are left out).
+    """
+    area_id: str
+    area_name: str
+    requests: int
+    num_bytes: int
+    seconds: float
+    error: str | None
+
+
+def download_regions(
+    regions: list[tuple[str, str]], *, max_regions: int = 2,
+    client: ScraperClient | None = None, max_workers: int = 4,
+    parse_processes: int | None = None, compress: bool = False,
+    catalog: AreaCatalog | None = None,
+    cancel_token: CancellationToken | None = None, selective: bool = True
+) -> list[RegionDownload]:
+    """
+    Downloads and merges several regions at once. Every region shares the
+    client, so the regions' requests are paced by a single rate limiter. A
+    failed region does not stop the others; its error is recorded in its
+    outcome and its staged files are kept so the download can resume.
+
+    Args:
+        regions: the ids and names of the regions
+        max_regions: number of regions downloaded at once
+        client: optional client, defaults to the shared client
+        max_workers: number of worker threads per region
+        parse_processes: number of parser processes per region, 0 parses
+            pages on the worker threads, defaults to
+            default_parse_processes()
+        compress: gzip the downloaded route files until they are merged
+        catalog: catalog the area pages are planned from, defaults to the
+            saved catalog if it is recent (see load_catalog)
+        cancel_token: optional token that stops every download
+        selective: only download the requests of downloaded regions whose
+            grade band changed (see DownloadRecord)
+
+    Returns:
+        list[RegionDownload]: the outcome of each region, in the given order
+    """
+    client = client or get_client()
+    catalog = catalog or load_catalog()
+
+    def download(area_id: str, area_name: str) -> RegionDownload:
+        downloader = ConcurrentDownloader(
+            client=client, max_workers=max_workers,
+            parse_processes=parse_processes, compress=compress,
+            catalog=catalog, cancel_token=cancel_token, selective=selective
+        )
+        error = None
+        start = time.perf_counter()
+        try:
+            downloader.download(area_id, area_name)
+            merge_area_files(area_id, area_name)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        return RegionDownload(
+            area_id=area_id, area_name=area_name,
+            requests=downloader.requests_sent,
+            num_bytes=downloader.bytes_received,
+            seconds=time.perf_counter() - start, error=error
+        )
+
+    with ThreadPoolExecutor(max(1, max_regions)) as executor:
+        futures = [
+            executor.submit(download, area_id, area_name)
+            for area_id, area_name in regions
+        ]
+        return [future.result() for future in futures]
+
+
+def get_staging_dir(area_id: str, parser_dir: str | None = None) -> str:
+    """
+    Returns the directory the area's downloaded files are staged in, inside
+    the parser directory (defaults to get_parser_dir())
+    """
+    return os.path.join(parser_dir or get_parser_dir(), 'input_data', area_id)
+
+
+def resume_download(
+    area_id: str, area_name: str, *, parser_dir: str | None = None
+) -> DownloadManifest:
+    """
+    Returns the checkpoint saved in the area's staging directory. Staged
+    files that the checkpoint does not record (i.e., files of a request
+    that did not complete) are deleted.
+    Args:
+        area_id: the area's id
+        area_name: the name of the area
+        parser_dir: directory the area is staged in, defaults to
+            get_parser_dir()
+    """
+    manifest = DownloadManifest.load(
+        get_staging_dir(area_id, parser_dir), area_id, area_name
+    )
+    manifest.remove_stale_files()
+    return manifest
+
+
+def discard_download(area_id: str) -> None:
+    """
+    Deletes the area's staged files and checkpoint, i.e., after the area's
+    download is cancelled. The next download of the area starts over.
+    Args:
+        area_id: the area's id
+    """
+    shutil.rmtree(get_staging_dir(area_id), ignore_errors=True)
+    return
+
+
+def merge_area_files(
+    area_id: str, area_name: str, *, parser_dir: str | None = None
+) -> None:
+    """
+    Merges the area's staged .csv files into its source file, records the
+    routes returned by each grade request in the area's DownloadRecord and
+    deletes the staging directory along with the download's checkpoint.
+    The routes of requests skipped by a selective re-download are kept from
+    the existing source file; routes of requests no longer planned are
+    dropped.
+    Args:
+        area_id: the area's id
+        area_name: the name of the area
+        parser_dir: directory the area is staged, merged and recorded in,
+            defaults to get_parser_dir()
+    """
+    src = get_staging_dir(area_id, parser_dir)
+    dest = get_source_path(area_name, parser_dir)
+    manifest = DownloadManifest.load(src, area_id, area_name)
+    planned = manifest.planned
+    completed = manifest.routes
+    previous = load_download_record(
+        area_id, area_name, parser_dir=parser_dir
+    )
+    record = DownloadRecord(get_record_path(area_id, parser_dir))
+
+    kept = set()
+    for key, grades in planned.items():
+        if key not in completed and previous and previous.is_unchanged(
+            key, grades
+        ):
+            route_ids = previous.route_ids(key)
+            record.set_request(key, grades, route_ids)
+            kept.update(route_ids)
+    rows = [
+        row for row in extract_data(dest)
+        if row and get_route_id(row) in kept
+    ] if kept else []
+    for key, entry in sorted(completed.items()):
+        data = [
+            row for row in extract_data(os.path.join(src, entry['file']))[1:]
+            if row
+        ]
+        record.set_request(
+            key, planned.get(key, {}), [get_route_id(row) for row in data]
+        )
+        rows.extend(data)
+
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_dest = f'{dest}.tmp'
+    with open(tmp_dest, 'w', newline='') as csv_file:
+        csv.writer(csv_file).writerows(rows)
+    os.replace(tmp_dest, dest)
+    record.save()
+    shutil.rmtree(src)
+    return
+
+
+def get_source_path(area_name: str, parser_dir: str | None = None) -> str:
+    """
+    Returns the path of the area's merged .csv source file in the parser
+    directory (defaults to get_parser_dir())
+    """
+    file_name = f"{area_name.replace(' ', '_').lower()}.csv"
+    return os.path.join(
+        parser_dir or get_parser_dir(), 'crags_by_area', file_name
+    )
+
+
+def get_route_id(row: list[str]) -> str:
+    """Returns the route id of a row of routes (extracted from its url)"""
+    return row[2].split('/')[-2]
+
+
+def load_download_record(
+    area_id: str, area_name: str, *, parser_dir: str | None = None
+) -> DownloadRecord | None:
+    """
+    Returns the record of the area's last download, or None if the area has
+    no record or no source file to keep routes from. Both are looked up in
+    the parser directory, which defaults to get_parser_dir().
+    """
+    if not os.path.exists(get_source_path(area_name, parser_dir)):
+        return None
+    return DownloadRecord.load(area_id, parser_dir)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
+from scraper.recorder import load_recording, recording_key
+
+
+class _FakeRequestHandler(BaseHTTPRequestHandler):
+    """Answers GET requests with the server's canned responses"""
+
+    protocol_version = 'HTTP/1.1'  # keep connections alive
+    disable_nagle_algorithm = True  # headers and body are written apart
+    server: FakeServer
+
+    def do_GET(self) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        status, content_type, body = self.server.get_response(self.path)
+        self.server.count_request(len(body))
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        return
+
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the source website. Serves canned responses on a
+    background thread so the scraper can be benchmarked without the live
+    site. Responses carry an ETag and matching conditional requests are
+    answered with a 304.
+
+    Attributes:
+        latency (float): seconds each response is delayed by
+        responses (dict): (status, content type, body) by request path
+        default_body (bytes): body returned for unknown paths
+        num_requests (int): number of requests answered
+        num_bytes (int): number of body bytes sent
+    """
+    daemon_threads = True
+
+    latency: float
+    responses: dict[str, tuple[int, str, bytes]]
+    default_body: bytes
+    num_requests: int
+    num_bytes: int
+
+    def __init__(
+        self, *, latency: float = 0, default_body: bytes = b'<html></html>',
+        port: int = 0
+    ) -> None:
+        """
+        Args:
+            latency (float): seconds each response is delayed by
+            default_body (bytes): body returned for unknown paths
+            port (int): port to listen on, 0 picks a free port
+        """
+        super().__init__(('127.0.0.1', port), _FakeRequestHandler)
+        self.latency = latency
+        self.responses = {}
+        self.default_body = default_body
+        self.num_requests = 0
+        self.num_bytes = 0
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Returns the base url of the server"""
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def add_response(
+        self, path: str, body: bytes, *, status: int = 200,
+        content_type: str = 'text/html'
+    ) -> None:
+        """Adds a canned response for the given path (including the query)"""
+        self.responses[path] = (status, content_type, body)
+
+    def get_response(self, path: str) -> tuple[int, str, bytes]:
+        """Returns the canned response for the path"""
+        return self.responses.get(
+            path, (200, 'text/html', self.default_body)
+        )
+
+    def count_request(self, num_bytes: int) -> None:
+        """Counts an answered request"""
+        with self._count_lock:
+            self.num_requests += 1
+            self.num_bytes += num_bytes
+
+    def start(self) -> FakeServer:
+        """Starts serving on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server and closes the socket"""
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> FakeServer:
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+class ReplayServer(FakeServer):
+    """
+    Stand-in for the source website that replays the responses saved by a
+    ResponseRecorder. Requests that were not recorded are answered with a
+    404.
+
+    Attributes:
+        recording (dict[str, RecordedResponse]): responses by request path
+        origins (set[str]): scheme and host of the recorded website(s)
+    """
+
+    def __init__(
+        self, directory: str, *, latency: float = 0, port: int = 0
+    ) -> None:
+        """
+        Args:
+            directory (str): directory holding the recording
+            latency (float): seconds each response is delayed by
+            port (int): port to listen on, 0 picks a free port
+        """
+        super().__init__(latency=latency, port=port)
+        self._directory = directory
+        self.recording = load_recording(directory)
+        self.origins = {entry['origin'] for entry in self.recording.values()}
+
+    def get_response(self, path: str) -> tuple[int, str, bytes]:
+        """Returns the recorded response to the request"""
+        entry = self.recording.get(recording_key(path))
+        if entry is None:
+            return 404, 'text/html', b''
+        with open(os.path.join(self._directory, entry['file']), 'rb') as file:
+            body = file.read()
+        return entry['status'], entry['content_type'], body
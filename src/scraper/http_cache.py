@@ -0,0 +1,233 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Iterable, Iterator, TypedDict
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+# Number of bytes copied at a time when an entry is rewritten
+CHUNK_SIZE = 64 * 1024
+
+
+class CacheEntry(TypedDict):
+    """Metadata stored next to a cached body"""
+    url: str
+    stored_at: float
+    etag: str | None
+    last_modified: str | None
+    content_type: str | None
+
+
+def normalize_url(url: str, params: dict[str, str] | None = None) -> str:
+    """
+    Returns the url with the params appended and the query parameters
+    sorted, so the same request always maps to the same cache entry.
+
+    Args:
+        url (str): the requested url
+        params (dict[str, str]): optional query parameters of the request
+    """
+    parsed = urlparse(url)
+    query = parse_qsl(parsed.query, keep_blank_values=True)
+    query.extend((params or {}).items())
+    return urlunparse(parsed._replace(query=urlencode(sorted(query))))
+
+
+class HttpCache:
+    """
+    Persistent cache of GET responses. Each response is saved as a single
+    gzip compressed file holding a line of JSON metadata (validators and the
+    time it was stored) followed by the body. Entries younger than the ttl
+    are served without a request. Older entries are revalidated with a
+    conditional request, so an unchanged page costs a 304 response.
+    Streamed responses are cached as their body is read and served from
+    the entry's file in chunks, so large pages are never held in memory.
+
+    Attributes:
+        _directory (str): directory holding the cached responses
+        _ttl (float): seconds an entry is served without revalidation
+        hits (int): number of responses served from the cache
+        revalidated (int): number of stale entries confirmed by a 304
+        misses (int): number of responses downloaded in full
+    """
+    _directory: str
+    _ttl: float
+    hits: int
+    revalidated: int
+    misses: int
+
+    def __init__(self, directory: str, *, ttl: float = 0) -> None:
+        """
+        Args:
+            directory (str): directory holding the cached responses
+            ttl (float): seconds an entry is served without revalidation
+        """
+        self._directory = directory
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        """Returns the path of the entry's file"""
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self._directory, name[:2], f'{name}.gz')
+
+    def load(self, key: str) -> CacheEntry | None:
+        """Returns the entry saved for the key if there is one"""
+        try:
+            with gzip.open(self._path(key), 'rb') as file:
+                return json.loads(file.readline())
+        except (OSError, EOFError, ValueError):
+            return None
+
+    def store(
+        self, key: str, response: requests.Response, *, stream: bool = False
+    ) -> None:
+        """
+        Saves the body and validators of the response. Responses without
+        validators are skipped when every entry has to be revalidated. The
+        body of a streamed response is saved as the response's
+        iter_content reads it, and only replaces the entry once it has been
+        read in full.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if self._ttl <= 0 and not (etag or last_modified):
+            return
+        entry = CacheEntry(
+            url=key, stored_at=time.time(), etag=etag,
+            last_modified=last_modified,
+            content_type=response.headers.get('Content-Type')
+        )
+        if not stream:
+            self._write(key, entry, [response.content])
+            return
+        iter_content = response.iter_content
+
+        def iter_and_store(*args, **kwargs) -> Iterator[bytes]:
+            return self._writer(key, entry, iter_content(*args, **kwargs))
+
+        response.iter_content = iter_and_store
+        return
+
+    def touch(self, key: str, entry: CacheEntry) -> None:
+        """
+        Marks a revalidated entry as fresh. The body is copied in chunks.
+        Without a ttl entries are never fresh, so nothing is rewritten.
+        """
+        if self._ttl <= 0:
+            return
+        try:
+            with gzip.open(self._path(key), 'rb') as source:
+                source.readline()
+                self._write(
+                    key, entry | {'stored_at': time.time()},
+                    iter(lambda: source.read(CHUNK_SIZE), b'')
+                )
+        except (OSError, EOFError):
+            pass
+        return
+
+    def _write(
+        self, key: str, entry: CacheEntry, chunks: Iterable[bytes]
+    ) -> None:
+        """Writes the entry to a temporary file and moves it into place"""
+        for _ in self._writer(key, entry, chunks):
+            pass
+        return
+
+    def _writer(
+        self, key: str, entry: CacheEntry, chunks: Iterable[bytes]
+    ) -> Iterator[bytes]:
+        """
+        Writes the entry to a temporary file as its chunks are yielded and
+        moves it into place after the last one. The entry is left as it was
+        if the generator is not run to the end.
+        """
+        fp = self._path(key)
+        os.makedirs(os.path.dirname(fp), exist_ok=True)
+        tmp = f'{fp}.{threading.get_ident()}.tmp'
+        try:
+            with gzip.open(tmp, 'wb') as file:
+                file.write(json.dumps(entry).encode() + b'\n')
+                for chunk in chunks:
+                    file.write(chunk)
+                    yield chunk
+            os.replace(tmp, fp)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """Returns true if the entry can be served without revalidation"""
+        return time.time() - entry['stored_at'] < self._ttl
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> dict[str, str]:
+        """Returns the headers that revalidate the entry"""
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def to_response(
+        self, key: str, *, stream: bool = False, revalidated: bool = False
+    ) -> requests.Response | None:
+        """
+        Returns a response rebuilt from the key's entry, or None if the
+        entry cannot be read. Its from_cache attribute is set and its
+        revalidated attribute tells whether a conditional request was sent
+        to confirm the entry. The body of a streamed response is read from
+        the entry's file as it is iterated; closing the response closes the
+        file.
+        """
+        try:
+            file = gzip.open(self._path(key), 'rb')
+        except OSError:
+            return None
+        try:
+            entry = json.loads(file.readline())
+            body = None if stream else file.read()
+        except (OSError, EOFError, ValueError):
+            file.close()
+            return None
+        if not stream:
+            file.close()
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict({
+            key: value for key, value in (
+                ('Content-Type', entry['content_type']),
+                ('ETag', entry['etag']),
+                ('Last-Modified', entry['last_modified']),
+            ) if value
+        })
+        response.encoding = get_encoding_from_headers(response.headers)
+        if stream:
+            # requests only closes a fully read body through release_conn
+            file.release_conn = file.close
+            response.raw = file
+        else:
+            response._content = body
+            response._content_consumed = True
+        response.from_cache = True
+        response.revalidated = revalidated
+        return response
+
+    def record(self, outcome: str) -> None:
+        """Counts a hit, revalidated entry or miss"""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
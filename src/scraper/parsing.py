@@ -0,0 +1,43 @@
+from __future__ import annotations
+from importlib.util import find_spec
+import json
+import re
+from typing import Any
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is optional, the builtin parser is used if it is not installed
+HTML_PARSER = 'lxml' if find_spec('lxml') else 'html.parser'
+
+
+def parse_html(
+    markup: str, parse_only: SoupStrainer | None = None
+) -> BeautifulSoup:
+    """
+    Returns the parsed page using the fastest available parser. If a
+    strainer is given, only the matching elements (and their children) are
+    added to the tree.
+
+    Args:
+        markup (str): the page's html
+        parse_only (SoupStrainer): optional filter of the parsed elements
+    """
+    return BeautifulSoup(markup, HTML_PARSER, parse_only=parse_only)
+
+
+def search_json(markup: str, pattern: str) -> Any | None:
+    """
+    Returns the JSON captured by the pattern's first group, searching the
+    raw page without parsing it. Returns None if there is no match or the
+    match is not valid JSON.
+
+    Args:
+        markup (str): the page's html
+        pattern (str): regex with a group capturing the JSON
+    """
+    match = re.search(pattern, markup)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
@@ -0,0 +1,210 @@
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Callable
+from custom_types.custom_types import ReviewStatsDict
+from scraper.client import ScraperClient
+from scraper.scraper import (
+    get_area_name_and_id, get_navbar_anchor_tags, get_route_distribution,
+    is_manageable, parse_reviews
+)
+
+# Client holding the parsing tags of a parser process
+_worker_client: ScraperClient | None = None
+
+
+def _init_worker(config: dict[str, str] | None) -> None:
+    """
+    Creates the parser process's client once, using the configuration of
+    the client that fetched the pages so its overrides are kept
+    """
+    global _worker_client
+    _worker_client = ScraperClient(config=config)
+
+
+def default_parse_processes() -> int:
+    """
+    Returns the number of parser processes used when none is given: one
+    less than the number of CPUs (up to 4), leaving a CPU to the fetching
+    threads, or 0 (parse on the fetching threads) on a single CPU
+    """
+    return min(4, (os.cpu_count() or 1) - 1)
+
+
+def parse_area_page(
+    html: str, client: ScraperClient | None = None
+) -> tuple[dict[str, int], list[tuple[str, str]] | None]:
+    """
+    Returns the area's grade distribution and, if the area is not
+    manageable, the names and ids of its sub-areas.
+
+    Args:
+        html: raw html of the area's page
+        client: optional client, defaults to the parser process's client
+    """
+    client = client or _worker_client
+    grade_distribution = get_route_distribution(html, client=client)
+    if is_manageable(grade_distribution):
+        return grade_distribution, None
+    sub_areas = [
+        get_area_name_and_id(tag.get('href'))
+        for tag in get_navbar_anchor_tags('', html=html, client=client)
+    ]
+    return grade_distribution, sub_areas
+
+
+def parse_reviews_page(
+    html: str, client: ScraperClient | None = None
+) -> ReviewStatsDict:
+    """
+    Returns the number of reviews by route id of a page of reviews
+
+    Args:
+        html: raw html of the page
+        client: optional client, defaults to the parser process's client
+    """
+    return parse_reviews(html, client=client or _worker_client)
+
+
+def _timed(func: Callable[[str], Any], html: str) -> tuple[Any, float]:
+    """Returns the function's result and its CPU time in seconds"""
+    start = time.thread_time()
+    result = func(html)
+    return result, time.thread_time() - start
+
+
+class StageMetrics:
+    """
+    Thread safe throughput counters of a pipeline stage
+
+    Attributes:
+        name (str): name of the stage
+        items (int): number of pages processed
+        num_bytes (int): number of bytes processed
+        busy (float): seconds spent processing pages
+        blocked (float): seconds spent waiting on the next stage
+    """
+    name: str
+    items: int
+    num_bytes: int
+    busy: float
+    blocked: float
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.items = 0
+        self.num_bytes = 0
+        self.busy = 0
+        self.blocked = 0
+        self._lock = threading.Lock()
+
+    def record(self, num_bytes: int, seconds: float) -> None:
+        """Counts a processed page"""
+        with self._lock:
+            self.items += 1
+            self.num_bytes += num_bytes
+            self.busy += seconds
+
+    def record_blocked(self, seconds: float) -> None:
+        """Counts the time spent waiting on the next stage"""
+        with self._lock:
+            self.blocked += seconds
+
+    def summary(self, wall_time: float) -> str:
+        """Returns the stage's throughput over the wall time as text"""
+        wall_time = wall_time or 1e-9
+        return (
+            f'{self.name:<6} {self.items:6d} pages '
+            f'{self.items / wall_time:8.1f} pages/s '
+            f'{self.num_bytes / wall_time / 1e6:7.2f} MB/s  '
+            f'busy {self.busy:7.2f}s  blocked {self.blocked:6.2f}s'
+        )
+
+
+class ParsePipeline:
+    """
+    Parses fetched pages on a pool of processes so the download threads
+    keep fetching while pages are parsed. At most max_pending pages wait
+    for or are being parsed. Submitting another page blocks the fetching
+    thread until a page is parsed (backpressure), so memory stays bounded
+    when parsing falls behind.
+
+    Attributes:
+        fetch (StageMetrics): throughput of the fetching threads
+        parse (StageMetrics): throughput of the parser processes
+    """
+    fetch: StageMetrics
+    parse: StageMetrics
+
+    def __init__(
+        self, processes: int, *, max_pending: int = 16,
+        config: dict[str, str] | None = None,
+        fetch: StageMetrics | None = None, parse: StageMetrics | None = None
+    ) -> None:
+        """
+        Args:
+            processes (int): number of parser processes
+            max_pending (int): maximum number of pages waiting to be parsed
+            config (dict[str, str]): configuration of the parser processes'
+                clients (see ScraperClient.config), defaults to the .env
+                file
+            fetch (StageMetrics): optional metrics of the fetching threads
+            parse (StageMetrics): optional metrics of the parser processes
+        """
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker,
+            initargs=(config,), mp_context=multiprocessing.get_context('spawn')
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.fetch = fetch or StageMetrics('fetch')
+        self.parse = parse or StageMetrics('parse')
+
+    def submit(self, func: Callable[[str], Any], html: str) -> Future:
+        """
+        Submits the page to be parsed by the function. Blocks while
+        max_pending pages are waiting to be parsed.
+
+        Args:
+            func: module level parsing function (must be picklable)
+            html: raw html of the page
+
+        Returns:
+            Future: resolves to the function's result
+        """
+        start = time.perf_counter()
+        self._slots.acquire()
+        self.fetch.record_blocked(time.perf_counter() - start)
+        try:
+            timed = self._executor.submit(_timed, func, html)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        result = Future()
+        num_bytes = len(html)
+
+        def on_parsed(future: Future) -> None:
+            self._slots.release()
+            try:
+                value, seconds = future.result()
+            except BaseException as e:
+                result.set_exception(e)
+                return
+            self.parse.record(num_bytes, seconds)
+            result.set_result(value)
+
+        timed.add_done_callback(on_parsed)
+        return result
+
+    def close(self) -> None:
+        """Waits for the submitted pages and stops the parser processes"""
+        self._executor.shutdown()
+
+    def __enter__(self) -> ParsePipeline:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
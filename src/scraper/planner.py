@@ -0,0 +1,296 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import os
+import statistics
+import time
+from typing import TypedDict
+from scraper.catalog import AreaCatalog
+from scraper.client import ScraperClient, get_client
+from scraper.download_record import DownloadRecord
+from scraper.scraper import (
+    generate_area_url, get_area_name_and_id, get_navbar_anchor_tags,
+    get_route_distribution, is_manageable
+)
+from utils.utils import extract_data
+
+GRADES = ['5.6', '5.7', '5.8', '5.9', '5.10', '5.11', '5.12', '5.13']
+
+# Maximum number of routes returned by a single request
+MAX_ROUTES_PER_REQUEST = 1000
+
+# Grade parameters of a request and the number of routes it should return
+GradeRequest = tuple[str, str, int]
+
+
+class AreaPlan(TypedDict):
+    """The grade requests planned for a manageable area"""
+    area_id: str
+    area_name: str
+    requests: list[GradeRequest]
+
+
+class DownloadPlan(TypedDict):
+    """The requests planned for downloading an area"""
+    area_id: str
+    area_name: str
+    num_routes: int
+    area_pages: int
+    grade_requests: int
+    mean_latency: float
+    areas: list[AreaPlan]
+
+
+def load_grade_parameters() -> dict[str, list]:
+    """Returns the grade parameters saved in grade_parameters.json"""
+    return extract_data(
+        os.path.join(os.path.dirname(__file__), 'grade_parameters.json')
+    )
+
+
+def _split_grade(
+    num_routes: int, splits: list[list[str]]
+) -> list[GradeRequest]:
+    """
+    Returns the pieces of a grade requested with its split parameters. The
+    number of routes of each piece is an estimate that assumes the routes
+    are spread evenly over the splits.
+    """
+    size, remainder = divmod(num_routes, len(splits))
+    return [
+        (p_1, p_2, size + (idx < remainder))
+        for idx, (p_1, p_2) in enumerate(splits)
+    ]
+
+
+def plan_grade_requests(
+    grade_distribution: dict[str, int],
+    grade_parameters: dict[str, list] | None = None, *,
+    max_routes: int = MAX_ROUTES_PER_REQUEST
+) -> list[GradeRequest]:
+    """
+    Returns the fewest requests that download every route of the grade
+    distribution with each request returning at most max_routes routes.
+
+    A request covers a range of adjacent grades. Grades with more routes
+    than max_routes are requested using their split parameters, each piece
+    on its own. The routes of a grade are not necessarily spread evenly
+    over its pieces, so a piece is never combined with another grade;
+    doing so could push the request over max_routes and lose routes.
+    Grades without routes are skipped.
+
+    Args:
+        grade_distribution: dictionary with grades and their counts
+        grade_parameters: the grade parameters, defaults to the saved ones
+        max_routes: maximum number of routes returned by a request
+
+    Returns:
+        list[GradeRequest]: the grade parameters of each request and the
+            number of routes it is expected to return
+    """
+    grade_parameters = grade_parameters or load_grade_parameters()
+
+    plan: list[GradeRequest] = []
+    # Routes of the last request if more grades may be added to it
+    load = 0
+    for grade in GRADES:
+        num_routes = grade_distribution.get(grade, 0)
+        if num_routes == 0:
+            continue
+        p_1, p_2 = grade_parameters[grade]
+        splits = grade_parameters.get(f'{grade}-split')
+        if num_routes > max_routes:
+            plan.extend(
+                _split_grade(num_routes, splits) if splits
+                else [(p_1, p_2, num_routes)]
+            )
+            load = 0
+        elif load and load + num_routes <= max_routes:
+            start, _, routes = plan[-1]
+            plan[-1] = (start, p_2, routes + num_routes)
+            load += num_routes
+        else:
+            plan.append((p_1, p_2, num_routes))
+            load = num_routes
+    return plan
+
+
+def grade_band(
+    p_1: str, p_2: str, grade_distribution: dict[str, int],
+    grade_parameters: dict[str, list] | None = None
+) -> dict[str, int]:
+    """
+    Returns the number of routes of each grade a request covers. A request
+    covering part of a split grade counts the whole grade. Two requests with
+    the same band return the same routes unless routes were replaced, so
+    comparing bands tells which requests of a re-download changed.
+
+    Args:
+        p_1: the request's lower grade parameter
+        p_2: the request's upper grade parameter
+        grade_distribution: dictionary with grades and their counts
+        grade_parameters: the grade parameters, defaults to the saved ones
+    """
+    grade_parameters = grade_parameters or load_grade_parameters()
+    band = {}
+    for grade in GRADES:
+        lower, upper = grade_parameters[grade]
+        if int(lower) <= int(p_2) and int(upper) >= int(p_1):
+            band[grade] = grade_distribution.get(grade, 0)
+    return band
+
+
+def _plan_area(
+    area_id: str, area_name: str, client: ScraperClient,
+    grade_parameters: dict[str, list]
+) -> tuple[AreaPlan | None, list[tuple[str, str]], dict[str, int], float]:
+    """
+    Requests the area's page and returns the area's plan if it is
+    manageable or its sub-areas otherwise, along with the area's grade
+    distribution and the request's latency in seconds.
+    """
+    area_url = generate_area_url(area_id, area_name, client=client)
+    start = time.perf_counter()
+    html = client.get(area_url).text
+    latency = time.perf_counter() - start
+    grade_distribution = get_route_distribution(html, client=client)
+
+    if is_manageable(grade_distribution):
+        requests = plan_grade_requests(grade_distribution, grade_parameters)
+        area_plan = AreaPlan(
+            area_id=area_id, area_name=area_name, requests=requests
+        )
+        return area_plan, [], grade_distribution, latency
+
+    sub_areas = [
+        get_area_name_and_id(tag.get('href'))[::-1]
+        for tag in get_navbar_anchor_tags(area_url, html=html, client=client)
+    ]
+    return None, sub_areas, grade_distribution, latency
+
+
+def plan_download(
+    area_id: str, area_name: str, *, client: ScraperClient | None = None,
+    max_workers: int = 4
+) -> DownloadPlan:
+    """
+    Crawls the area's pages (without downloading any routes or reviews)
+    and returns the grade requests a download of the area would send.
+
+    Args:
+        area_id: the area's id
+        area_name: the name of the area
+        client: optional client, defaults to the shared client
+        max_workers: number of area pages requested at once
+    """
+    client = client or get_client()
+    grade_parameters = load_grade_parameters()
+    plan = DownloadPlan(
+        area_id=area_id, area_name=area_name, num_routes=0, area_pages=0,
+        grade_requests=0, mean_latency=0, areas=[]
+    )
+    latencies = []
+    level = [(area_id, area_name)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while level:
+            results = executor.map(
+                lambda area: _plan_area(*area, client, grade_parameters),
+                level
+            )
+            level = []
+            for area_plan, sub_areas, grade_distribution, latency in results:
+                if not latencies:
+                    plan['num_routes'] = sum(grade_distribution.values())
+                latencies.append(latency)
+                if area_plan:
+                    plan['areas'].append(area_plan)
+                    plan['grade_requests'] += len(area_plan['requests'])
+                level.extend(sub_areas)
+    plan['area_pages'] = len(latencies)
+    plan['mean_latency'] = statistics.mean(latencies)
+    return plan
+
+
+def plan_from_catalog(
+    catalog: AreaCatalog, area_id: str, area_name: str,
+    record: DownloadRecord | None = None
+) -> DownloadPlan | None:
+    """
+    Returns the grade requests a download of the area would send, planned
+    from the catalog without any request. A download using the catalog
+    only requests the pages of the manageable areas in the area's
+    DownloadRecord (see AreaDownload.known_page), which are counted as
+    area pages. Returns None if the catalog does not cover every area the
+    download visits.
+
+    Args:
+        catalog: the area catalog
+        area_id: the area's id
+        area_name: the name of the area
+        record: the record a selective download of the area compares
+            against, None if the download is not selective. The grade
+            requests are then an upper bound, the unchanged ones are only
+            known once the recorded areas' pages are requested.
+    """
+    if not catalog.covers(area_id):
+        return None
+    grade_parameters = load_grade_parameters()
+    plan = DownloadPlan(
+        area_id=area_id, area_name=area_name,
+        num_routes=sum(catalog.area_page(area_id)[0].values()),
+        area_pages=0, grade_requests=0, mean_latency=0, areas=[]
+    )
+    level = [(area_id, area_name)]
+    while level:
+        next_level = []
+        for sub_area_id, sub_area_name in level:
+            grade_distribution, sub_areas = catalog.area_page(sub_area_id)
+            if sub_areas is not None:
+                next_level.extend((id_, name) for name, id_ in sub_areas)
+                continue
+            requests = plan_grade_requests(
+                grade_distribution, grade_parameters
+            )
+            plan['areas'].append(AreaPlan(
+                area_id=sub_area_id, area_name=sub_area_name,
+                requests=requests
+            ))
+            plan['grade_requests'] += len(requests)
+            if record and record.covers(sub_area_id):
+                plan['area_pages'] += 1
+        level = next_level
+    return plan
+
+
+def estimate_download_time(
+    plan: DownloadPlan, requests_per_second: float, max_in_flight: int
+) -> float:
+    """
+    Returns the estimated number of seconds a download of the plan takes.
+    Each grade request sends a route request and a review request. The
+    download is limited by either the request rate or the number of
+    requests in flight.
+
+    Args:
+        plan: the planned download
+        requests_per_second: the rate limiter's request rate
+        max_in_flight: the maximum number of requests in flight
+    """
+    num_requests = plan['area_pages'] + 2 * plan['grade_requests']
+    return max(
+        num_requests / requests_per_second,
+        num_requests * plan['mean_latency'] / max_in_flight
+    )
+
+
+def format_plan(plan: DownloadPlan, seconds: float) -> str:
+    """Returns a summary of the plan and its estimated download time"""
+    lines = [
+        f"{plan['area_name']} ({plan['area_id']}): "
+        f"{plan['num_routes']} routes in {len(plan['areas'])} areas",
+        f"Area pages: {plan['area_pages']}",
+        f"Grade requests: {plan['grade_requests']} "
+        f"({2 * plan['grade_requests']} route and review pages)",
+        f"Total requests: {plan['area_pages'] + 2 * plan['grade_requests']}",
+        f"Estimated time: {seconds / 60:.1f} min",
+    ]
+    return '\n'.join(lines)
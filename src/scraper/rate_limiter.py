@@ -0,0 +1,179 @@
+from __future__ import annotations
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket that limits the number of requests started per second
+    together with a cap on the number of requests in flight. A single
+    limiter is shared by every worker, so politeness is enforced globally
+    no matter how many threads are downloading. The limiter can be paused,
+    e.g., when the server asks clients to retry after a while.
+
+    Attributes:
+        _rate (float): tokens added per second
+        _burst (int): maximum number of tokens saved up
+        _tokens (float): currently available tokens
+        _updated (float): time the tokens were last refilled
+        _paused_until (float): no token is handed out before this time
+        _in_flight (threading.BoundedSemaphore): slots for active requests
+    """
+    _rate: float
+    _burst: int
+    _tokens: float
+    _updated: float
+    _paused_until: float
+    _in_flight: threading.BoundedSemaphore
+
+    def __init__(
+        self, requests_per_second: float = 1.0, *, burst: int = 1,
+        max_in_flight: int = 4
+    ) -> None:
+        """
+        Args:
+            requests_per_second (float): sustained request rate
+            burst (int): number of requests that may start back to back
+            max_in_flight (int): maximum number of concurrent requests
+        """
+        self._rate = requests_per_second
+        self._burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+        self._max_in_flight = max_in_flight
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    @property
+    def rate(self) -> float:
+        """Returns the number of requests allowed per second"""
+        return self._rate
+
+    @property
+    def max_in_flight(self) -> int:
+        """Returns the maximum number of concurrent requests"""
+        return self._max_in_flight
+
+    def _take_token(self) -> float:
+        """
+        Takes a token if one is available and returns 0. Otherwise returns
+        the number of seconds until the next token is available.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self._rate
+
+    def pause(self, seconds: float) -> None:
+        """Hands out no tokens for the given number of seconds"""
+        with self._lock:
+            self._paused_until = max(
+                self._paused_until, time.monotonic() + seconds
+            )
+            self._tokens = min(self._tokens, 0)
+            self._updated = max(self._updated, self._paused_until)
+        return
+
+    def on_success(self) -> None:
+        """Called after a successful request, the rate is fixed"""
+        return
+
+    def on_failure(self) -> None:
+        """Called after a failed or throttled request, the rate is fixed"""
+        return
+
+    def acquire(self) -> None:
+        """
+        Blocks until a token and then a request slot are available. The
+        token is taken first, so a request waiting for its turn does not
+        hold a slot a request in flight could use.
+        """
+        wait = self._take_token()
+        while wait:
+            time.sleep(wait)
+            wait = self._take_token()
+        self._in_flight.acquire()
+
+    def release(self) -> None:
+        """Frees the request slot taken by acquire"""
+        self._in_flight.release()
+
+    def __enter__(self) -> RateLimiter:
+        self.acquire()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    RateLimiter that adjusts its rate to the server (additive increase,
+    multiplicative decrease). Every failed or throttled request cuts the
+    rate by the decrease factor and every successful request adds the
+    increase back, so a long crawl settles just below the rate the server
+    tolerates. The rate stays between min_rate and max_rate.
+
+    Attributes:
+        _min_rate (float): slowest rate in requests per second
+        _max_rate (float): fastest rate in requests per second
+        _increase (float): requests per second added after a success
+        _decrease (float): factor the rate is multiplied by after a failure
+    """
+    _min_rate: float
+    _max_rate: float
+    _increase: float
+    _decrease: float
+
+    def __init__(
+        self, requests_per_second: float = 1.0, *, burst: int = 1,
+        max_in_flight: int = 4, min_rate: float | None = None,
+        max_rate: float | None = None, increase: float | None = None,
+        decrease: float = 0.5
+    ) -> None:
+        """
+        Args:
+            requests_per_second (float): initial request rate
+            burst (int): number of requests that may start back to back
+            max_in_flight (int): maximum number of concurrent requests
+            min_rate (float): slowest rate, defaults to a tenth of the
+                initial rate
+            max_rate (float): fastest rate, defaults to the initial rate
+            increase (float): rate added after each success, defaults to a
+                twentieth of the fastest rate
+            decrease (float): factor applied to the rate after a failure
+        """
+        super().__init__(
+            requests_per_second, burst=burst, max_in_flight=max_in_flight
+        )
+        self._max_rate = max_rate or requests_per_second
+        self._min_rate = min(
+            min_rate or requests_per_second / 10, self._max_rate
+        )
+        self._increase = increase or self._max_rate / 20
+        self._decrease = decrease
+
+    def _set_rate(self, rate: float) -> None:
+        """Changes the rate, keeping it within its bounds"""
+        with self._lock:
+            self._rate = min(self._max_rate, max(self._min_rate, rate))
+        return
+
+    def on_success(self) -> None:
+        """Speeds up after a successful request"""
+        self._set_rate(self._rate + self._increase)
+        return
+
+    def on_failure(self) -> None:
+        """Slows down after a failed or throttled request"""
+        self._set_rate(self._rate * self._decrease)
+        return
@@ -0,0 +1,129 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from typing import Iterable, Iterator, TypedDict
+from urllib.parse import urlparse
+import requests
+from scraper.http_cache import normalize_url
+
+
+class RecordedResponse(TypedDict):
+    """A recorded response and the file holding its body"""
+    origin: str
+    path: str
+    status: int
+    content_type: str
+    file: str
+
+
+def recording_key(url: str) -> str:
+    """
+    Returns the path and sorted query of the url, which identify a recorded
+    response regardless of the host it was recorded from.
+    """
+    parsed = urlparse(normalize_url(url))
+    return f'{parsed.path}?{parsed.query}' if parsed.query else parsed.path
+
+
+class ResponseRecorder:
+    """
+    Saves every response received by a ScraperClient so a crawl can be
+    replayed by a ReplayServer. Bodies are saved as files named after the
+    hash of the request and each response is appended to index.jsonl, so
+    recording costs the same for the first and the last page of a crawl.
+    Streamed bodies are written as they are read. Bodies are written to a
+    temporary file that only replaces the body file once complete, so a body
+    that fails mid-stream never truncates the body an earlier index entry
+    points to.
+
+    Attributes:
+        _directory (str): directory holding the recording
+    """
+    _directory: str
+
+    def __init__(self, directory: str) -> None:
+        self._directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def record(
+        self, url: str, response: requests.Response, *, stream: bool = False
+    ) -> None:
+        """
+        Saves the response to the request of the url. The body of a streamed
+        response is saved as the response's iter_content reads it, and the
+        response is only indexed once its whole body has been read.
+
+        Args:
+            url (str): the requested url, including its query
+            response (requests.Response): the response received
+            stream (bool): the response's body has not been read yet
+        """
+        parsed = urlparse(url)
+        path = recording_key(url)
+        file_name = f'{hashlib.sha256(path.encode()).hexdigest()}.body'
+        entry = RecordedResponse(
+            origin=f'{parsed.scheme}://{parsed.netloc}', path=path,
+            status=response.status_code,
+            content_type=response.headers.get('Content-Type', 'text/html'),
+            file=file_name
+        )
+        fp = os.path.join(self._directory, file_name)
+        if stream:
+            iter_content = response.iter_content
+
+            def iter_and_record(*args, **kwargs) -> Iterator[bytes]:
+                yield from self._write(fp, iter_content(*args, **kwargs))
+                self._index(entry)
+
+            response.iter_content = iter_and_record
+            return
+        for _ in self._write(fp, [response.content]):
+            pass
+        self._index(entry)
+        return
+
+    @staticmethod
+    def _write(fp: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Writes the chunks to a temporary file as they are yielded and moves
+        it into place after the last one. The file is left as it was if the
+        generator is not run to the end.
+        """
+        tmp = f'{fp}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    yield chunk
+            os.replace(tmp, fp)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _index(self, entry: RecordedResponse) -> None:
+        """Appends the recorded response to the index"""
+        with self._lock:
+            with open(
+                os.path.join(self._directory, 'index.jsonl'), 'a'
+            ) as index:
+                index.write(json.dumps(entry) + '\n')
+        return
+
+
+def load_recording(directory: str) -> dict[str, RecordedResponse]:
+    """
+    Returns the recorded responses by request path. If a request was
+    recorded more than once, the last response is returned.
+
+    Args:
+        directory (str): directory holding the recording
+    """
+    responses = {}
+    with open(os.path.join(directory, 'index.jsonl'), 'r') as index:
+        for line in index:
+            entry = json.loads(line)
+            responses[entry['path']] = entry
+    return responses
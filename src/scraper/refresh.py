@@ -0,0 +1,111 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+from typing import Callable
+from custom_types.custom_types import ReviewStatsDict
+from parser.parser import update_source_reviews
+from scraper.cancellation import CancellationToken
+from scraper.catalog import AreaCatalog, load_catalog
+from scraper.client import ScraperClient, get_client
+from scraper.planner import plan_download, plan_from_catalog
+from scraper.scraper import generate_request_urls, get_reviews, save_reviews
+from utils.utils import extract_data
+
+
+def refresh_reviews(
+    area_id: str, area_name: str,
+    callback: Callable[[int], None] | None = None, *,
+    client: ScraperClient | None = None, max_workers: int = 4,
+    catalog: AreaCatalog | None = None,
+    cancel_token: CancellationToken | None = None
+) -> ReviewStatsDict:
+    """
+    Requests only the review pages of a downloaded area and returns the
+    number of reviews by route id. The review requests are planned like a
+    download's (from the catalog if it covers the area, otherwise from the
+    area pages), so every route of the area is counted without requesting
+    its route pages again. The counts collected are merged into
+    parser/reviews.bin even if a request failed.
+
+    Args:
+        area_id: the area's id
+        area_name: the name of the area
+        callback: optional function called with the progress percentage
+        client: optional client, defaults to the shared client
+        max_workers: number of pages requested at once
+        catalog: catalog the requests are planned from, defaults to the
+            saved catalog if it is recent (see load_catalog)
+        cancel_token: optional token that stops the refresh
+    """
+    client = client or get_client()
+    catalog = catalog or load_catalog()
+    plan = catalog and plan_from_catalog(catalog, area_id, area_name)
+    if not plan:
+        plan = plan_download(
+            area_id, area_name, client=client, max_workers=max_workers
+        )
+    urls = [
+        generate_request_urls(area['area_id'], p_1, p_2, client=client)[1]
+        for area in plan['areas'] for p_1, p_2, _ in area['requests']
+    ]
+    reviews: ReviewStatsDict = {}
+    finished = []
+    lock = threading.Lock()
+
+    def refresh(url: str) -> None:
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        page = get_reviews(url, client=client)
+        with lock:
+            reviews.update(page)
+            finished.append(url)
+            percent = 100 * len(finished) // len(urls)
+        if callback:
+            callback(percent)
+
+    try:
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(refresh, url) for url in urls]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+    finally:
+        save_reviews(reviews)
+    return reviews
+
+
+def refresh_region_reviews(
+    region: str, callback: Callable[[int], None] | None = None, *,
+    client: ScraperClient | None = None, max_workers: int = 4,
+    cancel_token: CancellationToken | None = None
+) -> dict[str, int]:
+    """
+    Refreshes the review counts of a downloaded region and updates its json
+    source in place. The routes' scores depend on their number of reviews,
+    which changes far more often than the routes themselves.
+
+    Args:
+        region: name of the region, as listed in area_map.json
+        callback: optional function called with the progress percentage
+        client: optional client, defaults to the shared client
+        max_workers: number of pages requested at once
+        cancel_token: optional token that stops the refresh
+
+    Returns:
+        dict[str, int]: the new number of reviewers by route id of the
+            routes whose count changed
+    """
+    areas = extract_data(os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'data', 'area_map.json'
+    ))
+    if region not in areas:
+        raise Exception(f'Region not found: {region}')
+    reviews = refresh_reviews(
+        areas[region]['id'], region, callback, client=client,
+        max_workers=max_workers, cancel_token=cancel_token
+    )
+    return update_source_reviews(region, reviews)
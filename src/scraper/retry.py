@@ -0,0 +1,94 @@
+from __future__ import annotations
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+import requests
+
+# Statuses worth retrying: throttling and temporary server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Errors raised by requests that a later attempt may not run into. A
+# ChunkedEncodingError is raised when the connection drops mid body.
+RETRY_ERRORS = (
+    requests.ConnectionError, requests.Timeout,
+    requests.exceptions.ChunkedEncodingError
+)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Returns the number of seconds a Retry-After header asks clients to wait.
+    The header holds either a number of seconds or an HTTP date. Returns
+    None if the header is missing or invalid.
+
+    Args:
+        value (str): value of the Retry-After header
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request is retried and how long to wait first.
+    Waits grow exponentially with the attempt and are fully jittered (a
+    random share of the exponential delay), so threads that failed together
+    do not retry together. A Retry-After header sets the least wait.
+
+    Attributes:
+        max_retries (int): number of retries after the first attempt
+        base_delay (float): seconds the first retry waits at most
+        max_delay (float): longest wait in seconds
+        retries (int): number of retries so far
+    """
+    max_retries: int
+    base_delay: float
+    max_delay: float
+    retries: int
+
+    def __init__(
+        self, max_retries: int = 5, *, base_delay: float = 0.5,
+        max_delay: float = 60
+    ) -> None:
+        """
+        Args:
+            max_retries (int): number of retries after the first attempt
+            base_delay (float): seconds the first retry waits at most
+            max_delay (float): longest wait in seconds
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def should_retry(response: requests.Response) -> bool:
+        """Returns true if the response's status is worth retrying"""
+        return response.status_code in RETRY_STATUSES
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """
+        Returns the seconds to wait before the next attempt and counts the
+        retry
+
+        Args:
+            attempt (int): number of attempts that failed so far
+            retry_after (float): seconds the server asked clients to wait
+        """
+        with self._lock:
+            self.retries += 1
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(0, backoff)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
@@ -1,17 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+import gzip
 import json
 import os
 import re
-import requests
+import threading
 import time
 from typing import Callable
-from dotenv import load_dotenv
 from urllib.parse import urlencode, urlparse, urlunparse
-from bs4 import BeautifulSoup, Comment
+import requests
+from bs4 import BeautifulSoup, Comment, SoupStrainer
 from bs4.element import Tag
+from custom_types.custom_types import AreaEntry, AreaMap, ReviewStatsDict
+from scraper.cancellation import CancellationToken
+from scraper.catalog import AreaCatalog
+from scraper.client import ScraperClient, get_client
+from scraper.parsing import parse_html, search_json
+from scraper.retry import RETRY_ERRORS
 from utils.utils import (
-    extract_data, save_json_data, string_to_int, zip_csv_files
+    extract_data, get_parser_dir, load_review_counts, save_json_data,
+    save_review_counts, string_to_int
 )
 
+# Downloads running in parallel may save their review counts at once
+_reviews_lock = threading.Lock()
+
 
 def get_area_name_and_id(url: str) -> tuple[str, str]:
     """
@@ -24,21 +36,26 @@ def get_area_name_and_id(url: str) -> tuple[str, str]:
 
 
 def get_navbar_anchor_tags(
-    url: str, *, soup: BeautifulSoup = None, include_num_routes: bool = False
+    url: str, *, soup: BeautifulSoup = None, html: str | None = None,
+    include_num_routes: bool = False, client: ScraperClient | None = None
 ) -> list[Tag] | list[tuple[Tag, int]]:
     """
     Returns a list of tags in the URL's navbar
     Args:
         url: the area's url
-        html: the parsed html if site has already been requested
+        soup: the parsed html if site has already been requested
+        html: the raw html if site has already been requested. Only the
+            navbar links are parsed.
+        client: optional client, defaults to the shared client
     """
-    load_dotenv()
-    navbar_link_class = os.getenv('NAVBAR_LINK_CLASS')
-    val_id = os.getenv('VAL_ID')
+    client = client or get_client()
+    navbar_link_class = client.env('NAVBAR_LINK_CLASS')
+    val_id = client.env('VAL_ID')
 
     if not soup:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        if html is None:
+            html = client.get(url).text
+        soup = parse_html(html, SoupStrainer(class_=navbar_link_class))
     navbar_links = soup.find_all(class_=navbar_link_class)
 
     tags = []
@@ -55,15 +72,17 @@ def get_navbar_anchor_tags(
     ]
 
 
-def get_main_area_urls() -> list[tuple[Tag, int]]:
+def get_main_area_urls(
+    *, client: ScraperClient | None = None
+) -> list[tuple[Tag, int]]:
     """Returns the main areas per the source URL's homepage"""
-    load_dotenv()
-    url = os.getenv('URL')
-    table_id = os.getenv('TABLE_ID')
-    num_routes = os.getenv('NUMBER_OF_ROUTES')
+    client = client or get_client()
+    url = client.env('URL')
+    table_id = client.env('TABLE_ID')
+    num_routes = client.env('NUMBER_OF_ROUTES')
 
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    response = client.get(url)
+    soup = parse_html(response.text, SoupStrainer(id=table_id))
     main_regions = []
     for num in soup.find(id=table_id).select(num_routes):
         region = num.find_next_sibling()
@@ -71,7 +90,7 @@ def get_main_area_urls() -> list[tuple[Tag, int]]:
     return main_regions
 
 
-def create_country_map(states: list[Tag]) -> None:
+def create_country_map(states: list[Tag]) -> AreaMap:
     """
     Returns a dictionary populated with usa states and their ID and total
     number of routes
@@ -88,58 +107,151 @@ def create_country_map(states: list[Tag]) -> None:
     return regions
 
 
-def add_international_countries(url: str, countries: dict[str, int]) -> None:
+def add_international_countries(
+    url: str, countries: AreaMap, *, client: ScraperClient | None = None,
+    executor: ThreadPoolExecutor | None = None
+) -> None:
     """
     Adds countries with over 50 routes and their corresponding ID's to
-    the given dictionary.
+    the given dictionary. The continents' pages are requested concurrently
+    if an executor is given.
     Args:
         url: URL that contains continents in the navbar
         countries: dictionary that maps countries and their ID's
+        client: optional client, defaults to the shared client
+        executor: optional pool the continents' pages are requested on
     """
-    continents = get_navbar_anchor_tags(url)
-    for continent in continents:
-        country_tags = get_navbar_anchor_tags(
-            continent.get('href'), include_num_routes=True
-        )
-        for country_tag, routes in country_tags:
+    continents = get_navbar_anchor_tags(url, client=client)
+    country_tags = (executor.map if executor else map)(
+        lambda continent: get_navbar_anchor_tags(
+            continent.get('href'), include_num_routes=True, client=client
+        ),
+        continents
+    )
+    for tags in country_tags:
+        for country_tag, routes in tags:
             area_name, area_id = get_area_name_and_id(country_tag.get('href'))
             countries[area_name] = {'id': area_id, 'routes': routes}
 
 
-def save_area_ids() -> None:
+def crawl_area(
+    area_name: str, area: AreaEntry, *, client: ScraperClient | None = None
+) -> list[tuple[str, AreaEntry]]:
+    """
+    Requests the area's page and records its grade distribution. If the
+    area is not manageable, its sub-areas are recorded as well. Returns the
+    sub-areas that have to be crawled next.
+    Args:
+        area_name: the name of the area
+        area: the area's entry, updated in place
+        client: optional client, defaults to the shared client
+    """
+    client = client or get_client()
+    area_url = generate_area_url(area['id'], area_name, client=client)
+    html = client.get(area_url).text
+    grade_distribution = get_route_distribution(html, client=client)
+    if grade_distribution is None:
+        return []
+    area['grades'] = grade_distribution
+    if is_manageable(grade_distribution):
+        return []
+
+    area['sub_areas'] = {}
+    for tag, routes in get_navbar_anchor_tags(
+        area_url, html=html, include_num_routes=True, client=client
+    ):
+        name, sub_area_id = get_area_name_and_id(tag.get('href'))
+        area['sub_areas'][name] = {'id': sub_area_id, 'routes': routes}
+    return list(area['sub_areas'].items())
+
+
+def crawl_sub_areas(
+    regions: AreaMap, *, client: ScraperClient | None = None,
+    executor: ThreadPoolExecutor | None = None
+) -> None:
+    """
+    Records the grade distribution of every region and, recursively, of
+    the sub-areas of regions that are too large to be downloaded at once.
+    The areas of each level are requested concurrently if an executor is
+    given.
+    Args:
+        regions: the regions to be crawled, updated in place
+        client: optional client, defaults to the shared client
+        executor: optional pool the area pages are requested on
+    """
+    level = list(regions.items())
+    while level:
+        sub_areas = (executor.map if executor else map)(
+            lambda area: crawl_area(*area, client=client), level
+        )
+        level = [area for areas in sub_areas for area in areas]
+    return
+
+
+def save_area_ids(
+    *, client: ScraperClient | None = None, max_workers: int = 4,
+    recursive: bool = False
+) -> None:
     """
-    Saves a dictionary with regions and their ID's
+    Saves a dictionary with regions and their ID's. The continents (and
+    the areas, if recursive) are requested on a pool of threads that share
+    the client's rate limiter.
+    Args:
+        client: optional client, defaults to the shared client
+        max_workers: number of pages requested at once
+        recursive: record the regions' grade distributions and the
+            sub-areas of regions that are too large to be downloaded at once.
+            The areas are also saved as an AreaCatalog.
     """
-    area_urls = get_main_area_urls()
+    area_urls = get_main_area_urls(client=client)
     area_urls.pop()
     regions = create_country_map(area_urls[:-1])
 
     international_url = area_urls[-1][0].get('href')
-    add_international_countries(international_url, regions)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        add_international_countries(
+            international_url, regions, client=client, executor=executor
+        )
+        if recursive:
+            crawl_sub_areas(regions, client=client, executor=executor)
     fp = os.path.join(
         os.path.dirname(os.path.dirname(__file__)), 'data', 'area_map.json'
     )
     save_json_data(fp, regions)
+    if recursive:
+        AreaCatalog.from_area_map(regions).save()
 
 
-def generate_area_url(area_id: str, area_name: str) -> str:
+def generate_area_url(
+    area_id: str, area_name: str, *, client: ScraperClient | None = None
+) -> str:
     """Generates the area's url based on the id and name"""
-    load_dotenv()
-    base_url = os.getenv('AREA_URL')
+    client = client or get_client()
+    base_url = client.env('AREA_URL')
     return '/'.join([base_url, area_id, area_name.lower().replace(' ', '-')])
 
 
-def get_route_distribution(html: BeautifulSoup) -> dict[str, int] | None:
+def get_route_distribution(
+    html: BeautifulSoup | str, *, client: ScraperClient | None = None
+) -> dict[str, int] | None:
     """
     Returns the route grade distribution
     Args:
-        html: parsed html of area's page
+        html: parsed or raw html of area's page. Raw html is searched for
+            the stats without being parsed, falling back to parsing the
+            stats container.
+        client: optional client, defaults to the shared client
     """
+    client = client or get_client()
+    container_id = client.env('AREA_STATS_CONTAINER')
+    element_type = client.env('AREA_STATS_ELEMENT')
+    regex_pattern = client.env('AREA_STATS_REGEX')
 
-    load_dotenv()
-    container_id = os.getenv('AREA_STATS_CONTAINER')
-    element_type = os.getenv('AREA_STATS_ELEMENT')
-    regex_pattern = os.getenv('AREA_STATS_REGEX')
+    if isinstance(html, str):
+        data = search_json(html, regex_pattern)
+        if data is not None:
+            return clean_data(data)
+        html = parse_html(html, SoupStrainer(id=container_id))
 
     container = html.find(id=container_id)
     elements = container.find_all(element_type)
@@ -174,15 +286,18 @@ def is_manageable(data: dict[str, int]) -> bool:
     return all([(data[grade] <= 1000) for grade in grades])
 
 
-def url_generator(params: dict[str, str]) -> tuple[str, str]:
+def url_generator(
+    params: dict[str, str], *, client: ScraperClient | None = None
+) -> tuple[str, str]:
     """
     Returns two URLS's to extract routes and their number of reviews
     Args:
         params: dictionary with the query parameters
+        client: optional client, defaults to the shared client
     """
-    load_dotenv()
-    route_url = urlparse(os.getenv('ROUTE_DATA_URL'))
-    reviews_url = urlparse(os.getenv('ROUTE_REVIEWS_URL'))
+    client = client or get_client()
+    route_url = urlparse(client.env('ROUTE_DATA_URL'))
+    reviews_url = urlparse(client.env('ROUTE_REVIEWS_URL'))
     query_string = urlencode(params)
     return (
         urlunparse(route_url._replace(query=query_string)),
@@ -190,172 +305,229 @@ def url_generator(params: dict[str, str]) -> tuple[str, str]:
     )
 
 
-def get_reviews(url: str) -> None:
+def get_reviews(
+    url: str, *, client: ScraperClient | None = None
+) -> ReviewStatsDict:
     """
-    Saves the reviews by route
+    Returns the number of reviews by route id of the page. The counts are
+    accumulated by the caller and saved once with save_reviews.
     Args:
         url: url of page with review data
+        client: optional client, defaults to the shared client
     """
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    load_dotenv()
-    data = soup.find(
-        os.getenv('REVIEW_ELEMENT'), class_=os.getenv('REVIEW_ELEMENT_CLASS')
-    )
-    if data is None:
-        return
+    client = client or get_client()
+    response = client.get(url)
+    return parse_reviews(response.text, client=client)
 
-    key_word = os.getenv('REVIEW_KEYWORD')
-    fp = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)), 'parser', 'reviews.json'
-    )
-    reviews = extract_data(fp)
 
+def parse_reviews(
+    html: BeautifulSoup | str, *, client: ScraperClient | None = None
+) -> ReviewStatsDict:
+    """
+    Returns the number of reviews by route id of a page of reviews
+    Args:
+        html: parsed or raw html of the page. Only the reviews element of
+            raw html is parsed.
+        client: optional client, defaults to the shared client
+    """
+    client = client or get_client()
+    element_type = client.env('REVIEW_ELEMENT')
+    element_class = client.env('REVIEW_ELEMENT_CLASS')
+    if isinstance(html, str):
+        html = parse_html(
+            html, SoupStrainer(element_type, class_=element_class)
+        )
+    data = html.find(element_type, class_=element_class)
+    if data is None:
+        return {}
+
+    key_word = client.env('REVIEW_KEYWORD')
+    reviews = {}
     comments = data.find_all(string=lambda text: isinstance(text, Comment))
     for comment in comments:
         if key_word in comment:
-            reviews[comment.split("\\")[-1].split("-")[-1]] = (
+            reviews[int(comment.split("\\")[-1].split("-")[-1])] = (
                 string_to_int(comment.find_next_sibling("span").get_text())
             )
+    return reviews
 
-    save_json_data(fp, reviews)
+
+def save_reviews(
+    reviews: ReviewStatsDict, parser_dir: str | None = None
+) -> None:
+    """
+    Merges the review counts into parser/reviews.bin
+    Args:
+        reviews: number of reviews by route id
+        parser_dir: directory holding reviews.bin, defaults to
+            get_parser_dir()
+    """
+    if not reviews:
+        return
+    fp = os.path.join(parser_dir or get_parser_dir(), 'reviews.bin')
+    with _reviews_lock:
+        save_review_counts(fp, load_review_counts(fp) | reviews)
     return
 
 
-def get_routes(url: str) -> None:
+class CsvRowCounter:
+    """
+    Counts the records of a csv file fed to it in chunks. Line breaks within
+    quoted fields do not end a record and the first record (the header) is
+    not counted.
+
+    Attributes:
+        num_rows (int): number of records counted so far
+        _in_quotes (bool): the last chunk ended within a quoted field
+        _partial (bool): the record being read is not blank
+        _header (bool): the header has been read
     """
-    Saves the routes
+    num_rows: int
+    _in_quotes: bool
+    _partial: bool
+    _header: bool
+
+    def __init__(self) -> None:
+        self.num_rows = 0
+        self._in_quotes = False
+        self._partial = False
+        self._header = False
+
+    def feed(self, chunk: bytes) -> int:
+        """Counts the records ended by the chunk and returns their number"""
+        *lines, rest = chunk.split(b'\n')
+        num_rows = 0
+        for line in lines:
+            self._partial = self._partial or bool(line.strip())
+            self._in_quotes ^= line.count(b'"') % 2 == 1
+            if self._in_quotes or not self._partial:
+                continue
+            num_rows += self._header
+            self._header = True
+            self._partial = False
+        self._partial = self._partial or bool(rest.strip())
+        self._in_quotes ^= rest.count(b'"') % 2 == 1
+        self.num_rows += num_rows
+        return num_rows
+
+    def close(self) -> int:
+        """Counts the last record if it is not followed by a line break"""
+        num_rows = int(self._partial and self._header)
+        self._header = self._header or self._partial
+        self._partial = False
+        self.num_rows += num_rows
+        return num_rows
+
+
+def get_routes(
+    url: str, *, file_name: str | None = None, directory: str | None = None,
+    compress: bool = False, chunk_size: int = 64 * 1024,
+    on_routes: Callable[[int], None] | None = None,
+    on_response: Callable[[requests.Response], None] | None = None,
+    cancel_token: CancellationToken | None = None,
+    client: ScraperClient | None = None
+) -> tuple[int, int]:
+    """
+    Streams the routes to a file and returns the number of bytes received
+    and the number of routes saved. The response is written as it arrives,
+    so memory use does not depend on the size of the page. The page is
+    written to a .part file that is moved into place once complete, and
+    deleted if the download fails or is cancelled. The body is read after
+    the client's request returns, so a connection dropped mid body is
+    retried here: the whole page is requested again (as allowed by the
+    client's retry policy) and written to a new .part file.
     Args:
         url: url of page with route data
+        file_name: name of the saved file. Defaults to the next free index,
+            which is not safe when pages are downloaded concurrently.
+        directory: directory the file is saved to, defaults to
+            parser/input_data
+        compress: gzip the file as it is written (.gz is added to its name)
+        chunk_size: number of bytes read from the response at a time
+        on_routes: optional function called with the number of routes in
+            each chunk as the page is streamed, and with minus the routes
+            of an attempt that failed
+        on_response: optional function called with the response of each
+            attempt before its body is read (i.e., to tell whether the cache
+            served it)
+        cancel_token: optional token checked between chunks
+        client: optional client, defaults to the shared client
     """
-    parent_dir = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)), 'parser', 'input_data'
-    )
-    file_name = f'input_file_{len(os.listdir(parent_dir))}.csv'
+    client = client or get_client()
+    parent_dir = directory or os.path.join(get_parser_dir(), 'input_data')
+    os.makedirs(parent_dir, exist_ok=True)
+    if file_name is None:
+        file_name = f'input_file_{len(os.listdir(parent_dir))}.csv'
+    if compress and not file_name.endswith('.gz'):
+        file_name = f'{file_name}.gz'
     fp = os.path.join(parent_dir, file_name)
 
-    response = requests.get(url)
-    response.raise_for_status()
-    with open(fp, "wb") as file:
-        file.write(response.content)
-    return
-
-
-def scrape_data(area_id: str, param_1_val: str, param_2_val: str) -> None:
-    """TODO"""
-
-    load_dotenv()
-    variable_params = {
-        os.getenv('ID_PARAM'): area_id,
-        os.getenv('GRADE_PARAM_1'): param_1_val,
-        os.getenv('GRADE_PARAM_2'): param_2_val,
-    }
-    constant_parameters = extract_data(
+    part_fp = f'{fp}.part'
+    retry = client.retry
+    attempt = 0
+    while True:
+        attempt += 1
+        counter = CsvRowCounter()
+        num_bytes = 0
+        try:
+            with client.get(url, stream=True) as response:
+                if on_response:
+                    on_response(response)
+                response.raise_for_status()
+                with (gzip.open if compress else open)(part_fp, 'wb') as file:
+                    for chunk in response.iter_content(chunk_size):
+                        if cancel_token:
+                            cancel_token.raise_if_cancelled()
+                        file.write(chunk)
+                        num_bytes += len(chunk)
+                        num_rows = counter.feed(chunk)
+                        if on_routes and num_rows:
+                            on_routes(num_rows)
+            os.replace(part_fp, fp)
+            break
+        except BaseException as e:
+            if os.path.exists(part_fp):
+                os.remove(part_fp)
+            if on_routes and counter.num_rows:
+                on_routes(-counter.num_rows)
+            if not (
+                isinstance(e, RETRY_ERRORS) and retry
+                and attempt <= retry.max_retries
+            ):
+                raise
+        time.sleep(retry.delay(attempt))
+    num_rows = counter.close()
+    if on_routes and num_rows:
+        on_routes(num_rows)
+    return num_bytes, counter.num_rows
+
+
+def load_constant_parameters() -> dict[str, str]:
+    """Returns the request parameters saved in constant_parameters.json"""
+    return extract_data(
         os.path.join(os.path.dirname(__file__), 'constant_parameters.json')
     )
-    params = constant_parameters | variable_params
-    routes_url, reviews_url = url_generator(params)
-    time.sleep(1)
-    get_reviews(reviews_url)
-    time.sleep(1)
-    get_routes(routes_url)
-    return
-
-
-def download_area_helper(
-    area_id: str, area_name: str, grade_distribution: dict[str, int],
-    *, cache: list[int], callback: Callable[[int], None] = None
-) -> None:
-    """TODO"""
-    grade_parameters = extract_data(
-        os.path.join(os.path.dirname(__file__), 'grade_parameters.json')
-    )
-    num_routes, param_1_val, param_2_val = None, None, None
-    grades = ['5.6', '5.7', '5.8', '5.9', '5.10', '5.11', '5.12', '5.13']
-
-    def reset_params() -> None:
-        """
-        Resets the number of routes, parameter 1 and parameter 2 and pops
-        the first grade if the number of routes is less than 1000
-        """
-        nonlocal num_routes, param_1_val, param_2_val
-
-        if len(cache) == 1:
-            cache.append(0)
-        else:
-            cache[1] += num_routes if num_routes is not None else 0
-        if callback:
-            callback(int(100 * cache[1] // cache[0]))
-
-        num_routes = grade_distribution[grades[0]]
-        param_1_val = grade_parameters[grades[0]][0]
-        param_2_val = grade_parameters[grades[0]][1]
-        if num_routes < 1000:
-            grades.pop(0)
-        return
-
-    reset_params()
-    while len(grades):
-        if num_routes + grade_distribution[grades[0]] < 1000:
-            num_routes += grade_distribution[grades[0]]
-            param_2_val = grade_parameters[grades[0]][1]
-            grades.pop(0)
-        elif num_routes > 1000:
-            for p_1, p_2 in grade_parameters[f'{grades[0]}-split']:
-                scrape_data(area_id, p_1, p_2)
-            grades.pop(0)
-            reset_params()
-        else:
-            scrape_data(area_id, param_1_val, param_2_val)
-            reset_params()
-    scrape_data(area_id, param_1_val, param_2_val)
-    return
-
 
-def download_area(
-    area_id: str, area_name: str, *, cache: list[int] = None,
-    callback: Callable[[int], None] = None
 
-) -> None:
-    area_url = generate_area_url(area_id, area_name)
-    response = requests.get(area_url)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    area_grade_distribution = get_route_distribution(soup)
-
-    if cache is None:
-        cache = [0]
-        for grade in area_grade_distribution:
-            cache[0] += area_grade_distribution[grade]
-
-    if is_manageable(area_grade_distribution):
-        download_area_helper(
-            area_id, area_name, area_grade_distribution,
-            cache=cache, callback=callback
-        )
-
-    else:
-        sub_areas = get_navbar_anchor_tags(area_url, soup=soup)
-        for sub_area in sub_areas:
-            area_name, area_id = get_area_name_and_id(sub_area.get('href'))
-            download_area(area_id, area_name, cache=cache, callback=callback)
-        return
-
-
-def download_and_merge_data(
-    area_id: str, area_name: str,
-    callback: Callable[[int], None] = None
-) -> None:
+def generate_request_urls(
+    area_id: str, param_1_val: str, param_2_val: str,
+    *, client: ScraperClient | None = None
+) -> tuple[str, str]:
     """
-    Downloads the area's information & zips all of the resulting .csv files
+    Returns the route and review urls of the area's routes within the
+    given grade parameters
     Args:
         area_id: the area's id
-        area_name: the name of the area
+        param_1_val: the lower grade parameter
+        param_2_val: the upper grade parameter
+        client: optional client, defaults to the shared client
     """
-    download_area(area_id, area_name, callback=callback)
-    parent_dir = os.path.dirname(os.path.dirname(__file__))
-    file_name = f"{area_name.replace(' ', '_').lower()}.csv"
-    src = os.path.join(parent_dir, 'parser', 'input_data')
-    dest = os.path.join(parent_dir, 'parser', 'crags_by_area', file_name)
-    delete_input_files = True
-    zip_csv_files(src, dest, delete_input_files)
-    return
+    client = client or get_client()
+    variable_params = {
+        client.env('ID_PARAM'): area_id,
+        client.env('GRADE_PARAM_1'): param_1_val,
+        client.env('GRADE_PARAM_2'): param_2_val,
+    }
+    params = load_constant_parameters() | variable_params
+    return url_generator(params, client=client)
+
@@ -0,0 +1,266 @@
+from __future__ import annotations
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+from typing import Any, Hashable
+from urllib.parse import parse_qs, urlparse
+from custom_types.crag import Area, QueryContext, RouteFilterWidget
+from custom_types.grade import Grade
+from custom_types.ranking_model import RankingModel
+from data.ranking import crag_to_row, rank_areas, rank_crags
+
+# Normalized query used as the cache key
+Query = tuple[tuple[str, Any], ...]
+
+
+class ResponseCache:
+    """
+    Thread safe least recently used cache for query responses.
+
+    Attributes:
+        _max_size (int): maximum number of responses kept
+        _responses (OrderedDict): cached responses by query key
+        _lock (threading.Lock): guards the responses and counters
+    """
+    _max_size: int
+    _responses: OrderedDict[Hashable, bytes]
+    _lock: threading.Lock
+
+    def __init__(self, max_size: int = 256) -> None:
+        self._max_size = max_size
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> bytes | None:
+        """Returns the cached response or None if it is not cached"""
+        with self._lock:
+            response = self._responses.get(key)
+            if response is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._responses.move_to_end(key)
+            return response
+
+    def put(self, key: Hashable, response: bytes) -> None:
+        """Caches the response and evicts the least recently used one"""
+        with self._lock:
+            self._responses[key] = response
+            self._responses.move_to_end(key)
+            while len(self._responses) > self._max_size:
+                self._responses.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes all cached responses"""
+        with self._lock:
+            self._responses.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        """Returns the cache's size, hits and misses"""
+        with self._lock:
+            return {
+                'size': len(self._responses),
+                'hits': self._hits,
+                'misses': self._misses,
+            }
+
+
+def parse_query(params: dict[str, list[str]]) -> Query:
+    """
+    Validates and normalizes the query string parameters. Raises a
+    ValueError if a parameter is invalid.
+
+    Args:
+        params (dict[str, list[str]]): parameters returned by parse_qs. The
+            area is given as repeated parameters (?area=USA&area=Colorado)
+            and route types as a comma separated list.
+
+    Returns:
+        Query: sorted (name, value) pairs, usable as a cache key
+    """
+    def single(name: str, default: str) -> str:
+        return params.get(name, [default])[-1]
+
+    try:
+        query = {
+            'area': tuple(params.get('area', [])),
+            'min_grade': str(Grade(single('min_grade', '5.0'))),
+            'max_grade': str(Grade(single('max_grade', '5.15'))),
+            'types': tuple(sorted(
+                single('types', 'Trad,Sport,Top Rope').split(',')
+            )),
+            'min_length': int(single('min_length', '0')),
+            'min_pitches': int(single('min_pitches', '0')),
+            'model': single('model', 'raw').lower(),
+            'sort': single('sort', 'score').lower(),
+            'top': int(single('top', '10')),
+        }
+    except (ValueError, IndexError, TypeError) as e:
+        raise ValueError(f'Invalid parameter: {e}')
+
+    if query['model'] not in RankingModel.get_options():
+        raise ValueError(f'Unknown model: {query["model"]}')
+    if query['sort'] not in Area._node_attributes:
+        raise ValueError(f'Unknown sort key: {query["sort"]}')
+    if query['top'] < 0:
+        raise ValueError(f'Invalid top: {query["top"]}')
+    return tuple(sorted(query.items()))
+
+
+def build_context(query: dict[str, Any]) -> QueryContext:
+    """
+    Returns a new context with the query's filter and ranking model. The
+    tree's default context is never modified.
+    """
+    route_filter = RouteFilterWidget()
+    route_filter.lower_grade = query['min_grade']
+    route_filter.upper_grade = query['max_grade']
+    route_filter.route_types = list(query['types'])
+    route_filter.set_min_length(query['min_length'])
+    route_filter.set_min_num_pitches(query['min_pitches'])
+    return QueryContext(route_filter, RankingModel(query['model']))
+
+
+class QueryService:
+    """
+    Answers ranking and stats queries against a single loaded area tree.
+    Each query is calculated with its own QueryContext so queries may run
+    concurrently. Responses are cached by query.
+
+    Attributes:
+        _root (Area): root of the loaded area tree
+        _cache (ResponseCache): cached responses by endpoint and query
+    """
+    _root: Area
+    _cache: ResponseCache
+
+    def __init__(self, root: Area, cache_size: int = 256) -> None:
+        self._root = root
+        self._cache = ResponseCache(cache_size)
+
+    def _find_area(self, path: tuple[str, ...]) -> Area:
+        """Returns the area at the path or raises a LookupError"""
+        area = self._root.find_subarea(list(path))
+        if area is None:
+            raise LookupError(f'Area not found: {" > ".join(path)}')
+        return area
+
+    def rank(self, query: dict[str, Any]) -> dict[str, Any]:
+        """Returns the top crags within the queried area"""
+        area = self._find_area(query['area'])
+        context = build_context(query)
+        area.calculate_stats(context)
+        crags = rank_crags(area, query['sort'], query['top'], context)
+        return {'crags': [crag_to_row(crag, context) for crag in crags]}
+
+    def stats(self, query: dict[str, Any]) -> dict[str, Any]:
+        """Returns the stats of the queried area and its subareas"""
+        area = self._find_area(query['area'])
+        context = build_context(query)
+        area.calculate_stats(context)
+        response = {
+            'area': crag_to_row(area, context),
+            'grades': {str(grade): n for grade, n in area.grades.items()},
+            'route_types': area.route_types,
+            'subareas': [],
+        }
+        if not area.is_leaf_parent:
+            subareas = rank_areas(
+                area.children, query['sort'], context=context
+            )
+            response['subareas'] = [
+                crag_to_row(subarea, context) for subarea in subareas
+            ]
+        return response
+
+    def health(self) -> dict[str, Any]:
+        """Returns the number of loaded routes and the cache stats"""
+        return {
+            'routes': self._root.total_num_routes,
+            'cache': self._cache.get_stats(),
+        }
+
+    def handle(self, endpoint: str, params: dict[str, list[str]]) -> bytes:
+        """
+        Returns the JSON encoded response of the endpoint. Raises a
+        ValueError for invalid parameters and a LookupError for unknown
+        endpoints or areas.
+        """
+        if endpoint == '/health':
+            return json.dumps(self.health()).encode()
+
+        handlers = {'/rank': self.rank, '/stats': self.stats}
+        if endpoint not in handlers:
+            raise LookupError(f'Unknown endpoint: {endpoint}')
+
+        query = parse_query(params)
+        key = (endpoint, query)
+        response = self._cache.get(key)
+        if response is None:
+            body = {'query': dict(query)} | handlers[endpoint](dict(query))
+            response = json.dumps(body).encode()
+            self._cache.put(key, response)
+        return response
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Routes GET requests to the server's QueryService"""
+
+    server: _QueryServer
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        try:
+            body = self.server.service.handle(url.path, parse_qs(url.query))
+            status = 200
+        except ValueError as e:
+            body, status = json.dumps({'error': str(e)}).encode(), 400
+        except LookupError as e:
+            body, status = json.dumps({'error': str(e)}).encode(), 404
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _QueryServer(ThreadingHTTPServer):
+    """Threaded HTTP server that holds a QueryService"""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: QueryService):
+        super().__init__(address, _RequestHandler)
+        self.service = service
+
+
+def serve(
+    root: Area, host: str = '127.0.0.1', port: int = 8000,
+    cache_size: int = 256
+) -> None:
+    """
+    Serves ranking queries for the given tree until interrupted.
+
+    Endpoints:
+        /rank: top crags within an area
+        /stats: stats of an area and its subareas
+        /health: number of loaded routes and cache stats
+
+    Args:
+        root (Area): root of the area tree. Area stats must be calculated.
+        host (str): address the server binds to
+        port (int): port the server listens on
+        cache_size (int): maximum number of cached responses
+    """
+    server = _QueryServer((host, port), QueryService(root, cache_size))
+    print(f'Serving on http://{host}:{server.server_port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return
@@ -0,0 +1,255 @@
+from __future__ import annotations
+import json
+import os
+import sys
+import tempfile
+import threading
+from typing import Callable, Iterator
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.catalog import AreaCatalog, CatalogArea  # noqa: E402
+from scraper.client import ScraperClient  # noqa: E402
+from scraper.fake_server import FakeServer  # noqa: E402
+from utils.utils import get_parser_dir  # noqa: E402
+
+GRADES = ['5.6', '5.7', '5.8', '5.9', '5.10', '5.11', '5.12', '5.13']
+
+# Grade parameter of each grade; a request covers the grades from p_1 to p_2
+GRADE_CODES = {grade: 100 * (idx + 1) for idx, grade in enumerate(GRADES)}
+
+# Routes of each grade in a crag. A sub-area's two crags have more than
+# 1000 routes of 5.6 together, so the sub-areas are too large to be
+# downloaded at once while the crags are not.
+CRAG_GRADES = {grade: 600 if grade == '5.6' else 100 for grade in GRADES}
+
+# Parsing tags matching the fake site's pages
+PARSING_CONFIG = {
+    'NAVBAR_LINK_CLASS': 'nav-row',
+    'VAL_ID': 'span.count',
+    'TABLE_ID': 'main-areas',
+    'NUMBER_OF_ROUTES': 'span.num',
+    'AREA_STATS_CONTAINER': 'stats',
+    'AREA_STATS_ELEMENT': 'script',
+    'AREA_STATS_REGEX': r'var gradeData = (\{.*?\});',
+    'REVIEW_ELEMENT': 'table',
+    'REVIEW_ELEMENT_CLASS': 'stars',
+    'REVIEW_KEYWORD': 'starcount',
+    'ID_PARAM': 'area',
+    'GRADE_PARAM_1': 'lo',
+    'GRADE_PARAM_2': 'hi',
+}
+
+
+class FakeSite(FakeServer):
+    """
+    Stand-in for the source website serving a region (Colorado, id 100) of
+    two sub-areas with two crags each. Area pages, route exports and review
+    pages are generated from the site's routes, so routes can be added
+    between downloads.
+
+    Attributes:
+        areas (dict[str, tuple[str, str | None, list[str]]]): name, parent
+            id and sub-area ids by area id
+        routes (list[tuple[str, str, str]]): route id, crag id and grade of
+            every route
+        paths (list[str]): paths of the requests answered, in order
+        on_request (Callable[[str], None] | None): called with the path of
+            each request before it is answered
+    """
+    areas: dict[str, tuple[str, str | None, list[str]]]
+    routes: list[tuple[str, str, str]]
+    paths: list[str]
+    on_request: Callable[[str], None] | None
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.areas = {}
+        self.routes = []
+        self.paths = []
+        self.on_request = None
+        self._paths_lock = threading.Lock()
+        self._add_area('100', 'Colorado', None)
+        for sub_area in range(2):
+            sub_area_id = f'2{sub_area}0'
+            self._add_area(sub_area_id, f'Sub Area {sub_area}', '100')
+            for crag in range(2):
+                crag_id = f'2{sub_area}{crag + 1}'
+                self._add_area(crag_id, f'Crag {sub_area} {crag}', sub_area_id)
+                for grade, num_routes in CRAG_GRADES.items():
+                    self.add_routes(crag_id, grade, num_routes)
+
+    def _add_area(self, area_id: str, name: str, parent: str | None) -> None:
+        """Adds an area under its parent"""
+        self.areas[area_id] = (name, parent, [])
+        if parent:
+            self.areas[parent][2].append(area_id)
+        return
+
+    def add_routes(self, crag_id: str, grade: str, num_routes: int) -> None:
+        """Adds routes of the grade to the crag"""
+        start = 10000 + len(self.routes)
+        self.routes.extend(
+            (str(route_id), crag_id, grade)
+            for route_id in range(start, start + num_routes)
+        )
+        return
+
+    @property
+    def crags(self) -> list[tuple[str, str]]:
+        """Returns the ids and names of the crags"""
+        return [
+            (area_id, name) for area_id, (name, _, children)
+            in self.areas.items() if not children
+        ]
+
+    @property
+    def config(self) -> dict[str, str]:
+        """Returns the client configuration pointing at the site"""
+        return PARSING_CONFIG | {
+            'URL': f'{self.url}/',
+            'AREA_URL': f'{self.url}/area',
+            'ROUTE_DATA_URL': f'{self.url}/routes',
+            'ROUTE_REVIEWS_URL': f'{self.url}/reviews',
+        }
+
+    def descendants(self, area_id: str) -> set[str]:
+        """Returns the ids of the area and of every area within it"""
+        ids = {area_id}
+        for child in self.areas[area_id][2]:
+            ids |= self.descendants(child)
+        return ids
+
+    def grade_distribution(self, area_id: str) -> dict[str, int]:
+        """Returns the number of routes of each grade within the area"""
+        ids = self.descendants(area_id)
+        distribution = dict.fromkeys(GRADES, 0)
+        for _, crag_id, grade in self.routes:
+            if crag_id in ids:
+                distribution[grade] += 1
+        return distribution
+
+    def catalog(self) -> AreaCatalog:
+        """Returns a catalog of the site's areas"""
+        return AreaCatalog([
+            CatalogArea(
+                id=area_id, name=name, parent=parent,
+                routes=sum(self.grade_distribution(area_id).values()),
+                grades=self.grade_distribution(area_id),
+                children=children or None
+            ) for area_id, (name, parent, children) in self.areas.items()
+        ])
+
+    def get_response(self, path: str) -> tuple[int, str, bytes]:
+        """Returns the page of the requested area, routes or reviews"""
+        with self._paths_lock:
+            self.paths.append(path)
+        if self.on_request:
+            self.on_request(path)
+        parsed = urlparse(path)
+        query = {
+            key: value[-1] for key, value in parse_qs(parsed.query).items()
+        }
+        if parsed.path.startswith('/area/'):
+            return 200, 'text/html', self._area_page(parsed.path.split('/')[2])
+        if parsed.path == '/routes':
+            return 200, 'text/csv', self._routes_page(query)
+        if parsed.path == '/reviews':
+            return 200, 'text/html', self._reviews_page(query)
+        return 404, 'text/html', b''
+
+    def _area_page(self, area_id: str) -> bytes:
+        """Returns the area's page with its sub-areas and grade stats"""
+        nav = ''.join(
+            f'<div class="nav-row"><a href="{self.url}/area/{child}/'
+            f'{self.areas[child][0].lower().replace(" ", "-")}">'
+            f'{self.areas[child][0]}</a><span class="count">'
+            f'{sum(self.grade_distribution(child).values())}</span></div>'
+            for child in self.areas[area_id][2]
+        )
+        rows = [
+            ['<5.6' if grade == '5.6' else '>=5.13' if grade == '5.13'
+             else grade, num_routes]
+            for grade, num_routes in self.grade_distribution(area_id).items()
+        ]
+        return (
+            f'<html><body><div id="nav">{nav}</div><div id="stats"><script>'
+            f'var gradeData = {json.dumps({"rock": rows})};</script></div>'
+            '</body></html>'
+        ).encode()
+
+    def _select(self, query: dict[str, str]) -> list[tuple[str, str, str]]:
+        """Returns the routes of the request's area and grade range"""
+        ids = self.descendants(query['area'])
+        return [
+            route for route in self.routes if route[1] in ids
+            and int(query['lo']) <= GRADE_CODES[route[2]] <= int(query['hi'])
+        ]
+
+    def _routes_page(self, query: dict[str, str]) -> bytes:
+        """Returns the csv export of the request's routes"""
+        lines = ['Route,Location,URL,Avg Stars,Your Stars,Route Type,Rating']
+        lines.extend(
+            f'Route {route_id},{self.areas[crag_id][0]},'
+            f'https://example.com/route/{route_id}/route-{route_id},'
+            f'3.0,-1,Sport,{grade}'
+            for route_id, crag_id, grade in self._select(query)
+        )
+        return ('\n'.join(lines) + '\n').encode()
+
+    def _reviews_page(self, query: dict[str, str]) -> bytes:
+        """Returns the review counts of the request's routes"""
+        rows = ''.join(
+            f'<tr><td><!-- starcount\\route-{route_id} --><span>'
+            f'{int(route_id) % 50}</span></td></tr>'
+            for route_id, _, _ in self._select(query)
+        )
+        return f'<html><table class="stars">{rows}</table></html>'.encode()
+
+
+@pytest.fixture(autouse=True)
+def request_parameters(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Uses the fake site's request parameters instead of the saved ones"""
+    grade_parameters = {
+        grade: [str(code), str(code + 99)]
+        for grade, code in GRADE_CODES.items()
+    }
+    monkeypatch.setattr(
+        'scraper.planner.load_grade_parameters', lambda: grade_parameters
+    )
+    monkeypatch.setattr(
+        'scraper.downloader.load_grade_parameters', lambda: grade_parameters
+    )
+    monkeypatch.setattr(
+        'scraper.scraper.load_constant_parameters', lambda: {'type': 'rock'}
+    )
+    return
+
+
+@pytest.fixture
+def site() -> Iterator[FakeSite]:
+    """Returns the fake site, served until the test ends"""
+    with FakeSite() as site:
+        yield site
+
+
+@pytest.fixture
+def client(site: FakeSite) -> Iterator[ScraperClient]:
+    """Returns a client pointed at the fake site"""
+    with ScraperClient(config=site.config) as client:
+        yield client
+
+
+@pytest.fixture
+def parser_dir() -> Iterator[str]:
+    """
+    Returns a temporary parser directory, so downloads never touch the
+    app's data. It is inside src/parser because review counts are only
+    saved inside src.
+    """
+    with tempfile.TemporaryDirectory(
+        prefix='test_', dir=get_parser_dir()
+    ) as directory:
+        yield directory
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import os
+import pytest
+from scraper.cancellation import CancellationToken, DownloadCancelled
+from scraper.checkpoint import DownloadManifest
+from scraper.client import ScraperClient
+from scraper.downloader import (
+    ConcurrentDownloader, get_route_id, get_source_path, get_staging_dir,
+    merge_area_files
+)
+from utils.utils import extract_data, load_review_counts
+
+
+def download(
+    client: ScraperClient, parser_dir: str, area_id: str = '100',
+    area_name: str = 'Colorado', **kwargs
+) -> ConcurrentDownloader:
+    """Downloads and merges the area and returns the downloader"""
+    downloader = ConcurrentDownloader(
+        client=client, parse_processes=0, parser_dir=parser_dir, **kwargs
+    )
+    downloader.download(area_id, area_name)
+    merge_area_files(area_id, area_name, parser_dir=parser_dir)
+    return downloader
+
+
+def source_route_ids(area_name: str, parser_dir: str) -> list[str]:
+    """Returns the route ids of the area's merged source file"""
+    return [
+        get_route_id(row)
+        for row in extract_data(get_source_path(area_name, parser_dir))
+        if row
+    ]
+
+
+def test_full_download_merges_every_route(site, client, parser_dir):
+    download(client, parser_dir)
+
+    route_ids = source_route_ids('Colorado', parser_dir)
+    assert len(route_ids) == len(site.routes)
+    assert set(route_ids) == {route_id for route_id, _, _ in site.routes}
+    reviews = load_review_counts(os.path.join(parser_dir, 'reviews.bin'))
+    assert len(reviews) == len(site.routes)
+
+
+def test_unchanged_redownload_only_requests_the_area_page(
+    site, client, parser_dir
+):
+    crag_id, crag_name = site.crags[0]
+    download(client, parser_dir, crag_id, crag_name)
+    site.paths.clear()
+
+    downloader = download(client, parser_dir, crag_id, crag_name)
+
+    assert len(site.paths) == downloader.requests_sent == 1
+    assert site.paths[0].startswith(f'/area/{crag_id}/')
+    crag_routes = [route for route in site.routes if route[1] == crag_id]
+    assert len(source_route_ids(crag_name, parser_dir)) == len(crag_routes)
+
+
+def test_redownload_only_requests_the_changed_band(site, client, parser_dir):
+    crag_id, crag_name = site.crags[0]
+    download(client, parser_dir, crag_id, crag_name)
+    site.add_routes(crag_id, '5.12', 5)
+    site.paths.clear()
+
+    downloader = download(client, parser_dir, crag_id, crag_name)
+
+    # The area page, then the route and review pages of the changed band
+    assert downloader.requests_sent == 3
+    assert sorted(path.split('?')[0] for path in site.paths[1:]) == [
+        '/reviews', '/routes'
+    ]
+    crag_routes = [route for route in site.routes if route[1] == crag_id]
+    assert len(source_route_ids(crag_name, parser_dir)) == len(crag_routes)
+
+
+def test_cancelled_download_resumes_from_its_staged_files(
+    site, client, parser_dir
+):
+    token = CancellationToken()
+    route_pages = []
+
+    def cancel_on_second_route_page(path: str) -> None:
+        if path.startswith('/routes'):
+            route_pages.append(path)
+            if len(route_pages) == 2:
+                token.cancel()
+
+    site.on_request = cancel_on_second_route_page
+    downloader = ConcurrentDownloader(
+        client=client, max_workers=1, parse_processes=0,
+        cancel_token=token, parser_dir=parser_dir
+    )
+    with pytest.raises(DownloadCancelled):
+        downloader.download('100', 'Colorado')
+
+    staging_dir = get_staging_dir('100', parser_dir)
+    staged = DownloadManifest.load(staging_dir, '100', 'Colorado').routes
+    assert staged
+    for entry in staged.values():
+        assert os.path.exists(os.path.join(staging_dir, entry['file']))
+
+    site.on_request = None
+    site.paths.clear()
+    download(client, parser_dir)
+
+    # Each crag's routes take two grade requests (see CRAG_GRADES) and the
+    # single worker completed the first route pages before the cancel
+    resumed = [path for path in site.paths if path.startswith('/routes')]
+    assert len(resumed) == 2 * len(site.crags) - len(staged)
+    assert not set(resumed) & set(route_pages[:len(staged)])
+    assert len(source_route_ids('Colorado', parser_dir)) == len(site.routes)
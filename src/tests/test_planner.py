@@ -0,0 +1,58 @@
+from __future__ import annotations
+from scraper.downloader import (
+    ConcurrentDownloader, load_download_record, merge_area_files
+)
+from scraper.planner import plan_download, plan_from_catalog
+
+
+def num_requests(plan) -> int:
+    """Returns the number of requests the plan sends"""
+    return plan['area_pages'] + 2 * plan['grade_requests']
+
+
+def download(client, parser_dir, **kwargs) -> ConcurrentDownloader:
+    """Downloads and merges Colorado and returns the downloader"""
+    downloader = ConcurrentDownloader(
+        client=client, parse_processes=0, parser_dir=parser_dir, **kwargs
+    )
+    downloader.download('100', 'Colorado')
+    merge_area_files('100', 'Colorado', parser_dir=parser_dir)
+    return downloader
+
+
+def test_crawled_plan_matches_the_requests_sent(site, client, parser_dir):
+    plan = plan_download('100', 'Colorado', client=client)
+    assert plan['area_pages'] == len(site.areas)
+    assert plan['num_routes'] == len(site.routes)
+    site.paths.clear()
+
+    downloader = download(client, parser_dir)
+
+    assert downloader.requests_sent == len(site.paths) == num_requests(plan)
+
+
+def test_catalog_plan_matches_the_requests_sent(site, client, parser_dir):
+    catalog = site.catalog()
+    plan = plan_from_catalog(catalog, '100', 'Colorado')
+    assert plan['area_pages'] == 0
+
+    downloader = download(client, parser_dir, catalog=catalog)
+
+    assert downloader.requests_sent == len(site.paths) == num_requests(plan)
+
+
+def test_catalog_plan_counts_the_pages_of_a_redownload(
+    site, client, parser_dir
+):
+    catalog = site.catalog()
+    download(client, parser_dir, catalog=catalog)
+    record = load_download_record('100', 'Colorado', parser_dir=parser_dir)
+    plan = plan_from_catalog(catalog, '100', 'Colorado', record)
+    site.paths.clear()
+
+    downloader = download(client, parser_dir, catalog=catalog)
+
+    # Only the recorded crags' pages are requested, nothing changed
+    assert plan['area_pages'] == len(site.crags)
+    assert downloader.requests_sent == len(site.paths) == plan['area_pages']
+    assert num_requests(plan) >= downloader.requests_sent
@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+from typing import TypedDict
+
+
+class ImportTime(TypedDict):
+    """
+    Represents a single line of a `python -X importtime` report
+
+    Attributes:
+    -----------
+    module: str
+        The fully qualified name of the imported module.
+    self_us: int
+        Time spent importing the module itself in microseconds.
+    cumulative_us: int
+        Time spent importing the module and its dependencies in microseconds.
+    depth: int
+        The nesting level of the import (0 for top level imports).
+    """
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_import_times(report: str) -> list[ImportTime]:
+    """
+    Parses the stderr output of `python -X importtime`.
+
+    Args:
+        report (str): the raw report written to stderr
+
+    Returns:
+        list[ImportTime]: one entry per imported module
+    """
+    entries = []
+    for line in report.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header row
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        entries.append({
+            'module': stripped,
+            'self_us': int(fields[0]),
+            'cumulative_us': int(fields[1]),
+            'depth': (len(name) - len(stripped) - 1) // 2
+        })
+    return entries
+
+
+def measure_import_times(modules: list[str]) -> list[ImportTime]:
+    """
+    Imports the given modules in a fresh interpreter and returns the
+    resulting import time report. The interpreter is started in the src
+    directory so project modules resolve the same way as in main.py.
+
+    Args:
+        modules (list[str]): modules to be imported
+
+    Returns:
+        list[ImportTime]: one entry per imported module
+    """
+    src = os.path.dirname(os.path.dirname(__file__))
+    statement = '; '.join(f'import {module}' for module in modules)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement or 'pass'],
+        cwd=src, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(result.stderr.strip().splitlines()[-1])
+    return parse_import_times(result.stderr)
+
+
+def format_import_report(entries: list[ImportTime], limit: int = 15) -> str:
+    """
+    Returns a human readable summary of the slowest top level imports.
+
+    Args:
+        entries (list[ImportTime]): parsed import time entries
+        limit (int): maximum number of modules listed
+    """
+    top_level = [entry for entry in entries if entry['depth'] == 0]
+    total_ms = sum(entry['cumulative_us'] for entry in top_level) / 1000
+    lines = [f'{"cumulative (ms)":>16} {"self (ms)":>10}  module']
+    slowest = sorted(
+        top_level, key=lambda entry: entry['cumulative_us'], reverse=True
+    )
+    for entry in slowest[:limit]:
+        lines.append(
+            f'{entry["cumulative_us"] / 1000:>16.1f} '
+            f'{entry["self_us"] / 1000:>10.1f}  {entry["module"]}'
+        )
+    lines.append(f'Total: {total_ms:.1f} ms across {len(entries)} modules')
+    return '\n'.join(lines)
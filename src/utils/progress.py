@@ -0,0 +1,84 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable
+
+
+class ProgressThrottle:
+    """
+    Coalesces progress updates before passing them on. Downloads report
+    their progress for every streamed chunk, from several threads at once,
+    so most updates repeat the last percentage or arrive a few milliseconds
+    apart. An update is passed on only if the value changed and either
+    min_interval seconds have passed since the last one, the value moved by
+    at least min_step, or the value reached 100. The latest value held back
+    is passed on by flush. Values are passed on while holding the lock, so
+    they arrive in the order they were accepted.
+
+    Attributes:
+        _emit (Callable[[int], None]): called with the passed on values
+        _min_interval (float): seconds between two updates
+        _min_step (int): change passed on regardless of the interval
+        _last_value (int | None): last value passed on
+        _last_time (float): time the last value was passed on
+        _pending (int | None): latest value held back
+    """
+    _emit: Callable[[int], None]
+    _min_interval: float
+    _min_step: int
+    _last_value: int | None
+    _last_time: float
+    _pending: int | None
+
+    def __init__(
+        self, emit: Callable[[int], None], *, min_interval: float = 0.1,
+        min_step: int = 5
+    ) -> None:
+        """
+        Args:
+            emit (Callable[[int], None]): called with the passed on values
+            min_interval (float): seconds between two updates
+            min_step (int): change passed on regardless of the interval
+        """
+        self._emit = emit
+        self._min_interval = min_interval
+        self._min_step = min_step
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets the values of a previous run"""
+        with self._lock:
+            self._last_value = self._pending = None
+            self._last_time = 0
+        return
+
+    def update(self, value: int) -> None:
+        """Passes the value on unless it is throttled"""
+        now = time.monotonic()
+        with self._lock:
+            if value == self._last_value:
+                self._pending = None
+                return
+            if (
+                self._last_value is not None
+                and value < 100
+                and now - self._last_time < self._min_interval
+                and abs(value - self._last_value) < self._min_step
+            ):
+                self._pending = value
+                return
+            self._last_value, self._last_time = value, now
+            self._pending = None
+            self._emit(value)
+        return
+
+    def flush(self) -> None:
+        """Passes on the latest value held back, if any"""
+        with self._lock:
+            value, self._pending = self._pending, None
+            if value is None:
+                return
+            self._last_value, self._last_time = value, time.monotonic()
+            self._emit(value)
+        return
@@ -1,13 +1,32 @@
+from array import array
 import csv
+import gzip
 import json
 import os
 from typing import Any
 
-from custom_types.custom_types import CSVData
+from custom_types.custom_types import CSVData, ReviewStatsDict
+
+
+# Extensions of csv files, which may be gzipped
+CSV_EXTENSIONS = ('.csv', '.csv.gz')
+
+
+def get_parser_dir() -> str:
+    """
+    Returns the directory downloads are staged, merged and recorded in by
+    default: src/parser. A download can be given a directory of its own
+    (i.e., benchmark_download keeps its downloads out of the app's data).
+    Review counts are only saved inside src (see is_subpath).
+    """
+    return os.path.join(os.path.dirname(os.path.dirname(__file__)), 'parser')
 
 
 def extract_csv_data(file_name: str) -> CSVData:
-    """Returns the contents of the csv file as a list"""
+    """Returns the contents of the csv file (gzipped or not) as a list"""
+    if file_name.endswith('.gz'):
+        with gzip.open(file_name, "rt", newline="") as csv_file:
+            return list(csv.reader(csv_file))
     with open(file_name, "r") as csv_file:
         data = list(csv.reader(csv_file))
     return data
@@ -38,9 +57,13 @@ def zip_csv_files(src: str, dest: str, delete_input_files: bool) -> None:
     """
     Merges the csv files in scr and saves them to dest. Can delete
     the files and removes the 1st row from each file (assumed to be
-    a header).
+    a header). Files are merged in name order, gzipped csv files are
+    decompressed and other files are ignored.
     """
-    input_files = os.listdir(src)
+    input_files = sorted(
+        file for file in os.listdir(src) if file.endswith(CSV_EXTENSIONS)
+    )
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
 
     with open(dest, "w", newline="") as csv_file:
         csv_writer = csv.writer(csv_file)
@@ -71,7 +94,8 @@ def save_json_data(fp: str, data: Any) -> None:
     """
     Saves the provided data to a json file. If the given file path is
     not within the project root, an error is raised. All required
-    directories are created if they do not exist.
+    directories are created if they do not exist. The file is replaced in a
+    single step, so updating a file in place never leaves it half written.
 
     Args:
         fp (str): the filepath
@@ -80,8 +104,59 @@ def save_json_data(fp: str, data: Any) -> None:
     if not is_subpath(fp):
         raise Exception("Attempting to save file outside of project root.")
     os.makedirs(os.path.dirname(fp), exist_ok=True)
-    with open(fp, "w") as file_obj:
+    tmp_fp = f'{fp}.tmp'
+    with open(tmp_fp, "w") as file_obj:
         json.dump(data, file_obj)
+    os.replace(tmp_fp, fp)
+    return
+
+
+def load_review_counts(fp: str) -> ReviewStatsDict:
+    """
+    Returns the number of reviews by route id saved by save_review_counts.
+    If the file does not exist, the legacy json file with the same name is
+    loaded instead.
+
+    Args:
+        fp (str): the filepath of the review counts
+
+    Returns:
+        ReviewStatsDict: number of reviews by route id
+    """
+    if not os.path.exists(fp):
+        legacy_data = extract_json_data(f'{os.path.splitext(fp)[0]}.json')
+        return {int(key): val for key, val in legacy_data.items()}
+
+    ids, counts = array('q'), array('q')
+    with open(fp, 'rb') as file_obj:
+        data = file_obj.read()
+    half = len(data) // 2
+    ids.frombytes(data[:half])
+    counts.frombytes(data[half:])
+    return dict(zip(ids, counts))
+
+
+def save_review_counts(fp: str, reviews: ReviewStatsDict) -> None:
+    """
+    Saves the number of reviews by route id as two arrays of 64 bit
+    integers (the sorted route ids followed by their counts). The file is
+    replaced in a single step, so readers never see a partial file.
+
+    Args:
+        fp (str): the filepath of the review counts
+        reviews (ReviewStatsDict): number of reviews by route id
+    """
+    if not is_subpath(fp):
+        raise Exception("Attempting to save file outside of project root.")
+    os.makedirs(os.path.dirname(fp), exist_ok=True)
+    route_ids = sorted(reviews)
+    tmp_fp = f'{fp}.tmp'
+    with open(tmp_fp, 'wb') as file_obj:
+        array('q', route_ids).tofile(file_obj)
+        array('q', (reviews[route_id] for route_id in route_ids)).tofile(
+            file_obj
+        )
+    os.replace(tmp_fp, fp)
     return
 
 